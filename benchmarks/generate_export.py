@@ -0,0 +1,106 @@
+"""Gera um CSV sintético no layout do export do ERP para os benchmarks
+
+Uso: python -m benchmarks.generate_export SAIDA.csv --rows 1000000 --branches 300 --start 2024-01-01 --end 2025-12-31
+"""
+import argparse
+import numpy as np
+import pandas as pd
+from src.infrastructure.csv_export_reader import ENCODING, SEPARATOR
+
+COLUMNS = ["Loja", "CNPJ", "Fornecedor", "Nr. IE", "Dt. Emissão", "Mod.", "Série", "Nr. Documento", "Vlr. Documento", "Evento", "Observações"]
+
+EVENTS = ["CIÊNCIA DA OPERAÇÃO", "CONFIRMAÇÃO DA OPERAÇÃO", "SEM MANIFESTAÇÃO"]
+MODELS = ["55", "57"]
+
+# Blocos gerados e gravados por vez (memória constante mesmo para 10 milhões de linhas)
+BLOCK_ROWS = 500_000
+
+
+def branch_weights(branches: int, skew: float) -> np.ndarray:
+    """Distribuição das linhas entre as filiais: poucas filiais grandes e muitas pequenas"""
+    pesos = 1.0 / np.arange(1, branches + 1) ** skew
+    return pesos / pesos.sum()
+
+
+# Troca os separadores do formato americano (1,234.56) pelos do brasileiro (1.234,56)
+_BRL_SEPARATORS = str.maketrans(",.", ".,")
+
+
+def format_brl(centavos: np.ndarray) -> list[str]:
+    """Formata valores em centavos no padrão brasileiro (1.234,56)"""
+    return [f"{valor:,.2f}".translate(_BRL_SEPARATORS) for valor in (centavos / 100).tolist()]
+
+
+def supplier_table(suppliers: int) -> tuple[np.ndarray, np.ndarray]:
+    """CNPJ e razão social de cada fornecedor, gerados uma única vez"""
+    cnpjs = np.array([f"{f // 100000 % 100:02d}.{f // 100 % 1000:03d}.{f % 1000:03d}/0001-{f % 97:02d}" for f in range(suppliers)], dtype=object)
+    nomes = np.array([f"Fornecedor {f} Ltda" for f in range(suppliers)], dtype=object)
+    return cnpjs, nomes
+
+
+def generate_block(rng: np.random.Generator, inicio: int, linhas: int, pesos: np.ndarray, datas: np.ndarray,
+                   fornecedores: tuple[np.ndarray, np.ndarray]) -> pd.DataFrame:
+    """Gera um bloco de linhas a partir da posição inicio"""
+    cnpjs, nomes = fornecedores
+    fornecedor = rng.integers(0, len(cnpjs), linhas)
+    numero = pd.Series(np.arange(inicio, inicio + linhas)).astype(str).str.zfill(9)
+
+    return pd.DataFrame({
+        "Loja": rng.choice(len(pesos), linhas, p=pesos) + 1,
+        "CNPJ": cnpjs[fornecedor],
+        "Fornecedor": nomes[fornecedor],
+        "Nr. IE": "'" + numero + "'",
+        "Dt. Emissão": datas[rng.integers(0, len(datas), linhas)],
+        "Mod.": rng.choice(MODELS, linhas),
+        "Série": rng.integers(1, 4, linhas),
+        "Nr. Documento": numero,
+        "Vlr. Documento": format_brl(rng.integers(100, 50_000_000, linhas)),
+        "Evento": rng.choice(EVENTS, linhas),
+        "Observações": "",
+    }, columns=COLUMNS)
+
+
+def generate_export(path: str, rows: int, branches: int = 300, start: str = "2024-01-01", end: str = "2025-12-31",
+                    suppliers: int = 5_000, skew: float = 0.8, seed: int = 1):
+    """Grava o CSV sintético em blocos; a mesma semente gera sempre o mesmo arquivo"""
+    rng = np.random.default_rng(seed)
+    pesos = branch_weights(branches, skew)
+    datas = pd.date_range(start, end, freq="D")
+    fornecedores = supplier_table(suppliers)
+    # Datas já formatadas uma única vez; cada linha só sorteia um índice
+    datas = np.array(datas.strftime("%d/%m/%Y"), dtype=object)
+
+    with open(path, "w", encoding=ENCODING, newline="") as f:
+        for inicio in range(0, max(rows, 1), BLOCK_ROWS):
+            linhas = min(BLOCK_ROWS, rows - inicio)
+            if linhas <= 0:
+                break
+            bloco = generate_block(rng, inicio, linhas, pesos, datas, fornecedores)
+            bloco.to_csv(f, sep=SEPARATOR, index=False, header=inicio == 0, lineterminator="\n")
+
+
+def parse_rows(texto: str) -> int:
+    """Aceita 10000, 10k, 1M, 10M"""
+    texto = texto.strip().lower()
+    multiplicador = {"k": 1_000, "m": 1_000_000}.get(texto[-1:], 1)
+    return int(float(texto.rstrip("km")) * multiplicador)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera um CSV sintético no layout do export")
+    parser.add_argument("output", help="Arquivo CSV de saída")
+    parser.add_argument("--rows", type=parse_rows, default=10_000, help="Quantidade de linhas (ex.: 10k, 1M)")
+    parser.add_argument("--branches", type=int, default=300, help="Quantidade de filiais")
+    parser.add_argument("--start", default="2024-01-01", help="Primeira data de emissão (AAAA-MM-DD)")
+    parser.add_argument("--end", default="2025-12-31", help="Última data de emissão (AAAA-MM-DD)")
+    parser.add_argument("--suppliers", type=int, default=5_000, help="Quantidade de fornecedores distintos")
+    parser.add_argument("--skew", type=float, default=0.8, help="Concentração das linhas nas primeiras filiais (0 = uniforme)")
+    parser.add_argument("--seed", type=int, default=1, help="Semente do gerador aleatório")
+    args = parser.parse_args(argv)
+
+    generate_export(args.output, args.rows, args.branches, args.start, args.end, args.suppliers, args.skew, args.seed)
+    print(f"{args.rows} linhas gravadas em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
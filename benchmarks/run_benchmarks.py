@@ -0,0 +1,181 @@
+"""Mede o tempo de cada etapa do processamento em exports sintéticos e compara com uma linha de base
+
+Uso:
+    python -m benchmarks.run_benchmarks --sizes 10k,1M --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --sizes 10k,1M --baseline benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+import pandas as pd
+from benchmarks.generate_export import generate_export, parse_rows
+from src.application.spreadsheet_service import SpreadsheetService
+from src.infrastructure.email_sender import SendEmail
+from src.infrastructure.instrumentation import RunTracer
+from src.infrastructure.mail_transport import EmlFileTransport
+
+DEFAULT_SIZES = "10k,1M,10M"
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+# Diferenças menores que isso (s) são ruído e nunca contam como regressão
+NOISE_FLOOR_SECONDS = 0.05
+
+
+class SyntheticStoreConfig:
+    """Cadastro das filiais sintéticas: um endereço de teste por filial, sem ler a configuração do usuário"""
+
+    def get_store_admins(self, store_code: str) -> list[str]:
+        return [f"loja{store_code}@benchmark.invalid"]
+
+    def get_store_coordinators(self, store_code: str) -> list[str]:
+        return [f"coordenacao{store_code}@benchmark.invalid"]
+
+
+def simulated_send(reports: list, output_base: str, tracer: RunTracer = None):
+    """Envio simulado das planilhas geradas: montagem das mensagens (montagem_email) e gravação dos .eml (envio)"""
+    sender = SendEmail(transport=EmlFileTransport(os.path.join(output_base, "eml")), config_service=SyntheticStoreConfig())
+    sender.send_many([report for report in reports if not report.error], tracer)
+
+
+def run_stages(csv_path: str, output_base: str, streaming_threshold: int) -> dict:
+    """SpreadsheetService.execute no processo atual e envio simulado; devolve o tempo somado de cada etapa registrada"""
+    tracer = RunTracer("benchmark")
+    servico = SpreadsheetService(workers=1, csv_chunksize=0, streaming_threshold=streaming_threshold,
+                                 history_dir=os.path.join(output_base, "historico"))
+    reports = servico.execute(csv_path, output_base, tracer=tracer, record_history=True)
+    simulated_send(reports, output_base, tracer)
+    return {etapa: total["seconds"] for etapa, total in tracer.stage_totals().items()}
+
+
+def run_end_to_end(csv_path: str, output_base: str, workers: int, chunk_rows: int) -> float:
+    """SpreadsheetService.execute completo seguido do envio simulado (.eml)"""
+    inicio = time.perf_counter()
+    servico = SpreadsheetService(workers=workers, csv_chunksize=chunk_rows, history_dir=os.path.join(output_base, "historico"))
+    reports = servico.execute(csv_path, output_base)
+    simulated_send(reports, output_base)
+    return time.perf_counter() - inicio
+
+
+def ensure_export(data_dir: str, rows: int, branches: int, seed: int) -> str:
+    """Gera o CSV sintético do tamanho pedido, reaproveitando o arquivo se já existir"""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"export_{rows}_{branches}_{seed}.csv")
+    if not os.path.exists(path):
+        print(f"Gerando {path}...", flush=True)
+        generate_export(path + ".tmp", rows, branches=branches, seed=seed)
+        os.replace(path + ".tmp", path)
+    return path
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Lista as etapas que ficaram mais lentas que a linha de base além da tolerância"""
+    regressoes = []
+    for tamanho, atual in results.items():
+        base = baseline.get("results", {}).get(tamanho)
+        if not base:
+            continue
+        for etapa, segundos in atual["stages"].items():
+            anterior = base["stages"].get(etapa)
+            if anterior is None:
+                continue
+            if segundos > anterior * (1 + tolerance) and segundos - anterior > NOISE_FLOOR_SECONDS:
+                regressoes.append(f"{tamanho} {etapa}: {anterior:.3f}s -> {segundos:.3f}s (+{(segundos / anterior - 1) * 100:.0f}%)")
+    return regressoes
+
+
+def print_table(results: dict, baseline: dict = None):
+    """Mostra os tempos por etapa e tamanho (com a linha de base entre parênteses)"""
+    etapas = []
+    for atual in results.values():
+        etapas += [etapa for etapa in atual["stages"] if etapa not in etapas]
+
+    print(f"\n{'etapa':<16}" + "".join(f"{tamanho:>24}" for tamanho in results))
+    for etapa in etapas:
+        linha = f"{etapa:<16}"
+        for tamanho, atual in results.items():
+            segundos = atual["stages"].get(etapa)
+            texto = "-" if segundos is None else f"{segundos:.3f}s"
+            anterior = ((baseline or {}).get("results", {}).get(tamanho) or {}).get("stages", {}).get(etapa)
+            if segundos is not None and anterior is not None:
+                texto += f" ({anterior:.3f}s)"
+            linha += f"{texto:>24}"
+        print(linha)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks do processamento de pendências")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"Tamanhos em linhas separados por vírgula (padrão: {DEFAULT_SIZES})")
+    parser.add_argument("--branches", type=int, default=300, help="Filiais no export sintético")
+    parser.add_argument("--seed", type=int, default=1, help="Semente do export sintético")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="Pasta dos CSVs gerados (reaproveitados entre execuções)")
+    parser.add_argument("--workers", type=int, default=1, help="Processos na medição ponta a ponta")
+    parser.add_argument("--chunk-rows", type=int, default=0, help="Leitura em blocos na medição ponta a ponta (0 = arquivo inteiro)")
+    parser.add_argument("--streaming-threshold", type=int, default=100_000, help="Linhas a partir das quais o xlsx é gravado em modo write-only")
+    parser.add_argument("--skip-stages", action="store_true", help="Mede só a execução ponta a ponta")
+    parser.add_argument("--skip-end-to-end", action="store_true", help="Mede só as etapas")
+    parser.add_argument("--output", help="Grava os resultados em JSON")
+    parser.add_argument("--baseline", help="Linha de base (JSON) para comparar")
+    parser.add_argument("--save-baseline", help="Grava os resultados como nova linha de base")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Aumento relativo tolerado antes de apontar regressão (padrão: 0.15)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for tamanho in [t.strip() for t in args.sizes.split(",") if t.strip()]:
+        linhas = parse_rows(tamanho)
+        csv_path = ensure_export(args.data_dir, linhas, args.branches, args.seed)
+        stages = {}
+
+        with tempfile.TemporaryDirectory(prefix="cobrancanf_bench_") as output_base:
+            if not args.skip_stages:
+                print(f"[{tamanho}] etapas...", flush=True)
+                stages.update(run_stages(csv_path, os.path.join(output_base, "etapas"), args.streaming_threshold))
+            if not args.skip_end_to_end:
+                print(f"[{tamanho}] ponta a ponta...", flush=True)
+                stages["ponta_a_ponta"] = run_end_to_end(csv_path, os.path.join(output_base, "ponta_a_ponta"), args.workers, args.chunk_rows)
+
+        results[tamanho] = {"rows": linhas, "stages": stages}
+
+    relatorio = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "workers": args.workers,
+            "chunk_rows": args.chunk_rows,
+        },
+        "results": results,
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print_table(results, baseline)
+
+    for destino in (args.output, args.save_baseline):
+        if destino:
+            with open(destino, "w", encoding="utf-8") as f:
+                json.dump(relatorio, f, indent=2)
+            print(f"\nResultados gravados em {destino}")
+
+    if baseline is not None:
+        regressoes = compare(results, baseline, args.tolerance)
+        if regressoes:
+            print("\nRegressões em relação à linha de base:")
+            for regressao in regressoes:
+                print(f"  {regressao}")
+            return 1
+        print("\nSem regressões em relação à linha de base.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
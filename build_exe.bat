@@ -40,11 +40,20 @@ pyinstaller --noconfirm --onefile --windowed ^
     --clean ^
     "main.pyw"
 
+:: Versao de linha de comando (com console) para o agendador de tarefas
+:: --onedir evita a extracao para a pasta temporaria a cada execucao
+echo.
+echo [INFO] Gerando executavel de linha de comando a partir de cli.py...
+echo.
+pyinstaller --noconfirm --onedir --console ^
+    --name "CobrancaNF-cli" ^
+    "cli.py"
+
 echo.
 if %errorlevel% equ 0 (
     echo ====================================================
     echo   SUCESSO! O executavel foi gerado na pasta 'dist'
-    echo   Nome: CobrancaNF.exe
+    echo   Nome: CobrancaNF.exe e CobrancaNF-cli\CobrancaNF-cli.exe
     echo ====================================================
 ) else (
     echo [ERRO] Ocorreu um problema ao gerar o executavel.
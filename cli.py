@@ -0,0 +1,9 @@
+import multiprocessing
+import sys
+from src.presentation.cli import main
+
+
+if __name__ == "__main__":
+    # Necessário para o pool de processos no executável gerado pelo PyInstaller
+    multiprocessing.freeze_support()
+    sys.exit(main())
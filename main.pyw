@@ -1,3 +1,4 @@
+import multiprocessing
 import tkinter as tk
 from src.presentation.main_window import StoreEmailConfigUI
 
@@ -8,4 +9,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Necessário para o pool de processos no executável gerado pelo PyInstaller
+    multiprocessing.freeze_support()
     main()
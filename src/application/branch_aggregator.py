@@ -0,0 +1,95 @@
+from dataclasses import dataclass
+import pandas as pd
+
+COL_FILIAL = "Loja"
+COL_EMISSAO = "Dt. Emissão"
+COL_VALOR = "Vlr. Documento"
+COL_MES = "Ano-Mes"
+COL_QTD_MES = "Quantidade por mês"
+
+
+@dataclass
+class BranchAggregates:
+    """Agregados de todas as filiais calculados em uma única passada"""
+    summary: pd.DataFrame
+    monthly: pd.DataFrame
+    period_initial: pd.Timestamp
+    period_final: pd.Timestamp
+
+    def quantity(self, filial: str) -> int:
+        """Retorna a quantidade de documentos da filial"""
+        return int(self.summary.at[filial, "quantidade"])
+
+    def total(self, filial: str) -> float:
+        """Retorna a soma de Vlr. Documento da filial"""
+        return float(self.summary.at[filial, "valor_total"])
+
+    def merge(self, other: "BranchAggregates") -> "BranchAggregates":
+        """Soma os agregados de outro bloco do mesmo arquivo (leitura em blocos)"""
+        somas = ["quantidade", "valor_total"]
+        summary = self.summary[somas].add(other.summary[somas], fill_value=0)
+        summary["quantidade"] = summary["quantidade"].astype("int64")
+        # Data mais antiga não se soma: fica a menor entre os blocos
+        inicio = pd.concat([self.summary["emissao_inicial"], other.summary["emissao_inicial"]]).groupby(level=0).min()
+        summary = summary.join(inicio).sort_index()
+
+        monthly = self.monthly.add(other.monthly, fill_value=0).fillna(0).astype("int64")
+        monthly = monthly.sort_index().sort_index(axis=1)
+        monthly.columns.name = COL_MES
+
+        return BranchAggregates(
+            summary=summary,
+            monthly=monthly,
+            period_initial=_min_date(self.period_initial, other.period_initial),
+            period_final=_max_date(self.period_final, other.period_final),
+        )
+
+
+def _min_date(a, b):
+    """Menor data ignorando NaT"""
+    datas = [d for d in (a, b) if pd.notna(d)]
+    return min(datas) if datas else pd.NaT
+
+
+def _max_date(a, b):
+    """Maior data ignorando NaT"""
+    datas = [d for d in (a, b) if pd.notna(d)]
+    return max(datas) if datas else pd.NaT
+
+
+def normalize_branch_codes(lojas: pd.Series) -> pd.Series:
+    """Adiciona o zero à esquerda nas filiais de um dígito (ex.: '2' -> '02')"""
+    numeros = pd.to_numeric(lojas, errors="coerce")
+    um_digito = numeros.between(0, 9)
+    return lojas.where(~um_digito, "0" + lojas)
+
+
+class BranchAggregator:
+    """Calcula quantidade, valor total e contagem mensal de todas as filiais de uma vez"""
+
+    def execute(self, df: pd.DataFrame) -> BranchAggregates:
+        """Agrega o DataFrame inteiro por filial e por (filial, mês)"""
+        emissao = df[COL_EMISSAO]
+
+        # observed=True: com Loja categórica só entram as filiais presentes no DataFrame
+        summary = df.groupby(COL_FILIAL, sort=True, observed=True).agg(
+            quantidade=(COL_VALOR, "size"),
+            valor_total=(COL_VALOR, "sum"),
+            emissao_inicial=(COL_EMISSAO, "min"),
+        )
+        summary.index = summary.index.astype(object)
+
+        # Linhas sem data de emissão ficam fora da tabela mensal, como no groupby original
+        monthly = (
+            df.groupby([df[COL_FILIAL], emissao.dt.to_period("M").rename(COL_MES)], sort=True, observed=True)
+            .size()
+            .unstack(fill_value=0)
+        )
+        monthly.index = monthly.index.astype(object)
+
+        return BranchAggregates(
+            summary=summary,
+            monthly=monthly,
+            period_initial=emissao.min(),
+            period_final=emissao.max(),
+        )
@@ -0,0 +1,36 @@
+import hashlib
+import numpy as np
+import pandas as pd
+from pandas.util import hash_pandas_object
+from src.infrastructure.csv_export_reader import COL_FILIAL, DOCUMENT_KEY
+
+# Colunas de row_hashes
+COL_DOC_KEY = "doc_key"
+COL_ROW_HASH = "row_hash"
+
+
+def row_hashes(df: pd.DataFrame) -> pd.DataFrame:
+    """Hash da identidade do documento e da linha inteira, calculados uma vez para o DataFrame todo
+
+    O hash de categorias usa os valores e não os códigos, e os inteiros são comparados como int64: o resultado
+    de uma filial é o mesmo no arquivo inteiro, em blocos ou em uma partição.
+    """
+    colunas = [col for col in df.columns if col != COL_FILIAL]
+    valores = df[colunas].astype({col: "int64" for col in colunas if pd.api.types.is_integer_dtype(df[col].dtype)})
+    return pd.DataFrame({
+        COL_DOC_KEY: hash_pandas_object(valores[[col for col in DOCUMENT_KEY if col in colunas]], index=False).to_numpy(),
+        COL_ROW_HASH: hash_pandas_object(valores, index=False).to_numpy(),
+    }, index=df.index)
+
+
+def fingerprint_from_hashes(hashes: pd.DataFrame, columns) -> str:
+    """Fingerprint de uma filial a partir de row_hashes, independente da ordem das linhas no arquivo"""
+    chave = hashes[COL_DOC_KEY].to_numpy()
+    linha = hashes[COL_ROW_HASH].to_numpy()
+    # Linhas ordenadas pela identidade do documento; o hash da linha inteira detecta mudança de valor ou evento
+    ordem = np.lexsort((linha, chave))
+
+    digest = hashlib.sha1("|".join(col for col in columns if col != COL_FILIAL).encode("utf-8"))
+    digest.update(chave[ordem].tobytes())
+    digest.update(linha[ordem].tobytes())
+    return digest.hexdigest()
@@ -0,0 +1,130 @@
+import os
+from dataclasses import dataclass
+import pandas as pd
+from src.infrastructure.attachment_policy import AttachmentPolicy
+from src.infrastructure.excel_writer import BranchWorkbookWriter, compute_column_widths
+from src.infrastructure.instrumentation import NULL_TRACER, STAGE_ATTACHMENT, STAGE_AUTOFIT, STAGE_WORKBOOK, RunTracer, Span
+from src.domain.entities import BranchReport
+
+
+@dataclass
+class BranchTask:
+    """Tudo o que é necessário para gerar o relatório de uma filial, sem depender do DataFrame completo"""
+    branch: str
+    data: pd.DataFrame
+    table: str
+    quantity: int
+    total: float
+    period_initial: pd.Timestamp
+    period_final: pd.Timestamp
+    output_base: str
+    fingerprint: str = None
+    # Planilha com o mesmo conteúdo já gerada em uma execução anterior
+    unchanged: bool = False
+
+
+def format_currency(valor: float) -> str:
+    """Formata o valor no padrão brasileiro (ex.: 1.234,56)"""
+    return f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def branch_excel_path(task: BranchTask) -> str:
+    """Retorna o caminho da planilha da filial: <saída>/<filial>/<MMAAAA>/Pendencias <filial>.xlsx"""
+    pasta_periodo = os.path.join(task.output_base, task.branch, task.period_final.strftime("%m%Y"))
+    return os.path.join(pasta_periodo, f"Pendencias {task.branch}.xlsx")
+
+
+def failed_branch_report(task: BranchTask, error: Exception) -> BranchReport:
+    """Cria o relatório de uma filial que não pôde ser gerada"""
+    print(f"Erro ao gerar o relatório da filial {task.branch}: {error}")
+    return BranchReport(
+        branch=task.branch,
+        period_initial=task.period_initial,
+        period_final=task.period_final,
+        excel_path=branch_excel_path(task),
+        quantity=task.quantity,
+        total_value=format_currency(task.total),
+        table="",
+        error=str(error),
+        fingerprint=task.fingerprint
+    )
+
+
+def unchanged_branch_report(task: BranchTask, policy: AttachmentPolicy = None) -> BranchReport:
+    """Relatório de uma filial sem alterações, apontando para a planilha (e os anexos) já existentes"""
+    arquivo_excel = branch_excel_path(task)
+    report = BranchReport(
+        branch=task.branch,
+        period_initial=task.period_initial,
+        period_final=task.period_final,
+        excel_path=arquivo_excel,
+        quantity=task.quantity,
+        total_value=format_currency(task.total),
+        table=task.table,
+        fingerprint=task.fingerprint,
+        unchanged=True
+    )
+    if policy is not None:
+        try:
+            _apply_plan(report, policy.plan(arquivo_excel, task.output_base))
+        except Exception as e:
+            return failed_branch_report(task, e)
+    return report
+
+
+def _apply_plan(report: BranchReport, plano):
+    """Copia para o relatório os anexos decididos pela política"""
+    report.attachments = plano.messages
+    report.link = plano.link
+
+
+def build_branch_report(task: BranchTask, writer: BranchWorkbookWriter, tracer: RunTracer = None,
+                        policy: AttachmentPolicy = None) -> BranchReport:
+    """Gera a planilha de uma filial e, com policy, prepara os anexos; erros ficam registrados no próprio relatório"""
+    tracer = tracer or NULL_TRACER
+    if task.unchanged:
+        return unchanged_branch_report(task, policy)
+
+    arquivo_excel = branch_excel_path(task)
+
+    try:
+        os.makedirs(os.path.dirname(arquivo_excel), exist_ok=True)
+
+        with tracer.span(STAGE_AUTOFIT, branch=task.branch, rows=len(task.data)):
+            larguras = compute_column_widths(task.data)
+
+        # Salva o arquivo Excel já com as colunas autoajustadas
+        with tracer.span(STAGE_WORKBOOK, branch=task.branch, rows=len(task.data)) as span:
+            writer.execute(task.data, arquivo_excel, larguras)
+            span.bytes = os.path.getsize(arquivo_excel)
+
+        # Tamanho medido antes do envio: planilhas grandes são compactadas, divididas ou trocadas por link
+        plano = None
+        if policy is not None:
+            with tracer.span(STAGE_ATTACHMENT, branch=task.branch, rows=len(task.data)) as span:
+                plano = policy.plan(arquivo_excel, task.output_base, task.data, writer)
+                span.bytes = sum(os.path.getsize(caminho) for anexos in plano.messages for caminho in anexos)
+    except Exception as e:
+        return failed_branch_report(task, e)
+
+    report = BranchReport(
+        branch=task.branch,
+        period_initial=task.period_initial,
+        period_final=task.period_final,
+        excel_path=arquivo_excel,
+        quantity=task.quantity,
+        total_value=format_currency(task.total),
+        table=task.table,
+        fingerprint=task.fingerprint
+    )
+    if plano is not None:
+        _apply_plan(report, plano)
+    return report
+
+
+def build_branch_reports(tasks: list[BranchTask], streaming_threshold: int, policy: AttachmentPolicy = None) -> tuple[list[BranchReport], list[Span]]:
+    """Processa um lote de filiais (executado dentro de um processo do pool); devolve também os spans medidos"""
+    writer = BranchWorkbookWriter(streaming_threshold=streaming_threshold)
+    tracer = RunTracer()
+    reports = [build_branch_report(task, writer, tracer, policy) for task in tasks]
+    return reports, tracer.spans
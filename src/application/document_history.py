@@ -0,0 +1,107 @@
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict
+import numpy as np
+import pandas as pd
+from src.application.branch_fingerprint import COL_DOC_KEY, row_hashes
+from src.domain.entities import BranchDelta
+from src.infrastructure.csv_export_reader import COL_FILIAL, DOCUMENT_KEY
+from src.infrastructure.history_store import INDEX_DATE_TYPES, HistoryStore, create_history_store
+
+# Dias pendente a partir dos quais um documento conta como antigo
+DEFAULT_AGING_DAYS = 30
+
+# Execuções simultâneas (modo watch) leem e regravam o mesmo índice uma de cada vez
+_INDEX_LOCK = threading.Lock()
+
+
+def compute_deltas(index: pd.DataFrame, current: pd.DataFrame, taken_at: pd.Timestamp, aging_days: int) -> tuple[Dict[str, BranchDelta], pd.DataFrame]:
+    """Compara os documentos atuais de cada filial com a execução anterior dela e devolve as diferenças e o índice atualizado
+
+    Novos: não estavam pendentes na execução anterior da filial; resolvidos: estavam e saíram do export;
+    antigos: pendentes há aging_days dias ou mais desde a primeira vez em que apareceram.
+    Filiais ausentes desta execução ficam no índice como estavam.
+    """
+    chave = [COL_FILIAL, COL_DOC_KEY]
+    filiais = current[COL_FILIAL].unique()
+
+    # Pendentes na execução anterior de cada filial desta execução
+    anteriores = index[index[COL_FILIAL].isin(filiais)]
+    ultima = anteriores.groupby(COL_FILIAL)["last_seen"].transform("max")
+    pendentes_antes = anteriores.loc[anteriores["last_seen"] == ultima, chave]
+
+    # Documento que já apareceu antes mantém a data da primeira aparição
+    atuais = current.merge(index[chave + ["first_seen"]], on=chave, how="left")
+    atuais["first_seen"] = atuais["first_seen"].fillna(taken_at)
+    atuais["last_seen"] = taken_at
+    atuais = atuais.astype(INDEX_DATE_TYPES)
+
+    novos = ~atuais.set_index(chave).index.isin(pendentes_antes.set_index(chave).index)
+    resolvidos = ~pendentes_antes.set_index(chave).index.isin(atuais.set_index(chave).index)
+    dias = (taken_at - atuais["first_seen"]).dt.days
+
+    contagens = pd.DataFrame({
+        "new": pd.Series(novos, index=atuais.index).groupby(atuais[COL_FILIAL]).sum(),
+        "resolved": pd.Series(resolvidos, index=pendentes_antes.index).groupby(pendentes_antes[COL_FILIAL]).sum(),
+        "aging": (dias >= aging_days).groupby(atuais[COL_FILIAL]).sum(),
+        "oldest_days": dias.groupby(atuais[COL_FILIAL]).max(),
+    }).reindex(filiais).fillna(0).astype("int64")
+    deltas = {str(filial): BranchDelta(**linha) for filial, linha in contagens.to_dict("index").items()}
+
+    mantidos = index[~index.set_index(chave).index.isin(atuais.set_index(chave).index)]
+    novo_indice = pd.concat([mantidos, atuais], ignore_index=True) if len(mantidos) else atuais
+    return deltas, novo_indice.sort_values(chave, ignore_index=True)
+
+
+class DocumentHistory:
+    """Acrescenta cada execução ao arquivo histórico e calcula novos, resolvidos e antigos por filial"""
+
+    def __init__(self, store: HistoryStore, aging_days: int = DEFAULT_AGING_DAYS, taken_at: datetime = None):
+        self._store = store
+        self._aging_days = aging_days
+        # Todas as filiais de uma execução ficam com o mesmo instante
+        self.taken_at = pd.Timestamp(taken_at or datetime.now()).floor("s").as_unit("ns")
+        # Sufixo aleatório: duas execuções no mesmo segundo (modo watch) gravam arquivos diferentes
+        self.snapshot_id = f"{self.taken_at.strftime('%Y%m%dT%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        self._keys = []
+
+    def record(self, branch: str, df: pd.DataFrame, period_final: pd.Timestamp, hashes: pd.DataFrame = None):
+        """Arquiva os documentos da filial; a comparação com a execução anterior e a confirmação dos arquivos ficam para save()"""
+        periodo = (period_final if pd.notna(period_final) else self.taken_at).strftime("%Y-%m")
+        self._store.append_snapshot(branch, periodo, self.snapshot_id, df.drop(columns=COL_FILIAL, errors="ignore"), self.taken_at)
+
+        # Só a identidade dos documentos fica em memória até o fim da execução
+        hashes = row_hashes(df) if hashes is None else hashes
+        chaves = {COL_FILIAL: np.full(len(df), branch, dtype=object), COL_DOC_KEY: hashes[COL_DOC_KEY].to_numpy()}
+        chaves.update({col: np.asarray(df[col], dtype=object) for col in DOCUMENT_KEY if col in df.columns})
+        self._keys.append(chaves)
+
+    def save(self) -> Dict[str, BranchDelta]:
+        """Atualiza o índice com todas as filiais registradas e devolve a diferença de cada uma"""
+        if not self._keys:
+            self.discard()
+            return {}
+        atuais = pd.DataFrame({col: np.concatenate([chaves[col] for chaves in self._keys]) for col in self._keys[0]})
+        atuais = atuais.drop_duplicates([COL_FILIAL, COL_DOC_KEY], ignore_index=True)
+
+        with _INDEX_LOCK:
+            deltas, indice = compute_deltas(self._store.read_index(), atuais, self.taken_at, self._aging_days)
+            self._store.write_index(indice)
+            # Os documentos da execução só aparecem no histórico depois do índice que os referencia
+            self._store.commit_snapshot(self.snapshot_id)
+        self._keys = []
+        return deltas
+
+    def discard(self):
+        """Descarta o que foi registrado nesta execução (geração cancelada ou com erro)"""
+        self._store.discard_snapshot(self.snapshot_id)
+        self._keys = []
+
+
+def create_document_history(settings, directory: str = None):
+    """Histórico da execução com os parâmetros do .env (HISTORY_ENABLED, HISTORY_DIR, HISTORY_AGING_DAYS); None se desativado"""
+    store = create_history_store(settings, directory)
+    if store is None:
+        return None
+    return DocumentHistory(store, aging_days=int(settings.HISTORY_AGING_DAYS or DEFAULT_AGING_DAYS))
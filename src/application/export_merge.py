@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+from pandas.util import hash_pandas_object
+from src.infrastructure.csv_export_reader import DOCUMENT_KEY, ExportCsvReader
+from src.infrastructure.export_sources import ExportSource
+from src.infrastructure.instrumentation import RunTracer
+
+# Linhas por bloco na leitura só da chave (modo em blocos com vários arquivos)
+KEY_CHUNK_ROWS = 500_000
+
+
+def document_key_hashes(df: pd.DataFrame) -> np.ndarray:
+    """Hash da identidade de cada linha (CNPJ, Mod., Série, Nr. Documento)"""
+    return hash_pandas_object(df[DOCUMENT_KEY], index=False).to_numpy()
+
+
+def merge_exports(frames: list[pd.DataFrame]) -> tuple[pd.DataFrame, int]:
+    """Junta os exports na ordem dos arquivos; documento repetido entre arquivos fica só com as linhas do último
+
+    Repetições dentro de um mesmo arquivo são mantidas, como na leitura de um arquivo só. Devolve também
+    quantas linhas foram descartadas.
+    """
+    if len(frames) == 1:
+        return frames[0], 0
+
+    chaves = np.concatenate([document_key_hashes(df) for df in frames])
+    origem = np.concatenate([np.full(len(df), posicao) for posicao, df in enumerate(frames)])
+    ultimo = pd.Series(origem).groupby(chaves).transform("max").to_numpy()
+    manter = origem == ultimo
+
+    df = pd.concat(frames, ignore_index=True)
+    if manter.all():
+        return df, 0
+    return df[manter].reset_index(drop=True), int((~manter).sum())
+
+
+def iter_merged_chunks(reader: ExportCsvReader, sources: list[ExportSource], chunksize: int, tracer: RunTracer = None, preflight=None):
+    """Blocos de todos os exports, sem os documentos que aparecem de novo em um arquivo posterior
+
+    Uma primeira passada lê só as colunas da chave de cada arquivo; na segunda cada bloco descarta as linhas
+    cuja chave está em algum arquivo seguinte. A memória extra é de 8 bytes por documento. preflight valida as
+    linhas de cada arquivo na segunda passada, antes do descarte.
+    """
+    if len(sources) == 1:
+        yield from reader.read_chunks(sources[0], chunksize, tracer=tracer, preflight=preflight)
+        return
+
+    chaves = []
+    for fonte in sources:
+        blocos = [document_key_hashes(bloco) for bloco in reader.read_chunks(fonte, KEY_CHUNK_ROWS, columns=DOCUMENT_KEY)]
+        chaves.append(np.unique(np.concatenate(blocos)) if blocos else np.array([], dtype="uint64"))
+
+    for posicao, fonte in enumerate(sources):
+        seguintes = np.unique(np.concatenate(chaves[posicao + 1:])) if posicao + 1 < len(chaves) else None
+        for bloco in reader.read_chunks(fonte, chunksize, tracer=tracer, preflight=preflight):
+            if seguintes is not None and len(seguintes):
+                bloco = bloco[~np.isin(document_key_hashes(bloco), seguintes)]
+            yield bloco
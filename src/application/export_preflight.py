@@ -0,0 +1,210 @@
+import os
+import threading
+from dataclasses import dataclass, field
+import numpy as np
+import pandas as pd
+from src.application.export_merge import document_key_hashes
+from src.domain.exceptions import ExportValidationError
+from src.infrastructure.csv_export_reader import (COL_EMISSAO, COL_FILIAL, COL_VALOR, DOCUMENT_KEY, ENCODING, REQUIRED_COLUMNS, SEPARATOR,
+                                                ExportCsvReader)
+from src.infrastructure.export_sources import ExportSource
+
+# Relatório das linhas inválidas, gravado na pasta de saída
+REPORT_FILE = "Validacao do export.csv"
+REPORT_COLUMNS = ["Arquivo", "Linha", "Coluna", "Valor", "Problema", "Tipo"]
+
+# Gravidade: erro interrompe a execução, aviso só fica no relatório
+SEVERITY_ERROR = "erro"
+SEVERITY_WARNING = "aviso"
+
+# Linhas listadas na mensagem de erro (o relatório tem todas)
+MESSAGE_LINES = 10
+
+
+@dataclass
+class PreflightReport:
+    """Resultado da validação de todos os exports da execução"""
+    rows: int = 0
+    issues: pd.DataFrame = field(default_factory=lambda: pd.DataFrame(columns=REPORT_COLUMNS))
+
+    @property
+    def errors(self) -> int:
+        return int((self.issues["Tipo"] == SEVERITY_ERROR).sum())
+
+    @property
+    def warnings(self) -> int:
+        return int((self.issues["Tipo"] == SEVERITY_WARNING).sum())
+
+    @property
+    def ok(self) -> bool:
+        return self.errors == 0
+
+    def summary(self) -> str:
+        """Quantidade por problema e as primeiras linhas com erro"""
+        erros = self.issues[self.issues["Tipo"] == SEVERITY_ERROR]
+        linhas = f" em {self.rows} linha(s)" if self.rows else ""
+        texto = f"Export inválido: {len(erros)} erro(s){linhas}; nada foi gerado nem enviado."
+        for problema, quantidade in erros["Problema"].value_counts(sort=True).items():
+            texto += f"\n  {problema}: {quantidade}"
+        for linha in erros.head(MESSAGE_LINES).itertuples(index=False):
+            texto += f"\n  {linha.Arquivo}, linha {linha.Linha}, {linha.Coluna}: {linha.Problema} ({linha.Valor})"
+        if len(erros) > MESSAGE_LINES:
+            texto += f"\n  ... e mais {len(erros) - MESSAGE_LINES}"
+        return texto
+
+    def save(self, path: str):
+        """Grava todas as linhas com problema em CSV (mesmo formato do export)"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.issues.to_csv(path, sep=SEPARATOR, encoding=ENCODING, index=False)
+
+
+class ExportPreflight:
+    """Valida os exports durante a leitura, bloco a bloco, com operações vetorizadas
+
+    Colunas obrigatórias, Loja vazia ou não numérica, Dt. Emissão e Vlr. Documento preenchidos mas inválidos
+    e documento repetido no mesmo arquivo (aviso por padrão, já que a junção dos exports mantém essas linhas; erro com
+    duplicates=SEVERITY_ERROR). Datas e valores vazios continuam aceitos. Seguro entre threads (read_many valida os
+    arquivos ao mesmo tempo).
+    """
+
+    def __init__(self, duplicates: str = SEVERITY_WARNING):
+        self.duplicates = duplicates
+        self._lock = threading.Lock()
+        self._rows = 0
+        self._issues = []
+        # Hashes da chave do documento por arquivo, na ordem das linhas (repetições só são conhecidas no fim)
+        self._keys = {}
+
+    def check(self, source: str, df: pd.DataFrame, texts: dict, start: int = 0):
+        """Valida um bloco já convertido; texts traz o texto original das colunas convertidas e start as linhas já lidas"""
+        # Linha no arquivo: cabeçalho é a linha 1
+        linhas = np.arange(start + 2, start + 2 + len(df))
+        problemas = []
+
+        if start == 0:
+            self.check_columns(source, [col for col in REQUIRED_COLUMNS if col not in df.columns])
+
+        if COL_FILIAL in df.columns:
+            problemas.extend(self._check_branch(source, df[COL_FILIAL], linhas))
+
+        for coluna, problema in ((COL_EMISSAO, "Data de emissão inválida"), (COL_VALOR, "Valor inválido")):
+            texto = texts.get(coluna)
+            if texto is None or coluna not in df.columns:
+                continue
+            # Preenchido no arquivo mas sem conversão: vazio continua permitido (o texto só é olhado nas linhas sem conversão)
+            invalidos = df[coluna].isna().to_numpy() & texto.notna().to_numpy()
+            if invalidos.any():
+                invalidos[invalidos] = (texto[invalidos].str.strip() != "").to_numpy()
+            if invalidos.any():
+                problemas.append(self._issues_frame(source, linhas[invalidos], coluna, texto[invalidos], problema))
+
+        with self._lock:
+            self._rows += len(df)
+            self._issues.extend(problemas)
+            blocos = self._keys.setdefault(source, []) if all(col in df.columns for col in DOCUMENT_KEY) else None
+        if blocos is None:
+            return
+        # Arquivo lido inteiro fica com as colunas da chave; em blocos, só com os hashes (cada arquivo é lido por uma thread)
+        blocos.append(df[DOCUMENT_KEY])
+        if len(blocos) > 1:
+            blocos[:] = [self._hashes(bloco) for bloco in blocos]
+
+    def check_columns(self, source: str, missing: list[str]):
+        """Registra as colunas obrigatórias ausentes no cabeçalho do arquivo (missing_columns do leitor)"""
+        if not missing:
+            return
+        with self._lock:
+            self._issues.append(self._issues_frame(source, np.array([1]), ", ".join(missing), pd.Series([""]), "Colunas obrigatórias ausentes"))
+
+    def finish(self) -> PreflightReport:
+        """Junta os problemas de todos os blocos, incluindo os documentos repetidos"""
+        problemas = list(self._issues)
+        for source, blocos in self._keys.items():
+            if len(blocos) == 1 and not blocos[0].duplicated().any():
+                continue
+            chaves = np.concatenate([self._hashes(bloco) for bloco in blocos])
+            repetidas = pd.Series(chaves).duplicated(keep="first").to_numpy()
+            if not repetidas.any():
+                continue
+            # Aponta a primeira ocorrência de cada documento repetido
+            _, primeiras, posicao = np.unique(chaves, return_index=True, return_inverse=True)
+            primeira = primeiras[posicao]
+            linhas = np.flatnonzero(repetidas) + 2
+            origem = pd.Series(primeira[repetidas] + 2).map(lambda linha: f"igual à linha {linha}")
+            problemas.append(self._issues_frame(source, linhas, ", ".join(DOCUMENT_KEY), origem, "Documento repetido no arquivo",
+                                                self.duplicates))
+
+        # As colunas da chave guardadas não são mais necessárias
+        self._keys = {}
+        issues = pd.concat(problemas, ignore_index=True) if problemas else pd.DataFrame(columns=REPORT_COLUMNS)
+        return PreflightReport(self._rows, issues.sort_values(["Arquivo", "Linha"], kind="stable", ignore_index=True))
+
+    def _check_branch(self, source: str, lojas: pd.Series, linhas: np.ndarray) -> list:
+        """Loja vazia ou não numérica (verificada nos valores distintos, que são poucos)"""
+        distintas = pd.Series(lojas.dropna().unique(), dtype=object)
+        aparadas = distintas.str.strip()
+        brancas = distintas[aparadas == ""]
+        invalidas = distintas[pd.to_numeric(aparadas, errors="coerce").isna() & (aparadas != "")]
+
+        problemas = []
+        vazias = (lojas.isna() | lojas.isin(brancas)).to_numpy()
+        if vazias.any():
+            problemas.append(self._issues_frame(source, linhas[vazias], COL_FILIAL, pd.Series([""] * int(vazias.sum())), "Loja vazia"))
+        if len(invalidas):
+            selecao = lojas.isin(invalidas).to_numpy()
+            problemas.append(self._issues_frame(source, linhas[selecao], COL_FILIAL, lojas[selecao], "Loja não numérica"))
+        return problemas
+
+    @staticmethod
+    def _hashes(bloco) -> np.ndarray:
+        """Hashes da chave de um bloco (que pode já estar convertido)"""
+        return bloco if isinstance(bloco, np.ndarray) else document_key_hashes(bloco)
+
+    @staticmethod
+    def _issues_frame(source: str, linhas: np.ndarray, coluna: str, valores: pd.Series, problema: str,
+                      tipo: str = SEVERITY_ERROR) -> pd.DataFrame:
+        """Uma linha do relatório por linha do arquivo com o mesmo problema"""
+        return pd.DataFrame({
+            "Arquivo": source,
+            "Linha": linhas,
+            "Coluna": coluna,
+            "Valor": valores.astype(str).to_numpy(),
+            "Problema": problema,
+            "Tipo": tipo,
+        }, columns=REPORT_COLUMNS)
+
+
+def create_export_preflight(settings):
+    """Validação prévia conforme o .env (PREFLIGHT_ENABLED e PREFLIGHT_DUPLICATES); None quando desativada"""
+    if (settings.PREFLIGHT_ENABLED or "true").strip().lower() not in ("1", "true", "sim", "yes"):
+        return None
+
+    duplicados = (settings.PREFLIGHT_DUPLICATES or SEVERITY_WARNING).strip().lower()
+    if duplicados not in (SEVERITY_ERROR, SEVERITY_WARNING):
+        raise ValueError(f"PREFLIGHT_DUPLICATES inválido: {duplicados} (use {SEVERITY_ERROR} ou {SEVERITY_WARNING})")
+    return ExportPreflight(duplicates=duplicados)
+
+
+def check_required_columns(reader: ExportCsvReader, sources: list[ExportSource], output_base: str):
+    """Confere o cabeçalho de todos os exports antes de ler qualquer linha (a leitura em blocos depende dessas colunas)"""
+    preflight = ExportPreflight()
+    for fonte in sources:
+        preflight.check_columns(fonte.name, reader.missing_columns(fonte))
+    enforce_preflight(preflight, output_base)
+
+
+def enforce_preflight(preflight: ExportPreflight, output_base: str) -> PreflightReport:
+    """Grava o relatório quando há problemas e interrompe a execução se algum deles for erro"""
+    report = preflight.finish()
+    caminho = os.path.join(output_base, REPORT_FILE)
+    if len(report.issues) == 0:
+        # Relatório de uma execução anterior não vale mais para este export
+        if os.path.exists(caminho):
+            os.remove(caminho)
+        return report
+
+    report.save(caminho)
+    if not report.ok:
+        raise ExportValidationError(f"{report.summary()}\nRelatório da validação: {caminho}", caminho)
+    print(f"Validação do export: {report.warnings} aviso(s) (detalhes em {caminho})")
+    return report
@@ -0,0 +1,31 @@
+import pandas as pd
+
+# Colunas com muitos valores repetidos que passam a ser armazenadas como categoria
+CATEGORICAL_COLUMNS = ["Loja", "CNPJ", "Fornecedor", "Evento", "Mod.", "Série"]
+
+
+def memory_footprint(df: pd.DataFrame) -> int:
+    """Retorna o uso de memória do DataFrame em bytes (incluindo o conteúdo dos textos)"""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def format_bytes(size: int) -> str:
+    """Formata um tamanho em bytes para leitura (ex.: 12,3 MB)"""
+    valor = float(size)
+    for unidade in ("B", "KB", "MB", "GB"):
+        if valor < 1024 or unidade == "GB":
+            return f"{valor:,.1f} {unidade}".replace(",", "X").replace(".", ",").replace("X", ".")
+        valor /= 1024
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Converte colunas repetitivas em categoria e reduz os inteiros ao menor tipo possível"""
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+
+    # Vlr. Documento continua float64: float32 perderia os centavos em valores altos
+    for col in df.select_dtypes(include="integer").columns:
+        df[col] = pd.to_numeric(df[col], downcast="integer")
+
+    return df
@@ -0,0 +1,255 @@
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List
+from src.application.report_pipeline import STAGE_CANCELLED, STAGE_ERROR, PipelineEvent, ReportPipeline
+from src.infrastructure.csv_export_reader import ExportCsvReader
+from src.infrastructure.export_sources import EXPORT_SUFFIXES, resolve_sources
+
+# Pastas de destino dentro da entrada quando não configuradas
+ARCHIVE_DIR_NAME = "processados"
+ERROR_DIR_NAME = "erros"
+
+DEFAULT_POLL_SECONDS = 5
+DEFAULT_SETTLE_SECONDS = 30
+
+
+@dataclass
+class _PendingFile:
+    """Tamanho e data do arquivo na última verificação e desde quando estão iguais"""
+    size: int
+    mtime: float
+    stable_since: float
+
+
+class InboxWatcher:
+    """Vigia uma pasta de entrada e processa cada export novo (planilhas e envio) assim que termina de ser gravado
+
+    Um arquivo só é processado depois de ficar settle_seconds com o mesmo tamanho e data, sem bloqueio de escrita e
+    com o conteúdo íntegro. Exports de uma subpasta da entrada vão para a subpasta de mesmo nome da saída; até
+    workers exports são processados ao mesmo tempo, mas nunca dois na mesma pasta de saída (manifesto e planilhas
+    das filiais são da pasta). Depois do processamento o arquivo vai para archive_dir, ou para error_dir com um
+    .erro.txt ao lado; cancelados ficam na entrada para a próxima execução.
+    """
+
+    def __init__(self, inbox: str, output_base: str, pipeline_factory: Callable[[], ReportPipeline], archive_dir: str = None,
+                 error_dir: str = None, poll_seconds: float = DEFAULT_POLL_SECONDS, settle_seconds: float = DEFAULT_SETTLE_SECONDS,
+                 workers: int = 1, force: bool = False):
+        self.inbox = os.path.abspath(inbox)
+        self.output_base = output_base
+        self.archive_dir = os.path.abspath(archive_dir or os.path.join(inbox, ARCHIVE_DIR_NAME))
+        self.error_dir = os.path.abspath(error_dir or os.path.join(inbox, ERROR_DIR_NAME))
+        self._pipeline_factory = pipeline_factory
+        self._poll_seconds = poll_seconds
+        self._settle_seconds = settle_seconds
+        self._workers = max(1, workers)
+        self._force = force
+        self._reader = ExportCsvReader()
+
+        self._pending: Dict[str, _PendingFile] = {}
+        # Arquivos que não puderam sair da entrada: só voltam a ser tentados se forem alterados
+        self._rejected: Dict[str, tuple] = {}
+        self._running: Dict[str, ReportPipeline] = {}
+        self._folder_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def run(self, stop_event: threading.Event = None, once: bool = False):
+        """Vigia a entrada até stop_event (ou stop()); com once termina quando não houver mais arquivos a processar"""
+        self._stop = stop_event or self._stop
+        os.makedirs(self.inbox, exist_ok=True)
+        self._log(f"Vigiando {self.inbox} (saída: {self.output_base})")
+
+        with ThreadPoolExecutor(max_workers=self._workers) as executor:
+            try:
+                while not self._stop.is_set():
+                    for path in self.scan():
+                        with self._lock:
+                            self._running[path] = None
+                        executor.submit(self._process, path)
+                    with self._lock:
+                        ocioso = not self._pending and not self._running
+                    if once and ocioso:
+                        break
+                    self._stop.wait(self._poll_seconds)
+            finally:
+                # Execuções em andamento param na próxima filial; o que não começou fica na entrada
+                self._stop.set()
+                with self._lock:
+                    for pipeline in self._running.values():
+                        if pipeline is not None:
+                            pipeline.cancel()
+                executor.shutdown(wait=True, cancel_futures=True)
+
+    def stop(self):
+        """Pede o encerramento do run()"""
+        self._stop.set()
+
+    def scan(self) -> List[str]:
+        """Atualiza o estado dos arquivos da entrada e devolve os que estão prontos para processar"""
+        agora = time.monotonic()
+        with self._lock:
+            em_andamento = set(self._running)
+
+        vistos = {}
+        for path in self._list_exports():
+            if path in em_andamento:
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            assinatura = (stat.st_size, stat.st_mtime)
+            if self._rejected.get(path) == assinatura:
+                continue
+            anterior = self._pending.get(path)
+            if anterior is not None and (anterior.size, anterior.mtime) == assinatura:
+                vistos[path] = anterior
+            else:
+                vistos[path] = _PendingFile(stat.st_size, stat.st_mtime, agora)
+
+        prontos = []
+        for path, arquivo in list(vistos.items()):
+            # Arquivo vazio ou ainda mudando de tamanho continua sendo gravado
+            if not arquivo.size or agora - arquivo.stable_since < self._settle_seconds:
+                continue
+            try:
+                if not self._check_export(path):
+                    continue
+            except Exception as e:
+                del vistos[path]
+                self._finish(path, self.error_dir, f"Export inválido: {e}")
+                continue
+            del vistos[path]
+            prontos.append(path)
+
+        with self._lock:
+            self._pending = vistos
+        return prontos
+
+    def _list_exports(self) -> List[str]:
+        """Exports na entrada e em suas subpastas diretas (exceto as de processados e erros)"""
+        pastas = [self.inbox]
+        for nome in sorted(os.listdir(self.inbox)):
+            caminho = os.path.join(self.inbox, nome)
+            if os.path.isdir(caminho) and not nome.startswith(".") and caminho not in (self.archive_dir, self.error_dir):
+                pastas.append(caminho)
+
+        arquivos = []
+        for pasta in pastas:
+            for nome in sorted(os.listdir(pasta)):
+                caminho = os.path.join(pasta, nome)
+                if nome.lower().endswith(EXPORT_SUFFIXES) and os.path.isfile(caminho):
+                    arquivos.append(caminho)
+        return arquivos
+
+    def _check_export(self, path: str) -> bool:
+        """True se o export está completo; False se outro programa ainda o mantém aberto. Conteúdo inválido gera exceção"""
+        try:
+            # O ERP mantém o arquivo bloqueado para escrita enquanto grava (Windows)
+            with open(path, "r+b"):
+                pass
+        except PermissionError:
+            return False
+
+        for fonte in resolve_sources(path):
+            fonte.verify()
+            faltando = self._reader.missing_columns(fonte)
+            if faltando:
+                raise ValueError(f"{fonte.name} sem as colunas {', '.join(faltando)}")
+        return True
+
+    def _process(self, path: str):
+        """Processa um export na pasta de saída correspondente e move o arquivo conforme o resultado"""
+        saida = self._output_for(path)
+        try:
+            with self._folder_lock(saida):
+                if self._stop.is_set():
+                    return
+                pipeline = self._pipeline_factory()
+                with self._lock:
+                    self._running[path] = pipeline
+                    if self._stop.is_set():
+                        pipeline.cancel()
+                self._log(f"Processando {path} -> {saida}")
+                evento = pipeline.run(path, saida, force=self._force)
+            self._conclude(path, evento)
+        except Exception as e:
+            self._finish(path, self.error_dir, f"Erro ao processar: {e}")
+        finally:
+            with self._lock:
+                self._running.pop(path, None)
+
+    def _conclude(self, path: str, evento: PipelineEvent):
+        """Arquiva o export concluído; com erro ou filiais com falha ele vai para a pasta de erros"""
+        if evento.stage == STAGE_CANCELLED:
+            self._log(f"Cancelado: {path} continua na entrada")
+            return
+
+        falhas = evento.result.failures if evento.result is not None else {}
+        if evento.stage == STAGE_ERROR or falhas:
+            detalhes = [evento.message] + [f"Filial {branch}: {erro}" for branch, erro in falhas.items()]
+            self._finish(path, self.error_dir, "\n".join(detalhes))
+        else:
+            self._log(f"Concluído: {path}\n{evento.message}")
+            self._finish(path, self.archive_dir)
+
+    def _finish(self, path: str, pasta: str, erro: str = None):
+        """Move o export para a pasta de destino (mesma subpasta da entrada) e grava o erro ao lado, se houver"""
+        destino = os.path.join(pasta, os.path.relpath(path, self.inbox))
+        try:
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            if os.path.exists(destino):
+                base, extensao = os.path.splitext(destino)
+                destino = f"{base}_{datetime.now():%Y%m%d_%H%M%S}{extensao}"
+            shutil.move(path, destino)
+        except Exception as e:
+            stat = os.stat(path) if os.path.exists(path) else None
+            if stat is not None:
+                self._rejected[path] = (stat.st_size, stat.st_mtime)
+            self._log(f"Erro ao mover {path}: {e}")
+            destino = path
+
+        if erro:
+            self._log(f"Erro: {path} -> {destino}\n{erro}")
+            try:
+                with open(f"{destino}.erro.txt", "w", encoding="utf-8") as f:
+                    f.write(erro)
+            except OSError as e:
+                self._log(f"Erro ao gravar {destino}.erro.txt: {e}")
+
+    def _output_for(self, path: str) -> str:
+        """Pasta de saída do export: a subpasta de mesmo nome da dele na entrada"""
+        subpasta = os.path.dirname(os.path.relpath(path, self.inbox))
+        return os.path.join(self.output_base, subpasta) if subpasta else self.output_base
+
+    def _folder_lock(self, pasta: str) -> threading.Lock:
+        """Lock da pasta de saída (um export por vez em cada pasta)"""
+        with self._lock:
+            return self._folder_locks.setdefault(os.path.abspath(pasta), threading.Lock())
+
+    def _log(self, mensagem: str):
+        print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {mensagem}", flush=True)
+
+
+def create_inbox_watcher(settings, pipeline_factory: Callable[[], ReportPipeline], inbox: str = None, output_base: str = None,
+                         **opcoes) -> InboxWatcher:
+    """Cria o vigia com os parâmetros do .env (WATCH_*); argumentos informados têm prioridade"""
+    inbox = inbox or settings.WATCH_INBOX
+    output_base = output_base or settings.WATCH_OUTPUT
+    if not inbox or not output_base:
+        raise ValueError("Informe a pasta de entrada e a de saída (ou WATCH_INBOX e WATCH_OUTPUT no .env)")
+
+    padroes = {
+        "archive_dir": settings.WATCH_ARCHIVE_DIR or None,
+        "error_dir": settings.WATCH_ERROR_DIR or None,
+        "poll_seconds": float(settings.WATCH_POLL_SECONDS or DEFAULT_POLL_SECONDS),
+        "settle_seconds": float(settings.WATCH_SETTLE_SECONDS or DEFAULT_SETTLE_SECONDS),
+        "workers": int(settings.WATCH_WORKERS or 1),
+    }
+    padroes.update({chave: valor for chave, valor in opcoes.items() if valor is not None})
+    return InboxWatcher(inbox, output_base, pipeline_factory, **padroes)
@@ -0,0 +1,35 @@
+from html import escape
+from typing import Dict, Iterable, Tuple
+import pandas as pd
+from src.application.branch_aggregator import COL_MES, COL_QTD_MES
+
+# Mesma marcação que DataFrame.to_html(index=False, border=0, justify="center", classes="table", table_id="tabela_mes")
+_TABLE_HEAD = (
+    '<table class="dataframe table" id="tabela_mes">\n'
+    '  <thead>\n'
+    '    <tr style="text-align: center;">\n'
+    f'      <th>{escape(COL_MES)}</th>\n'
+    f'      <th>{escape(COL_QTD_MES)}</th>\n'
+    '    </tr>\n'
+    '  </thead>\n'
+    '  <tbody>\n'
+)
+_TABLE_ROW = '    <tr>\n      <td>{}</td>\n      <td>{}</td>\n    </tr>\n'
+_TABLE_TAIL = '  </tbody>\n</table>'
+
+
+def render_monthly_table(rows: Iterable[Tuple[str, int]]) -> str:
+    """Monta a tabela HTML de quantidade por mês a partir de pares (mês, quantidade)"""
+    corpo = "".join(_TABLE_ROW.format(escape(str(mes)), int(quantidade)) for mes, quantidade in rows)
+    return _TABLE_HEAD + corpo + _TABLE_TAIL
+
+
+def render_monthly_tables(monthly: pd.DataFrame) -> Dict[str, str]:
+    """Monta as tabelas de todas as filiais em uma passada pela matriz filial x mês (só meses com documentos)"""
+    meses = [str(mes) for mes in monthly.columns]
+    valores = monthly.to_numpy()
+
+    tabelas = {}
+    for filial, linha in zip(monthly.index, valores):
+        tabelas[str(filial)] = render_monthly_table((meses[i], linha[i]) for i in linha.nonzero()[0])
+    return tabelas
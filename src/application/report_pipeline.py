@@ -0,0 +1,160 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from src.application.send_queue import ALREADY_SENT, CANCELLED, FAILED, SENT, UNCHANGED, run_key_for
+from src.domain.entities import BranchReport, SendStatus
+from src.domain.exceptions import OperationCancelled
+from src.infrastructure.config.settings import Settings
+from src.infrastructure.instrumentation import RunTracer, save_run_report
+from src.infrastructure.run_manifest import RunManifest
+
+# Etapas informadas nos eventos do pipeline
+STAGE_READING = "leitura"
+STAGE_WORKBOOKS = "planilhas"
+STAGE_SENDING = "envio"
+STAGE_FINISHED = "concluido"
+STAGE_CANCELLED = "cancelado"
+STAGE_ERROR = "erro"
+
+# Etapas que encerram a execução
+FINAL_STAGES = (STAGE_FINISHED, STAGE_CANCELLED, STAGE_ERROR)
+
+
+@dataclass
+class PipelineEvent:
+    stage: str
+    done: int = 0
+    total: int = 0
+    branch: Optional[str] = None
+    message: str = ""
+    timestamp: float = field(default_factory=time.monotonic)
+    result: Optional["PipelineResult"] = None
+
+
+@dataclass
+class PipelineResult:
+    reports: List[BranchReport]
+    status: Dict[str, SendStatus]
+    summary_path: Optional[str] = None
+
+    @property
+    def failures(self) -> Dict[str, str]:
+        """Filiais com erro na geração da planilha ou no envio"""
+        falhas = {report.branch: report.error for report in self.reports if report.error}
+        falhas.update({branch: envio.error for branch, envio in self.status.items() if envio.status == FAILED})
+        return falhas
+
+    def count(self, estado: str) -> int:
+        """Quantidade de filiais com o estado de envio informado"""
+        return sum(1 for envio in self.status.values() if envio.status == estado)
+
+    def summary(self) -> str:
+        """Resumo em texto para exibir ao usuário"""
+        resumo = f"Enviados: {self.count(SENT)}"
+        if self.count(ALREADY_SENT):
+            resumo += f"\nJá enviados anteriormente: {self.count(ALREADY_SENT)}"
+        if self.count(UNCHANGED):
+            resumo += f"\nSem alteração desde o último envio: {self.count(UNCHANGED)}"
+        deltas = [report.delta for report in self.reports if report.delta is not None]
+        if deltas:
+            resumo += (f"\nDocumentos novos: {sum(d.new for d in deltas)} | resolvidos: {sum(d.resolved for d in deltas)}"
+                       f" | antigos: {sum(d.aging for d in deltas)}")
+        if self.count(CANCELLED):
+            resumo += f"\nNão enviados (cancelado): {self.count(CANCELLED)}"
+        if self.summary_path:
+            resumo += f"\nResumo consolidado: {self.summary_path}"
+        return resumo
+
+
+class ReportPipeline:
+    """Executa geração das planilhas e envio dos e-mails em uma thread separada, publicando o andamento em uma fila"""
+
+    def __init__(self, spreadsheet_service, send_queue, email_sender):
+        self._spreadsheet_service = spreadsheet_service
+        self._send_queue = send_queue
+        self._email_sender = email_sender
+
+        self.events = queue.Queue()
+        self.cancel_event = threading.Event()
+        self._thread = None
+
+    def start(self, csv_path: str, output_base: str, force: bool = False):
+        """Inicia a execução em segundo plano; o andamento chega em self.events"""
+        self._thread = threading.Thread(target=self.run, args=(csv_path, output_base, force), daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """Pede o cancelamento; a execução para na próxima filial"""
+        self.cancel_event.set()
+
+    def is_running(self) -> bool:
+        """Indica se a thread de execução ainda está ativa"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def run(self, csv_path: str, output_base: str, force: bool = False) -> PipelineEvent:
+        """Gera as planilhas e envia os e-mails, sempre terminando com um evento final na fila (também devolvido)
+
+        Com force=False filiais cujo conteúdo já foi enviado (manifesto da pasta de saída) não são geradas nem enviadas.
+        """
+        tracer = RunTracer("envio")
+        tracer.attributes.update({"csv_path": csv_path, "output_base": output_base, "force": force})
+        resultado = None
+        try:
+            self._emit(STAGE_READING, message="Lendo arquivo...")
+            reports = self._spreadsheet_service.execute(
+                csv_path, output_base,
+                progress=lambda done, total, branch: self._emit(STAGE_WORKBOOKS, done, total, branch),
+                cancel_event=self.cancel_event,
+                tracer=tracer,
+                force=force,
+                record_history=True
+            )
+            if self.cancel_event.is_set():
+                raise OperationCancelled("Processamento cancelado pelo usuário")
+
+            # O manifesto evita reenviar filiais sem alteração; a caixa de saída permite retomar a execução
+            manifest = RunManifest(output_base)
+            geradas = [report for report in reports if not report.error]
+            inalteradas = {report.branch for report in geradas if not force and manifest.is_sent(report.branch, report.fingerprint)}
+            pendentes = [report for report in geradas if report.branch not in inalteradas]
+            self._emit(STAGE_SENDING, 0, len(pendentes), message="Enviando e-mails...")
+            try:
+                status = self._send_queue.execute(
+                    pendentes, run_key_for(csv_path, output_base),
+                    progress=lambda done, total, branch: self._emit(STAGE_SENDING, done, total, branch),
+                    cancel_event=self.cancel_event,
+                    tracer=tracer
+                )
+            finally:
+                self._email_sender.close()
+
+            for report in pendentes:
+                if status[report.branch].status in (SENT, ALREADY_SENT):
+                    manifest.mark_sent(report.branch, report.fingerprint)
+            manifest.save()
+            status.update({branch: SendStatus(branch, UNCHANGED) for branch in inalteradas})
+            status = {report.branch: status[report.branch] for report in geradas}
+
+            resultado = PipelineResult(reports, status, self._spreadsheet_service.summary_path)
+            etapa = STAGE_CANCELLED if self.cancel_event.is_set() else STAGE_FINISHED
+            mensagem = resultado.summary()
+            tracer.attributes.update({"branches": len(reports), "failures": len(resultado.failures), "unchanged": len(inalteradas)})
+        except OperationCancelled as e:
+            etapa, mensagem = STAGE_CANCELLED, str(e)
+        except Exception as e:
+            print("Erro ao processar o arquivo:", e)
+            etapa, mensagem = STAGE_ERROR, str(e)
+
+        tracer.finish(etapa)
+        caminho = save_run_report(tracer, Settings())
+        if caminho:
+            print(f"Relatório da execução: {caminho}")
+        return self._emit(etapa, message=mensagem, result=resultado)
+
+    def _emit(self, stage: str, done: int = 0, total: int = 0, branch: str = None, message: str = "", result=None) -> PipelineEvent:
+        """Publica um evento na fila (segura entre threads)"""
+        evento = PipelineEvent(stage, done, total, branch, message, result=result)
+        self.events.put(evento)
+        return evento
@@ -0,0 +1,71 @@
+import os
+from typing import Dict
+import pandas as pd
+from src.application.branch_aggregator import COL_FILIAL, COL_MES, BranchAggregates
+from src.domain.entities import BranchReport
+
+# Abas do resumo consolidado
+SHEET_BRANCHES = "Filiais"
+SHEET_NETWORK = "Rede"
+
+# Situação da planilha de cada filial
+STATUS_GENERATED = "gerada"
+STATUS_UNCHANGED = "sem alteração"
+STATUS_ERROR = "erro"
+
+
+def summary_workbook_path(output_base: str, period_final: pd.Timestamp) -> str:
+    """Caminho do resumo da execução: <saída>/Resumo <MMAAAA>.xlsx"""
+    sufixo = f" {period_final.strftime('%m%Y')}" if pd.notna(period_final) else ""
+    return os.path.join(output_base, f"Resumo{sufixo}.xlsx")
+
+
+def build_summary_sheets(aggregates: BranchAggregates, reports: list[BranchReport]) -> Dict[str, pd.DataFrame]:
+    """Monta as abas do resumo a partir dos agregados já calculados, sem voltar aos documentos
+
+    Filiais: uma linha por filial com quantidade, total, emissão mais antiga, situação da planilha, diferenças do
+    histórico (quando houver) e a quantidade de cada mês. Rede: quantidade e filiais com documentos por mês.
+    """
+    resumo = aggregates.summary
+    mensal = aggregates.monthly.reindex(resumo.index, fill_value=0)
+    meses = [str(mes) for mes in mensal.columns]
+    por_filial = {report.branch: report for report in reports}
+
+    filiais = pd.DataFrame({
+        COL_FILIAL: resumo.index.astype(str),
+        "Quantidade": resumo["quantidade"].to_numpy(),
+        "Valor Total": resumo["valor_total"].round(2).to_numpy(),
+        "Emissão mais antiga": resumo["emissao_inicial"].to_numpy(),
+        "Situação": [_status(por_filial.get(str(filial))) for filial in resumo.index],
+    })
+    if any(report.delta is not None for report in reports):
+        deltas = [por_filial[str(filial)].delta if str(filial) in por_filial else None for filial in resumo.index]
+        filiais["Novos"] = pd.array([delta.new if delta else None for delta in deltas], dtype="Int64")
+        filiais["Resolvidos"] = pd.array([delta.resolved if delta else None for delta in deltas], dtype="Int64")
+        filiais["Antigos"] = pd.array([delta.aging if delta else None for delta in deltas], dtype="Int64")
+    filiais = pd.concat([filiais, pd.DataFrame(mensal.to_numpy(), columns=meses)], axis=1)
+
+    quantidade = int(resumo["quantidade"].sum())
+    rede = pd.DataFrame({
+        COL_MES: meses,
+        "Quantidade": mensal.sum().to_numpy(),
+        "Filiais com documentos": (mensal > 0).sum().to_numpy(),
+    })
+    # Documentos sem data de emissão não entram em nenhum mês
+    sem_data = quantidade - int(rede["Quantidade"].sum())
+    if sem_data:
+        rede.loc[len(rede)] = ["Sem data", sem_data, None]
+    rede.loc[len(rede)] = ["Total", quantidade, len(resumo)]
+    rede["Filiais com documentos"] = rede["Filiais com documentos"].astype("Int64")
+    rede["Participação (%)"] = (rede["Quantidade"] / max(quantidade, 1) * 100).round(2)
+
+    return {SHEET_BRANCHES: filiais, SHEET_NETWORK: rede}
+
+
+def _status(report: BranchReport) -> str:
+    """Situação da planilha da filial nesta execução"""
+    if report is None:
+        return ""
+    if report.error:
+        return f"{STATUS_ERROR}: {report.error}"
+    return STATUS_UNCHANGED if report.unchanged else STATUS_GENERATED
@@ -0,0 +1,143 @@
+import hashlib
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from src.domain.entities import BranchReport, OutgoingEmail, SendStatus
+from src.infrastructure.config.settings import Settings
+from src.infrastructure.email_sender import NO_RECIPIENTS, SendEmail, has_recipients
+from src.infrastructure.export_sources import resolve_sources
+from src.infrastructure.instrumentation import RunTracer
+from src.infrastructure.outbox import Outbox
+
+# Estados devolvidos por filial
+SENT = "enviado"
+ALREADY_SENT = "já enviado"
+FAILED = "falha"
+CANCELLED = "cancelado"
+UNCHANGED = "sem alteração"
+
+
+def run_key_for(csv_path, output_base: str) -> str:
+    """Identifica a execução pelos arquivos de origem (nome, tamanho, data) e pela pasta de saída"""
+    arquivos = ";".join(fonte.signature() for fonte in resolve_sources(csv_path))
+    origem = f"{arquivos}|{os.path.abspath(output_base)}"
+    return hashlib.sha1(origem.encode("utf-8")).hexdigest()
+
+
+class RateLimiter:
+    """Limita a quantidade de envios por minuto entre todas as threads"""
+
+    def __init__(self, per_minute: float):
+        self._interval = 60.0 / per_minute if per_minute and per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Bloqueia até o próximo envio ser permitido"""
+        if not self._interval:
+            return
+        with self._lock:
+            agora = time.monotonic()
+            horario = max(agora, self._next)
+            self._next = horario + self._interval
+        if horario > agora:
+            time.sleep(horario - agora)
+
+
+class SendQueue:
+    """Fila de envio com concorrência limitada, limite de taxa, novas tentativas e retomada pela caixa de saída"""
+
+    def __init__(self, sender: SendEmail, outbox: Outbox = None, max_workers: int = 1, rate_per_minute: float = 0,
+                 max_attempts: int = 3, backoff_seconds: float = 2.0):
+        self._sender = sender
+        self._outbox = outbox or Outbox()
+        self._max_workers = max(1, max_workers)
+        self._rate_limiter = RateLimiter(rate_per_minute)
+        self._max_attempts = max(1, max_attempts)
+        self._backoff_seconds = backoff_seconds
+
+    def execute(self, reports: List[BranchReport], run_key: str, progress=None, cancel_event=None, tracer: RunTracer = None) -> Dict[str, SendStatus]:
+        """Envia os relatórios ainda não enviados nesta execução e devolve o estado de cada filial
+
+        progress(concluidas, total, filial) é chamado a cada envio finalizado; com cancel_event acionado as filiais
+        restantes ficam como CANCELLED e continuam pendentes na caixa de saída para a próxima retomada.
+        """
+        self._outbox.enqueue(run_key, [report.branch for report in reports])
+        enviados = set(self._outbox.sent_branches(run_key))
+
+        status = {report.branch: SendStatus(report.branch, ALREADY_SENT) for report in reports if report.branch in enviados}
+        pendentes = [report for report in reports if report.branch not in enviados]
+
+        # Corpos de todas as filiais montados de uma vez antes do primeiro envio
+        mensagens = self._sender.build_messages(pendentes, tracer)
+
+        # Mensagens da mesma filial (planilha dividida em partes) são enviadas juntas, em ordem
+        por_filial = {}
+        for message in mensagens:
+            por_filial.setdefault(message.branch, []).append(message)
+
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            resultados = executor.map(lambda grupo: self._send(grupo, run_key, cancel_event, tracer), por_filial.values())
+            for concluidas, resultado in enumerate(resultados, start=len(status) + 1):
+                status[resultado.branch] = resultado
+                if progress is not None:
+                    progress(concluidas, len(reports), resultado.branch)
+
+        return {report.branch: status[report.branch] for report in reports}
+
+    def _send(self, messages: List[OutgoingEmail], run_key: str, cancel_event=None, tracer: RunTracer = None) -> SendStatus:
+        """Envia as mensagens de uma filial, tentando de novo com espera exponencial em falhas temporárias
+
+        Nas novas tentativas as partes já enviadas não são repetidas.
+        """
+        message = messages[0]
+        if not has_recipients(message):
+            print(f"Erro ao enviar e-mail da filial {message.branch}: {NO_RECIPIENTS}")
+            self._outbox.mark_failed(run_key, message.branch, 0, NO_RECIPIENTS)
+            return SendStatus(message.branch, FAILED, 0, NO_RECIPIENTS)
+
+        enviadas = 0
+        tentativa = 0
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                return SendStatus(message.branch, CANCELLED, tentativa)
+
+            tentativa += 1
+            self._outbox.mark_sending(run_key, message.branch, tentativa)
+            try:
+                while enviadas < len(messages):
+                    self._rate_limiter.wait()
+                    self._sender.send_message(messages[enviadas], tracer)
+                    enviadas += 1
+            except Exception as e:
+                if tentativa < self._max_attempts and self._sender.is_transient(e):
+                    espera = self._backoff_seconds * (2 ** (tentativa - 1))
+                    espera += random.uniform(0, espera / 2)
+                    # O cancelamento interrompe a espera; a filial fica pendente na caixa de saída
+                    if cancel_event is not None:
+                        if cancel_event.wait(espera):
+                            return SendStatus(message.branch, CANCELLED, tentativa)
+                    else:
+                        time.sleep(espera)
+                    continue
+
+                print(f"Erro ao enviar e-mail da filial {message.branch}: {e}")
+                self._outbox.mark_failed(run_key, message.branch, tentativa, str(e))
+                return SendStatus(message.branch, FAILED, tentativa, str(e))
+
+            self._outbox.mark_sent(run_key, message.branch, tentativa)
+            return SendStatus(message.branch, SENT, tentativa)
+
+
+def create_send_queue(sender: SendEmail) -> SendQueue:
+    """Cria a fila de envio com os parâmetros do .env (SEND_WORKERS, SEND_RATE_PER_MINUTE, SEND_MAX_ATTEMPTS)"""
+    settings = Settings()
+    return SendQueue(
+        sender,
+        max_workers=int(settings.SEND_WORKERS or 1),
+        rate_per_minute=float(settings.SEND_RATE_PER_MINUTE or 0),
+        max_attempts=int(settings.SEND_MAX_ATTEMPTS or 3),
+    )
@@ -1,102 +1,353 @@
 import pandas as pd
 import os
-from openpyxl import load_workbook
-from src.infrastructure.email_sender import SendEmail
-from src.infrastructure.config_manager import EmailConfigManager
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from src.infrastructure.config.settings import Settings
+from src.infrastructure.partition_spill import BranchPartitionSpill
+from src.infrastructure.csv_export_reader import ExportCsvReader
+from src.infrastructure.export_sources import resolve_sources
 from src.domain.entities import BranchReport
+from src.domain.exceptions import OperationCancelled
+from src.application.frame_compactor import compact_frame, format_bytes, memory_footprint
+from src.application.branch_aggregator import BranchAggregates, BranchAggregator, normalize_branch_codes
+from src.application.monthly_table import render_monthly_table, render_monthly_tables
+from src.application.branch_fingerprint import fingerprint_from_hashes, row_hashes
+from src.application.document_history import create_document_history
+from src.application.export_merge import iter_merged_chunks, merge_exports
+from src.application.export_preflight import check_required_columns, create_export_preflight, enforce_preflight
+from src.application.run_summary import build_summary_sheets, summary_workbook_path
+from src.application.branch_report_builder import (BranchTask, branch_excel_path, build_branch_report, build_branch_reports,
+                                                   failed_branch_report, unchanged_branch_report)
+from src.infrastructure.attachment_policy import create_attachment_policy
+from src.infrastructure.excel_writer import BranchWorkbookWriter, SummaryWorkbookWriter
+from src.infrastructure.instrumentation import NULL_TRACER, STAGE_FINGERPRINT, STAGE_GROUPBY, STAGE_HISTORY, STAGE_MERGE, STAGE_PREFLIGHT, STAGE_PREPARE, STAGE_SUMMARY, RunTracer
+from src.infrastructure.run_manifest import RunManifest
 
 class SpreadsheetService:
     """Serviço para processamento de planilhas e orquestração de envio de e-mails"""
-    
-    def __init__(self):
-        self._sendemail = SendEmail()
-        self._config_manager = EmailConfigManager()
-    
-    def execute(self, csv_path, output_base):
-        """Lê o CSV, gera planilhas por filial e envia e-mails"""
-        # Lê o CSV
-        df = pd.read_csv(csv_path, sep=";", encoding="utf-8", dtype=str)
-
-        df.columns = df.columns.str.strip()
-
-        # Remove coluna Observações se existir
-        if "Observações" in df.columns:
-            df = df.drop(columns=["Observações"])
-
-        # Converte Vlr. Documento para float
-        col_valor = "Vlr. Documento"
-        if col_valor in df.columns:
-            # Substitui '.' por vazio e ',' por '.' para converter em float
-            df[col_valor] = df[col_valor].str.replace('.', '', regex=False).str.replace(',', '.', regex=False).astype(float)
-            # Arredonda para 2 casas decimais
-            df[col_valor] = df[col_valor].round(2)
-
-        df['Dt. Emissão'] = pd.to_datetime(df['Dt. Emissão'], dayfirst=True, errors='coerce')
-
-        periodoInicial = df['Dt. Emissão'].min()
-        periodoFinal = df['Dt. Emissão'].max()
 
+    def __init__(self, workers: int = None, chunk_rows: int = 20_000, streaming_threshold: int = 100_000, csv_chunksize: int = None,
+                 history_dir: str = None):
+        self._aggregator = BranchAggregator()
+        self._reader = ExportCsvReader()
+        self._settings = Settings()
+        # workers <= 1 mantém a geração sequencial no processo atual
+        self._workers = workers if workers is not None else int(self._settings.REPORT_WORKERS or 1)
+        # Filiais pequenas são agrupadas em lotes de até chunk_rows linhas por envio ao pool
+        self._chunk_rows = chunk_rows
+        self._streaming_threshold = streaming_threshold
+        # Quando definido, o CSV é lido em blocos deste tamanho com memória constante
+        self._csv_chunksize = csv_chunksize if csv_chunksize is not None else int(self._settings.CSV_CHUNK_ROWS or 0)
+        # Limite de tamanho dos anexos por e-mail e o que fazer com planilhas acima dele
+        self._attachment_policy = create_attachment_policy(self._settings)
+        # Pasta do arquivo histórico (None = HISTORY_DIR do .env)
+        self._history_dir = history_dir
+        self._progress = None
+        self._cancel_event = None
+        self._tracer = NULL_TRACER
+        self._manifest = None
+        self._force = False
+        self._history = None
+        self._preflight = None
+        self._aggregates = None
+        # Resumo consolidado gravado na última execução (None se não houve filiais ou a gravação falhou)
+        self.summary_path = None
+
+    def execute(self, csv_path, output_base, chunksize: int = None, progress=None, cancel_event=None, tracer: RunTracer = None,
+                force: bool = False, record_history: bool = False):
+        """Lê o CSV, gera planilhas por filial e envia e-mails
+
+        csv_path pode ser um arquivo (.csv, .gz, .zip), uma pasta, um padrão glob ou uma lista deles: os exports
+        são lidos ao mesmo tempo e juntados sem repetir documentos, com um relatório por filial.
+        progress(concluidas, total, filial) é chamado a cada filial gerada; cancel_event (threading.Event)
+        interrompe a execução com OperationCancelled entre uma filial e outra; tracer recebe os spans de cada etapa.
+        Filiais com o mesmo conteúdo da execução anterior na mesma pasta não são regeradas, a menos que force seja True.
+        Ao final grava o resumo de todas as filiais em um arquivo só (summary_path).
+        Os documentos só entram no histórico com record_history (execuções que enviam); cancelamento ou erro na geração
+        descarta o que já tinha sido arquivado.
+        Linhas inválidas no export interrompem a execução com ExportValidationError logo depois da leitura, antes de
+        qualquer planilha ser gravada; o relatório linha a linha fica em "<output_base>/Validacao do export.csv".
+        """
+        self._progress = progress
+        self._cancel_event = cancel_event
+        self._tracer = tracer or NULL_TRACER
+        self._manifest = RunManifest(output_base)
+        self._force = force
+        # Um instantâneo novo do histórico a cada execução que envia (simulações não alteram a última aparição dos documentos)
+        self._history = create_document_history(self._settings, self._history_dir) if record_history else None
+        self._preflight = create_export_preflight(self._settings)
+        self._aggregates = None
+        self.summary_path = None
+
+        fontes = resolve_sources(csv_path)
+        # Coluna obrigatória ausente interrompe antes de qualquer bloco ser lido, agrupado ou gravado
+        with self._tracer.span(STAGE_PREFLIGHT):
+            check_required_columns(self._reader, fontes, output_base)
+        chunksize = chunksize or self._csv_chunksize
+        try:
+            if chunksize:
+                reports = self._execute_streaming(fontes, output_base, chunksize)
+            else:
+                reports = self._execute_in_memory(fontes, output_base)
+        except BaseException:
+            # Geração cancelada ou com erro: o índice não é atualizado e os arquivos já gravados são apagados
+            self._discard_history()
+            raise
+
+        self._record_generated(reports)
+        self._save_history(reports)
+        self._write_summary(reports, output_base)
+        return reports
+
+    def _execute_in_memory(self, fontes, output_base):
+        """Lê os arquivos inteiros e gera as planilhas a partir do DataFrame completo"""
+        # Lê o CSV já com valor e data de emissão convertidos
+        df = self._read_all(fontes, output_base)
+        memoria_inicial = memory_footprint(df)
+        with self._tracer.span(STAGE_PREPARE, rows=len(df)) as span:
+            df = self._prepare_frame(df)
+            span.bytes = memory_footprint(df)
+        print(f"Memória do DataFrame: {format_bytes(memoria_inicial)} -> {format_bytes(span.bytes)}")
+
+        # Calcula quantidade, total e contagem mensal de todas as filiais de uma vez
+        with self._tracer.span(STAGE_GROUPBY, rows=len(df)):
+            agregados = self._aggregator.execute(df)
+
+        # Hashes das linhas calculados de uma vez (fingerprint e histórico de cada filial usam só o seu trecho)
+        with self._tracer.span(STAGE_FINGERPRINT, rows=len(df)):
+            hashes = row_hashes(df)
+
+        # Garante que a pasta de saída exista
+        os.makedirs(output_base, exist_ok=True)
+
+        return self._generate(df.groupby("Loja", sort=True, observed=True), agregados, output_base, hashes)
+
+    def _read_all(self, fontes, output_base) -> pd.DataFrame:
+        """Lê um export ou vários em paralelo, descartando documentos repetidos entre arquivos"""
+        if len(fontes) == 1:
+            df = self._reader.read(fontes[0], tracer=self._tracer, preflight=self._preflight)
+            self._enforce_preflight(output_base)
+            return df
+
+        partes = self._reader.read_many(fontes, tracer=self._tracer, preflight=self._preflight)
+        self._enforce_preflight(output_base)
+        with self._tracer.span(STAGE_MERGE, rows=sum(len(parte) for parte in partes)) as span:
+            df, repetidas = merge_exports(partes)
+            span.rows = len(df)
+        print(f"Arquivos lidos: {len(fontes)} | linhas repetidas entre arquivos descartadas: {repetidas}")
+        return df
+
+    def _execute_streaming(self, fontes, output_base, chunksize: int):
+        """Lê os exports em blocos, separa as linhas por filial em disco e acumula os agregados"""
+        with tempfile.TemporaryDirectory(prefix="cobrancanf_") as spill_dir:
+            spill = BranchPartitionSpill(spill_dir)
+            agregados = None
+
+            for bloco in iter_merged_chunks(self._reader, fontes, chunksize, tracer=self._tracer, preflight=self._preflight):
+                self._check_cancelled()
+                # A compactação fica para a partição carregada: categorias por bloco não se somam no concat
+                with self._tracer.span(STAGE_PREPARE, rows=len(bloco)):
+                    bloco = self._prepare_frame(bloco, compact=False)
+                with self._tracer.span(STAGE_GROUPBY, rows=len(bloco)):
+                    parcial = self._aggregator.execute(bloco)
+                    agregados = parcial if agregados is None else agregados.merge(parcial)
+                spill.append(bloco)
+
+            # Só as partições temporárias foram gravadas até aqui
+            self._enforce_preflight(output_base)
+            if agregados is None:
+                return []
+
+            os.makedirs(output_base, exist_ok=True)
+
+            # Cada partição só é carregada quando a filial for processada
+            grupos = ((filial, compact_frame(spill.load(filial))) for filial in spill.branches())
+            return self._generate(grupos, agregados, output_base)
+
+    def _enforce_preflight(self, output_base):
+        """Interrompe a execução se a validação dos exports encontrou erros (nada foi gravado na saída ainda)"""
+        if self._preflight is None:
+            return
+        with self._tracer.span(STAGE_PREFLIGHT):
+            enforce_preflight(self._preflight, output_base)
+
+    def _prepare_frame(self, df: pd.DataFrame, compact: bool = True) -> pd.DataFrame:
+        """Normaliza as colunas do export (aplicado ao arquivo inteiro ou a cada bloco)"""
         # Verifica o nome exato da coluna da filial
         col_filial = "Loja"
         if col_filial in df.columns:
-            df[col_filial] = df[col_filial].apply(lambda x: f"0{x}" if len(str(int(x))) < 2 else str(x))
+            df[col_filial] = normalize_branch_codes(df[col_filial])
 
-        # Garante que a pasta de saída exista
-        os.makedirs(output_base, exist_ok=True)
+        # Colunas repetitivas como categoria: menos memória e groupby sobre os códigos
+        return compact_frame(df) if compact else df
+
+    def _generate(self, grupos, agregados: BranchAggregates, output_base, hashes: pd.DataFrame = None) -> list[BranchReport]:
+        """Gera um arquivo por filial, em sequência ou no pool de processos"""
+        self._aggregates = agregados
+        tasks = self._iter_tasks(grupos, agregados, output_base, hashes)
+        total_filiais = len(agregados.summary)
+        if self._workers > 1:
+            total_linhas = int(agregados.summary["quantidade"].sum())
+            return self._generate_parallel(tasks, total_linhas, total_filiais)
 
+        writer = BranchWorkbookWriter(streaming_threshold=self._streaming_threshold)
         reports = []
-        # Gera um arquivo por filial
-        for filial, grupo in df.groupby(col_filial):
+        for task in tasks:
+            self._check_cancelled()
+            reports.append(build_branch_report(task, writer, self._tracer, self._attachment_policy))
+            self._notify(len(reports), total_filiais, task.branch)
+        return reports
+
+    def _record_generated(self, reports: list[BranchReport]):
+        """Atualiza o manifesto da pasta de saída com as planilhas geradas nesta execução"""
+        gerados = [report for report in reports if not report.error and not report.unchanged]
+        for report in gerados:
+            self._manifest.mark_generated(report.branch, report.fingerprint, report.excel_path)
+        if gerados:
+            self._manifest.save()
+
+    def _record_history(self, filial: str, grupo: pd.DataFrame, period_final, hashes: pd.DataFrame):
+        """Arquiva os documentos da filial no histórico"""
+        if self._history is None:
+            return
+
+        # Falha no histórico não pode impedir a geração das planilhas
+        try:
+            with self._tracer.span(STAGE_HISTORY, branch=filial, rows=len(grupo)):
+                self._history.record(filial, grupo, period_final, hashes)
+        except Exception as e:
+            print(f"Erro ao gravar o histórico da filial {filial}: {e}")
+
+    def _save_history(self, reports: list[BranchReport]):
+        """Atualiza o índice do histórico e preenche novos, resolvidos e antigos em cada relatório"""
+        if self._history is None:
+            return
+        try:
+            with self._tracer.span(STAGE_HISTORY):
+                deltas = self._history.save()
+        except Exception as e:
+            print(f"Erro ao gravar o índice do histórico: {e}")
+            self._discard_history()
+            return
+        for report in reports:
+            report.delta = deltas.get(report.branch)
+
+    def _discard_history(self):
+        """Apaga os documentos arquivados nesta execução sem atualizar o índice"""
+        if self._history is None:
+            return
+        try:
+            self._history.discard()
+        except Exception as e:
+            print(f"Erro ao descartar o histórico da execução: {e}")
+
+    def _write_summary(self, reports: list[BranchReport], output_base):
+        """Grava o resumo consolidado da execução a partir dos agregados já calculados"""
+        if self._aggregates is None or not reports:
+            return
+
+        caminho = summary_workbook_path(output_base, self._aggregates.period_final)
+        # Falha no resumo não pode impedir o envio das planilhas das filiais
+        try:
+            with self._tracer.span(STAGE_SUMMARY, rows=len(reports)) as span:
+                SummaryWorkbookWriter().execute(build_summary_sheets(self._aggregates, reports), caminho)
+                span.bytes = os.path.getsize(caminho)
+        except Exception as e:
+            print(f"Erro ao gravar o resumo consolidado: {e}")
+            return
+        self.summary_path = caminho
+
+    def _check_cancelled(self):
+        """Interrompe a execução se o cancelamento foi solicitado"""
+        if self._cancel_event is not None and self._cancel_event.is_set():
+            raise OperationCancelled("Processamento cancelado pelo usuário")
+
+    def _notify(self, concluidas: int, total: int, filial: str):
+        """Repassa o andamento para quem chamou execute"""
+        if self._progress is not None:
+            self._progress(concluidas, total, filial)
+
+    def _iter_tasks(self, grupos, agregados: BranchAggregates, output_base, hashes: pd.DataFrame = None):
+        """Cria uma tarefa por filial com os agregados já calculados (hashes: row_hashes do arquivo inteiro, se houver)"""
+        # Tabelas HTML do e-mail montadas de uma vez a partir da matriz mensal
+        tabelas = render_monthly_tables(agregados.monthly)
+        for filial, grupo in grupos:
             filial_str = str(filial)
-            pasta_filial = os.path.join(output_base, filial_str)
-            pasta_periodo = os.path.join(pasta_filial, periodoFinal.strftime("%m%Y"))
-            os.makedirs(pasta_filial, exist_ok=True)
-            os.makedirs(pasta_periodo, exist_ok=True)
-            arquivo_excel = os.path.join(pasta_periodo, f"Pendencias {filial_str}.xlsx")
-            
-            # Salva o arquivo Excel
-            grupo.to_excel(arquivo_excel, index=False, engine="openpyxl")
-            
-            soma_valor = grupo['Vlr. Documento'].sum()
-            soma_formatada = f"{soma_valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
-            grupo['Ano-Mes'] = grupo['Dt. Emissão'].dt.to_period('M')
-            contagem_por_mes = grupo.groupby('Ano-Mes').size().reset_index(name='Quantidade por mês')
-            
-            # Gera tabela HTML para o corpo do e-mail
-            html_table = contagem_por_mes.to_html(
-                index=False,
-                border=0,
-                justify="center",
-                classes="table",
-                table_id="tabela_mes"
-            )
-            grupo = grupo.drop(columns=["Ano-Mes"])
-            
-            # Autoajusta colunas no Excel
-            wb = load_workbook(arquivo_excel)
-            ws = wb.active
-
-            for col in ws.columns:
-                max_length = 0
-                col_letter = col[0].column_letter
-                for cell in col:
-                    if cell.value:
-                        max_length = max(max_length, len(str(cell.value)))
-                ws.column_dimensions[col_letter].width = max_length + 2
-            
-            wb.save(arquivo_excel)
-            
-            report = BranchReport(
+            task = BranchTask(
                 branch=filial_str,
-                period_initial=periodoInicial,
-                period_final=periodoFinal,
-                excel_path=arquivo_excel,
-                quantity=len(grupo),
-                total_value=f"{soma_valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
-                table=html_table
+                data=grupo,
+                table=tabelas.get(filial_str) or render_monthly_table([]),
+                quantity=agregados.quantity(filial_str),
+                total=agregados.total(filial_str),
+                period_initial=agregados.period_initial,
+                period_final=agregados.period_final,
+                output_base=output_base
             )
 
-            reports.append(report)
-        
-        return reports
\ No newline at end of file
+            # Filial sem alteração desde a última geração reaproveita a planilha existente
+            with self._tracer.span(STAGE_FINGERPRINT, branch=filial_str, rows=len(grupo)):
+                grupo_hashes = row_hashes(grupo) if hashes is None else hashes.loc[grupo.index]
+                task.fingerprint = fingerprint_from_hashes(grupo_hashes, grupo.columns)
+            task.unchanged = not self._force and self._manifest.is_generated(filial_str, task.fingerprint, branch_excel_path(task))
+            self._record_history(filial_str, grupo, agregados.period_final, grupo_hashes)
+            yield task
+
+    def _chunk_tasks(self, tasks, total_linhas: int):
+        """Agrupa filiais consecutivas em lotes de até chunk_rows linhas (filiais grandes e sem alteração ficam em lotes próprios)"""
+        # Garante lotes suficientes para ocupar todos os processos mesmo em arquivos pequenos
+        limite = max(1, min(self._chunk_rows, total_linhas // (self._workers * 4)))
+
+        atual = []
+        linhas = 0
+        for task in tasks:
+            if atual and (task.unchanged != atual[0].unchanged or linhas + len(task.data) > limite):
+                yield atual
+                atual = []
+                linhas = 0
+            atual.append(task)
+            linhas += len(task.data)
+        if atual:
+            yield atual
+
+    def _generate_parallel(self, tasks, total_linhas: int, total_filiais: int) -> list[BranchReport]:
+        """Distribui os lotes de filiais em um pool de processos e devolve os relatórios na ordem das filiais"""
+        resultados = {}
+        pendentes = {}
+        concluidas = 0
+
+        def coletar(future):
+            nonlocal concluidas
+            idx, chunk = pendentes.pop(future)
+            try:
+                resultados[idx], spans = future.result()
+                self._tracer.extend(spans)
+            except Exception as e:
+                # Falha do processo inteiro (ex.: worker encerrado): marca só as filiais do lote
+                resultados[idx] = [failed_branch_report(task, e) for task in chunk]
+            concluidas += len(chunk)
+            self._notify(concluidas, total_filiais, chunk[-1].branch)
+
+        with ProcessPoolExecutor(max_workers=self._workers) as executor:
+            for idx, chunk in enumerate(self._chunk_tasks(tasks, total_linhas)):
+                if self._cancel_event is not None and self._cancel_event.is_set():
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    self._check_cancelled()
+                # Limita os lotes em memória para não carregar todas as partições de uma vez
+                while len(pendentes) >= self._workers * 2:
+                    concluidos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+                    for future in concluidos:
+                        coletar(future)
+                # Lotes de filiais sem alteração não precisam passar pelo pool
+                if chunk[0].unchanged:
+                    resultados[idx] = [unchanged_branch_report(task, self._attachment_policy) for task in chunk]
+                    concluidas += len(chunk)
+                    self._notify(concluidas, total_filiais, chunk[-1].branch)
+                    continue
+                pendentes[executor.submit(build_branch_reports, chunk, self._streaming_threshold, self._attachment_policy)] = (idx, chunk)
+
+            while pendentes:
+                concluidos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+                for future in concluidos:
+                    coletar(future)
+
+        return [report for idx in sorted(resultados) for report in resultados[idx]]
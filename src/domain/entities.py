@@ -1,5 +1,13 @@
 from dataclasses import dataclass
 from datetime import datetime
+from typing import List, Optional
+
+@dataclass
+class BranchDelta:
+    new: int = 0
+    resolved: int = 0
+    aging: int = 0
+    oldest_days: int = 0
 
 @dataclass
 class BranchReport:
@@ -9,4 +17,30 @@ class BranchReport:
     excel_path: str
     quantity: int
     total_value: float
-    table: str
\ No newline at end of file
+    table: str
+    error: Optional[str] = None
+    fingerprint: Optional[str] = None
+    unchanged: bool = False
+    delta: Optional[BranchDelta] = None
+    # Anexos de cada e-mail da filial (None = só a planilha) e link quando a planilha não vai anexada
+    attachments: Optional[List[List[str]]] = None
+    link: Optional[str] = None
+
+@dataclass
+class OutgoingEmail:
+    branch: str
+    subject: str
+    html_body: str
+    to: List[str]
+    cc: List[str]
+    attachments: List[str]
+    # Posição da mensagem quando a planilha foi dividida em vários e-mails
+    part: int = 1
+    parts: int = 1
+
+@dataclass
+class SendStatus:
+    branch: str
+    status: str
+    attempts: int = 0
+    error: Optional[str] = None
\ No newline at end of file
@@ -0,0 +1,10 @@
+class OperationCancelled(Exception):
+    """Execução interrompida pelo usuário"""
+
+
+class ExportValidationError(Exception):
+    """Export com linhas inválidas: a execução é interrompida antes de gerar ou enviar qualquer coisa"""
+
+    def __init__(self, message: str, report_path: str = None):
+        super().__init__(message)
+        self.report_path = report_path
@@ -0,0 +1,144 @@
+import glob
+import os
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+from urllib.parse import quote
+import pandas as pd
+from src.infrastructure.csv_export_reader import COL_EMISSAO
+from src.infrastructure.excel_writer import BranchWorkbookWriter
+
+# Estratégias para planilhas acima do limite, na ordem em que são tentadas
+POLICY_ZIP = "zip"
+POLICY_SPLIT = "split"
+POLICY_LINK = "link"
+DEFAULT_STRATEGIES = (POLICY_ZIP, POLICY_SPLIT, POLICY_LINK)
+
+# Subpasta (ao lado da planilha) com as partes por período
+PARTS_DIR = "partes"
+# Margem sobre o limite na estimativa do tamanho de cada parte
+_PART_FILL = 0.9
+
+
+@dataclass
+class AttachmentPlan:
+    """Anexos de cada e-mail da filial (uma lista por e-mail) e o link da planilha quando ela não vai anexada"""
+    messages: List[List[str]] = field(default_factory=list)
+    link: Optional[str] = None
+
+
+@dataclass
+class AttachmentPolicy:
+    """Decide como a planilha da filial vai no e-mail conforme o limite de tamanho por mensagem
+
+    Abaixo do limite (ou sem limite) a planilha vai como está. Acima, as estratégias são tentadas em ordem: zip
+    (planilha compactada), split (uma planilha por grupo de meses de Dt. Emissão, cada uma em um e-mail) e link
+    (nenhum anexo; o corpo aponta para a planilha em link_base ou na pasta de saída).
+    """
+    max_bytes: int = 0
+    strategies: tuple = DEFAULT_STRATEGIES
+    link_base: Optional[str] = None
+
+    def plan(self, excel_path: str, output_base: str, data: pd.DataFrame = None, writer: BranchWorkbookWriter = None) -> AttachmentPlan:
+        """Mede a planilha já gravada e monta o envio; sem data as partes só são reaproveitadas do disco"""
+        if not self.max_bytes or os.path.getsize(excel_path) <= self.max_bytes:
+            return AttachmentPlan([[excel_path]])
+
+        for estrategia in self.strategies:
+            if estrategia == POLICY_ZIP:
+                compactado = self._zip(excel_path)
+                if os.path.getsize(compactado) <= self.max_bytes:
+                    return AttachmentPlan([[compactado]])
+            elif estrategia == POLICY_SPLIT:
+                partes = self._split(excel_path, data, writer) if data is not None else self._existing_parts(excel_path)
+                if partes and all(os.path.getsize(parte) <= self.max_bytes for parte in partes):
+                    return AttachmentPlan([[parte] for parte in partes])
+            elif estrategia == POLICY_LINK:
+                return AttachmentPlan([], link=self._link(excel_path, output_base))
+
+        # Nenhuma estratégia coube no limite: segue a planilha inteira (o servidor pode recusar)
+        return AttachmentPlan([[excel_path]])
+
+    def _zip(self, excel_path: str) -> str:
+        """Compacta a planilha ao lado dela (reaproveita o .zip se for mais novo que a planilha)"""
+        compactado = f"{os.path.splitext(excel_path)[0]}.zip"
+        if os.path.exists(compactado) and os.path.getmtime(compactado) >= os.path.getmtime(excel_path):
+            return compactado
+        with zipfile.ZipFile(compactado, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as arquivo:
+            arquivo.write(excel_path, os.path.basename(excel_path))
+        return compactado
+
+    def _split(self, excel_path: str, data: pd.DataFrame, writer: BranchWorkbookWriter) -> List[str]:
+        """Grava uma planilha por grupo de meses consecutivos, com o tamanho estimado de cada grupo dentro do limite"""
+        for antiga in self._existing_parts(excel_path):
+            os.remove(antiga)
+        if len(data) == 0:
+            return []
+
+        # Linhas por parte estimadas pelo tamanho médio de uma linha na planilha inteira
+        limite_linhas = max(1, int(self.max_bytes * _PART_FILL / (os.path.getsize(excel_path) / len(data))))
+        meses = data[COL_EMISSAO].dt.to_period("M")
+        contagem = meses.value_counts(sort=False, dropna=True).sort_index()
+
+        grupos = []
+        for mes, linhas in contagem.items():
+            if grupos and grupos[-1][2] + linhas <= limite_linhas:
+                grupos[-1] = (grupos[-1][0], mes, grupos[-1][2] + linhas)
+            else:
+                grupos.append((mes, mes, linhas))
+        if not grupos:
+            return []
+
+        pasta = os.path.join(os.path.dirname(excel_path), PARTS_DIR)
+        os.makedirs(pasta, exist_ok=True)
+        nome = os.path.splitext(os.path.basename(excel_path))[0]
+        writer = writer or BranchWorkbookWriter()
+
+        partes = []
+        for posicao, (inicio, fim, _) in enumerate(grupos, start=1):
+            selecao = (meses >= inicio) & (meses <= fim)
+            # Linhas sem data de emissão vão na última parte
+            if posicao == len(grupos):
+                selecao |= meses.isna()
+            periodo = str(inicio) if inicio == fim else f"{inicio} a {fim}"
+            caminho = os.path.join(pasta, f"{nome} parte {posicao} ({periodo}).xlsx")
+            writer.execute(data[selecao.to_numpy()], caminho)
+            partes.append(caminho)
+        return partes
+
+    def _existing_parts(self, excel_path: str) -> List[str]:
+        """Partes já gravadas para a planilha, na ordem"""
+        nome = os.path.splitext(os.path.basename(excel_path))[0]
+        padrao = os.path.join(glob.escape(os.path.join(os.path.dirname(excel_path), PARTS_DIR)), f"{glob.escape(nome)} parte *.xlsx")
+        return sorted(glob.glob(padrao), key=lambda caminho: int(os.path.basename(caminho)[len(nome) + 7:].split(" ")[0]))
+
+    def _link(self, excel_path: str, output_base: str) -> str:
+        """Endereço da planilha: link_base + caminho dentro da pasta de saída, ou o file:// do próprio arquivo"""
+        if not self.link_base:
+            return Path(excel_path).resolve().as_uri()
+        relativo = os.path.relpath(excel_path, output_base)
+        if "://" in self.link_base:
+            return f"{self.link_base.rstrip('/')}/{quote(relativo.replace(os.sep, '/'))}"
+        return Path(self.link_base, relativo).as_uri()
+
+
+def create_attachment_policy(settings) -> AttachmentPolicy:
+    """Política de anexos com os parâmetros do .env (ATTACHMENT_MAX_MB, ATTACHMENT_POLICY, ATTACHMENT_LINK_BASE)"""
+    estrategias = tuple(
+        item.strip().lower() for item in (settings.ATTACHMENT_POLICY or ",".join(DEFAULT_STRATEGIES)).split(",") if item.strip()
+    )
+    desconhecidas = sorted(set(estrategias) - set(DEFAULT_STRATEGIES))
+    if desconhecidas:
+        raise ValueError(f"ATTACHMENT_POLICY inválida: {', '.join(desconhecidas)} (use {', '.join(DEFAULT_STRATEGIES)})")
+
+    # Fora de uma URL, o link é o file:// da pasta, que só existe para caminhos absolutos (unidade ou \\servidor)
+    link_base = (settings.ATTACHMENT_LINK_BASE or "").strip() or None
+    if link_base and "://" not in link_base and not Path(link_base).is_absolute():
+        raise ValueError(f"ATTACHMENT_LINK_BASE inválido: {link_base} (use uma URL ou um caminho absoluto)")
+
+    return AttachmentPolicy(
+        max_bytes=int(float(settings.ATTACHMENT_MAX_MB or 0) * 1024 * 1024),
+        strategies=estrategias,
+        link_base=link_base,
+    )
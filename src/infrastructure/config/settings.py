@@ -6,4 +6,51 @@ class Settings:
     load_dotenv()
 
     self.EMAIL_TEST = os.getenv("EMAIL_TEST")
-    self.COMPANY = os.getenv("COMPANY")
\ No newline at end of file
+    self.COMPANY = os.getenv("COMPANY")
+    # Arquivo HTML com o modelo do corpo do e-mail (vazio = modelo padrão)
+    self.EMAIL_TEMPLATE = os.getenv("EMAIL_TEMPLATE")
+    # Número de processos para gerar as planilhas das filiais (1 = sequencial)
+    self.REPORT_WORKERS = os.getenv("REPORT_WORKERS")
+    # Linhas por bloco na leitura do CSV (vazio = arquivo inteiro em memória)
+    self.CSV_CHUNK_ROWS = os.getenv("CSV_CHUNK_ROWS")
+    # Armazenamento das filiais: json (padrão) ou sqlite
+    self.CONFIG_BACKEND = os.getenv("CONFIG_BACKEND")
+    # Meio de envio: outlook (padrão) ou smtp
+    self.MAIL_TRANSPORT = os.getenv("MAIL_TRANSPORT")
+    self.SMTP_HOST = os.getenv("SMTP_HOST")
+    self.SMTP_PORT = os.getenv("SMTP_PORT")
+    self.SMTP_USER = os.getenv("SMTP_USER")
+    self.SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+    self.SMTP_SENDER = os.getenv("SMTP_SENDER")
+    self.SMTP_STARTTLS = os.getenv("SMTP_STARTTLS")
+    self.SMTP_SSL = os.getenv("SMTP_SSL")
+    self.SMTP_POOL_SIZE = os.getenv("SMTP_POOL_SIZE")
+    # Fila de envio: envios simultâneos, limite por minuto (0 = sem limite) e tentativas por filial
+    self.SEND_WORKERS = os.getenv("SEND_WORKERS")
+    self.SEND_RATE_PER_MINUTE = os.getenv("SEND_RATE_PER_MINUTE")
+    self.SEND_MAX_ATTEMPTS = os.getenv("SEND_MAX_ATTEMPTS")
+    # Pasta dos relatórios JSON de cada execução (vazio = Documents/CobrancaNF/execucoes)
+    self.RUN_REPORT_DIR = os.getenv("RUN_REPORT_DIR")
+    # Arquivo .prom para o textfile collector do node_exporter (vazio = não grava)
+    self.PROMETHEUS_TEXTFILE = os.getenv("PROMETHEUS_TEXTFILE")
+    # Arquivo histórico em Parquet (padrão ativado em Documents/CobrancaNF/historico) e dias para um documento contar como antigo
+    self.HISTORY_ENABLED = os.getenv("HISTORY_ENABLED")
+    self.HISTORY_DIR = os.getenv("HISTORY_DIR")
+    self.HISTORY_AGING_DAYS = os.getenv("HISTORY_AGING_DAYS")
+    # Validação do export antes de gerar as planilhas (padrão ativada) e documento repetido no arquivo: erro ou aviso
+    self.PREFLIGHT_ENABLED = os.getenv("PREFLIGHT_ENABLED")
+    self.PREFLIGHT_DUPLICATES = os.getenv("PREFLIGHT_DUPLICATES")
+    # Limite dos anexos por e-mail em MB (vazio = sem limite), estratégias acima dele em ordem (zip, split, link)
+    # e endereço da pasta de saída usado nos links (vazio = caminho local do arquivo)
+    self.ATTACHMENT_MAX_MB = os.getenv("ATTACHMENT_MAX_MB")
+    self.ATTACHMENT_POLICY = os.getenv("ATTACHMENT_POLICY")
+    self.ATTACHMENT_LINK_BASE = os.getenv("ATTACHMENT_LINK_BASE")
+    # Modo watch: pasta vigiada, pasta de saída, destinos dos arquivos (vazio = processados/ e erros/ dentro da entrada),
+    # intervalo entre verificações, segundos sem alteração para o arquivo contar como completo e exports ao mesmo tempo
+    self.WATCH_INBOX = os.getenv("WATCH_INBOX")
+    self.WATCH_OUTPUT = os.getenv("WATCH_OUTPUT")
+    self.WATCH_ARCHIVE_DIR = os.getenv("WATCH_ARCHIVE_DIR")
+    self.WATCH_ERROR_DIR = os.getenv("WATCH_ERROR_DIR")
+    self.WATCH_POLL_SECONDS = os.getenv("WATCH_POLL_SECONDS")
+    self.WATCH_SETTLE_SECONDS = os.getenv("WATCH_SETTLE_SECONDS")
+    self.WATCH_WORKERS = os.getenv("WATCH_WORKERS")
\ No newline at end of file
@@ -0,0 +1,13 @@
+from src.infrastructure.config.settings import Settings
+
+
+def create_config_manager():
+    """Cria o gerenciador de configuração conforme CONFIG_BACKEND (json, padrão, ou sqlite)"""
+    backend = (Settings().CONFIG_BACKEND or "json").strip().lower()
+
+    if backend == "sqlite":
+        from src.infrastructure.sqlite_config_manager import SqliteEmailConfigManager
+        return SqliteEmailConfigManager()
+
+    from src.infrastructure.config_manager import EmailConfigManager
+    return EmailConfigManager()
@@ -1,7 +1,17 @@
+import copy
 import json
+import threading
+import time
 from pathlib import Path
 from typing import Dict, List
 
+# Cache compartilhado por todas as instâncias do processo: caminho -> (mtime_ns, tamanho, config, verificado_em)
+_config_cache: Dict[str, tuple] = {}
+_cache_lock = threading.Lock()
+
+# Intervalo mínimo entre verificações do arquivo (stat) para detectar edições externas
+_REVALIDATE_SECONDS = 1.0
+
 class EmailConfigManager:
     """Gerenciador de configurações de e-mail por filial armazenadas em JSON"""
     
@@ -22,36 +32,60 @@ class EmailConfigManager:
             self._save_config(default_config)
     
     def _load_config(self) -> Dict:
-        """Carrega a configuração do arquivo JSON"""
+        """Carrega a configuração do cache, relendo o JSON só se o arquivo mudou (mtime/tamanho)"""
+        chave = str(self.config_file)
+        agora = time.monotonic()
+
+        with _cache_lock:
+            cached = _config_cache.get(chave)
+        if cached and agora - cached[3] < _REVALIDATE_SECONDS:
+            return cached[2]
+
         try:
-            with open(self.config_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            stat = self.config_file.stat()
+            if cached and (cached[0], cached[1]) == (stat.st_mtime_ns, stat.st_size):
+                config = cached[2]
+            else:
+                with open(self.config_file, 'r', encoding='utf-8') as f:
+                    config = json.load(f)
         except Exception as e:
             print(f"Erro ao carregar configuração: {e}")
             return {"stores": {}}
+
+        with _cache_lock:
+            _config_cache[chave] = (stat.st_mtime_ns, stat.st_size, config, agora)
+        return config
+    
+    def _load_config_for_update(self) -> Dict:
+        """Retorna uma cópia da configuração para alteração (o cache só muda após salvar)"""
+        return copy.deepcopy(self._load_config())
     
     def _save_config(self, config: Dict):
-        """Salva a configuração no arquivo JSON"""
+        """Salva a configuração no arquivo JSON e atualiza o cache"""
         try:
             with open(self.config_file, 'w', encoding='utf-8') as f:
                 json.dump(config, f, indent=4, ensure_ascii=False)
         except Exception as e:
             print(f"Erro ao salvar configuração: {e}")
             raise
+
+        stat = self.config_file.stat()
+        with _cache_lock:
+            _config_cache[str(self.config_file)] = (stat.st_mtime_ns, stat.st_size, config, time.monotonic())
     
     def get_all_stores(self) -> Dict[str, Dict]:
-        """Retorna todas as filiais configuradas"""
+        """Retorna todas as filiais configuradas (dicionário do cache: não alterar)"""
         config = self._load_config()
         return config.get("stores", {})
     
     def get_store(self, store_code: str) -> Dict:
-        """Retorna configuração de uma filial específica"""
+        """Retorna uma cópia da configuração de uma filial (alterar o resultado não muda o cache)"""
         config = self._load_config()
-        return config.get("stores", {}).get(store_code, {"admins": [], "coordinators": []})
+        return copy.deepcopy(config.get("stores", {}).get(store_code, {"admins": [], "coordinators": []}))
     
     def add_store(self, store_code: str, admins: List[str] = None, coordinators: List[str] = None):
         """Adiciona uma nova filial"""
-        config = self._load_config()
+        config = self._load_config_for_update()
         if "stores" not in config:
             config["stores"] = {}
         
@@ -63,7 +97,7 @@ class EmailConfigManager:
     
     def update_store(self, store_code: str, admins: List[str], coordinators: List[str]):
         """Atualiza os e-mails de uma filial"""
-        config = self._load_config()
+        config = self._load_config_for_update()
         if "stores" not in config:
             config["stores"] = {}
         
@@ -75,7 +109,7 @@ class EmailConfigManager:
     
     def delete_store(self, store_code: str):
         """Remove uma filial"""
-        config = self._load_config()
+        config = self._load_config_for_update()
         if store_code in config.get("stores", {}):
             del config["stores"][store_code]
             self._save_config(config)
@@ -90,6 +124,31 @@ class EmailConfigManager:
         store = self.get_store(store_code)
         return store.get("coordinators", [])
     
+    def get_stores_by_email(self, email: str) -> List[str]:
+        """Retorna as filiais em que o e-mail recebe os relatórios"""
+        email = email.lower()
+        return sorted(
+            store_code for store_code, store in self.get_all_stores().items()
+            if email in (e.lower() for e in store.get("admins", []) + store.get("coordinators", []))
+        )
+    
+    def import_stores(self, stores: Dict[str, Dict], replace: bool = False):
+        """Importa várias filiais com uma única gravação do arquivo (replace=True apaga as demais)"""
+        config = self._load_config_for_update()
+        if replace or "stores" not in config:
+            config["stores"] = {}
+        
+        for store_code, store in stores.items():
+            config["stores"][store_code] = {
+                "admins": list(store.get("admins", [])),
+                "coordinators": list(store.get("coordinators", []))
+            }
+        self._save_config(config)
+    
+    def export_stores(self) -> Dict[str, Dict]:
+        """Exporta todas as filiais no formato do email_config.json"""
+        return copy.deepcopy(self.get_all_stores())
+    
     def get_config_path(self) -> str:
         """Retorna o caminho do arquivo de configuração"""
         return str(self.config_file)
@@ -0,0 +1,237 @@
+import importlib.util
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from src.infrastructure.export_sources import ExportSource, resolve_sources
+from src.infrastructure.instrumentation import NULL_TRACER, STAGE_CONVERSION, STAGE_INGESTION, STAGE_PREFLIGHT, RunTracer
+
+COL_FILIAL = "Loja"
+COL_EMISSAO = "Dt. Emissão"
+COL_VALOR = "Vlr. Documento"
+COL_OBSERVACOES = "Observações"
+
+# Layout do export: Loja;CNPJ;Fornecedor;Nr. IE;Dt. Emissão;Mod.;Série;Nr. Documento;Vlr. Documento;Evento;Observações
+SEPARATOR = ";"
+ENCODING = "utf-8"
+DECIMAL = ","
+THOUSANDS = "."
+DATE_FORMAT = "%d/%m/%Y"
+
+# Identidade de um documento no export
+DOCUMENT_KEY = ["CNPJ", "Mod.", "Série", "Nr. Documento"]
+
+# Colunas sem as quais o export não pode ser processado
+REQUIRED_COLUMNS = [COL_FILIAL, COL_EMISSAO, COL_VALOR] + DOCUMENT_KEY
+
+# Colunas com zeros à esquerda (CNPJ, Nr. IE, Nr. Documento, Loja) continuam texto;
+# colunas com poucos valores distintos já são lidas como categoria
+EXPORT_DTYPES = {
+    "Loja": str,
+    "CNPJ": str,
+    "Fornecedor": str,
+    "Nr. IE": str,
+    "Dt. Emissão": str,
+    "Mod.": "category",
+    "Série": "category",
+    "Nr. Documento": str,
+    "Vlr. Documento": "float64",
+    "Evento": "category",
+}
+
+# Colunas que não são usadas no processamento e nem lidas do arquivo
+SKIPPED_COLUMNS = [COL_OBSERVACOES]
+
+
+def pyarrow_available() -> bool:
+    """Indica se o pyarrow está instalado para ser usado como engine de leitura"""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+class ExportCsvReader:
+    """Leitor tipado do CSV exportado pelo ERP (formato brasileiro)"""
+
+    def __init__(self, engine: str = None):
+        # "pyarrow" quando disponível; a leitura em blocos sempre usa o engine C do pandas
+        self.engine = engine or ("pyarrow" if pyarrow_available() else "c")
+
+    def read(self, path, tracer: RunTracer = None, preflight=None) -> pd.DataFrame:
+        """Lê o arquivo inteiro já com os tipos convertidos (path: caminho ou ExportSource)
+
+        preflight (ExportPreflight) recebe o arquivo convertido, junto com o texto original das colunas convertidas.
+        """
+        tracer = tracer or NULL_TRACER
+        fonte = _as_source(path)
+        with tracer.span(STAGE_INGESTION, bytes=fonte.size) as span:
+            if self.engine == "pyarrow":
+                df = self._read_pyarrow(fonte)
+            else:
+                df = self._read_c(fonte)
+            span.rows = len(df)
+
+        return self._convert(df, fonte, 0, tracer, preflight)
+
+    def read_many(self, paths, workers: int = None, tracer: RunTracer = None, preflight=None) -> list[pd.DataFrame]:
+        """Lê vários exports ao mesmo tempo (threads: os parsers liberam o GIL) e devolve um DataFrame por arquivo, na ordem"""
+        fontes = resolve_sources(paths)
+        workers = max(1, min(workers or os.cpu_count() or 1, len(fontes)))
+        if workers == 1:
+            return [self.read(fonte, tracer, preflight) for fonte in fontes]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda fonte: self.read(fonte, tracer, preflight), fontes))
+
+    def read_chunks(self, path, chunksize: int, tracer: RunTracer = None, columns: list[str] = None, preflight=None):
+        """Lê o arquivo em blocos de chunksize linhas (engine C, que suporta leitura incremental)
+
+        columns limita a leitura a essas colunas (ex.: só a chave dos documentos); preflight valida cada bloco.
+        """
+        tracer = tracer or NULL_TRACER
+        fonte = _as_source(path)
+        lidas = 0
+        valor_texto = False
+        while True:
+            with fonte.open() as f:
+                opcoes = self._read_options(fonte, columns, valor_texto)
+                if lidas:
+                    # Retomada: continua da linha seguinte ao último bloco entregue
+                    opcoes.update(skiprows=lidas + 1, header=None, names=self._read_header(fonte))
+                reader = iter(pd.read_csv(f, chunksize=chunksize, **opcoes))
+                while True:
+                    with tracer.span(STAGE_INGESTION) as span:
+                        try:
+                            bloco = next(reader, None)
+                        except ValueError as e:
+                            # Vlr. Documento que não é número: o resto do arquivo é lido com o valor como texto
+                            if valor_texto or isinstance(e, pd.errors.ParserError):
+                                raise
+                            valor_texto = True
+                            break
+                        span.rows = 0 if bloco is None else len(bloco)
+                    if bloco is None:
+                        return
+
+                    bloco.index = pd.RangeIndex(lidas, lidas + len(bloco))
+                    bloco = self._convert(bloco, fonte, lidas, tracer, preflight)
+                    lidas += len(bloco)
+                    yield bloco
+
+    def missing_columns(self, path) -> list[str]:
+        """Colunas obrigatórias ausentes no cabeçalho do export (lê só a primeira linha)"""
+        cabecalho = [raw.strip() for raw in self._read_columns(_as_source(path))]
+        return [col for col in REQUIRED_COLUMNS if col not in cabecalho]
+
+    def _read_header(self, fonte: ExportSource) -> list[str]:
+        """Nomes originais de todas as colunas do arquivo (o cabeçalho pode vir com espaços)"""
+        with fonte.open() as f:
+            return list(pd.read_csv(f, sep=SEPARATOR, encoding=ENCODING, nrows=0).columns)
+
+    def _read_columns(self, fonte: ExportSource, columns: list[str] = None) -> list[str]:
+        """Retorna os nomes originais das colunas que serão lidas"""
+        return [raw for raw in self._read_header(fonte) if raw.strip() not in SKIPPED_COLUMNS and (columns is None or raw.strip() in columns)]
+
+    def _read_c(self, fonte: ExportSource) -> pd.DataFrame:
+        """Lê com o engine C; se algum Vlr. Documento não for número, lê de novo com o valor como texto"""
+        try:
+            with fonte.open() as f:
+                return pd.read_csv(f, **self._read_options(fonte))
+        except pd.errors.ParserError:
+            raise
+        except ValueError:
+            with fonte.open() as f:
+                return pd.read_csv(f, **self._read_options(fonte, value_as_text=True))
+
+    def _read_options(self, fonte: ExportSource, columns: list[str] = None, value_as_text: bool = False) -> dict:
+        """Monta os parâmetros do read_csv (engine C) a partir do cabeçalho real do arquivo"""
+        usecols = self._read_columns(fonte, columns)
+        tipos = dict(EXPORT_DTYPES, **{COL_VALOR: str}) if value_as_text else EXPORT_DTYPES
+        return {
+            "sep": SEPARATOR,
+            "encoding": ENCODING,
+            "usecols": usecols,
+            "dtype": {raw: tipos.get(raw.strip(), str) for raw in usecols},
+            "decimal": DECIMAL,
+            "thousands": THOUSANDS,
+            "engine": "c",
+        }
+
+    def _read_pyarrow(self, fonte: ExportSource) -> pd.DataFrame:
+        """Lê com o parser multithread do pyarrow, mantendo todas as colunas como texto"""
+        import pyarrow as pa
+        from pyarrow import csv as pa_csv
+
+        usecols = self._read_columns(fonte)
+        opcoes = {
+            "parse_options": pa_csv.ParseOptions(delimiter=SEPARATOR),
+            "convert_options": pa_csv.ConvertOptions(
+                # Sem inferência: CNPJ, Nr. IE e Nr. Documento perderiam os zeros à esquerda
+                column_types={raw: pa.string() for raw in usecols},
+                include_columns=usecols,
+                strings_can_be_null=True,
+            ),
+        }
+        # CSV comum é lido pelo caminho (mapeado em memória); compactados passam pelo arquivo já descompactado
+        if fonte.plain:
+            table = pa_csv.read_csv(fonte.path, **opcoes)
+        else:
+            with fonte.open() as f:
+                table = pa_csv.read_csv(f, **opcoes)
+        df = table.to_pandas()
+
+        # Vlr. Documento continua texto e é convertido em _finalize
+        categorias = [raw for raw in usecols if EXPORT_DTYPES.get(raw.strip()) == "category"]
+        return df.astype({raw: "category" for raw in categorias})
+
+    def _convert(self, df: pd.DataFrame, fonte: ExportSource, inicio: int, tracer: RunTracer, preflight=None) -> pd.DataFrame:
+        """Converte os tipos do bloco e, com preflight, valida as linhas (inicio: linhas do arquivo já lidas)"""
+        with tracer.span(STAGE_CONVERSION, rows=len(df)):
+            df.columns = df.columns.str.strip()
+            # Texto original das colunas convertidas: valor ou data que não convertem viram vazio
+            textos = {col: df[col] for col in (COL_EMISSAO, COL_VALOR) if col in df.columns and pd.api.types.is_string_dtype(df[col])}
+            df = self._finalize(df)
+
+        if preflight is not None:
+            with tracer.span(STAGE_PREFLIGHT, rows=len(df)):
+                preflight.check(fonte.name, df, textos, inicio)
+        return df
+
+    def _finalize(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Ajusta nomes de colunas, valor e data de emissão"""
+        df.columns = df.columns.str.strip()
+
+        if COL_VALOR in df.columns:
+            if pd.api.types.is_string_dtype(df[COL_VALOR]):
+                df[COL_VALOR] = self._parse_values(df[COL_VALOR])
+            # Arredonda para 2 casas decimais
+            df[COL_VALOR] = df[COL_VALOR].round(2)
+
+        if COL_EMISSAO in df.columns:
+            df[COL_EMISSAO] = self._parse_dates(df[COL_EMISSAO])
+
+        return df
+
+    def _parse_values(self, textos: pd.Series) -> pd.Series:
+        """Converte o valor no formato brasileiro (1.234,56); o que não for número fica vazio"""
+        numeros = textos.str.replace(THOUSANDS, "", regex=False).str.replace(DECIMAL, ".", regex=False)
+        try:
+            return numeros.astype("float64")
+        except ValueError:
+            return pd.to_numeric(numeros, errors="coerce").astype("float64")
+
+    def _parse_dates(self, textos: pd.Series) -> pd.Series:
+        """Converte a data com formato explícito; só o que não casar com dd/mm/aaaa passa pela inferência"""
+        datas = pd.to_datetime(textos, format=DATE_FORMAT, errors="coerce")
+
+        # Ex.: datas com horário, que a leitura antiga (dayfirst) também aceitava
+        falhas = datas.isna() & textos.notna()
+        if falhas.any():
+            datas[falhas] = pd.to_datetime(textos[falhas], dayfirst=True, errors="coerce", format="mixed")
+        return datas
+
+
+def _as_source(path) -> ExportSource:
+    """Aceita um ExportSource ou o caminho de um único export (.csv, .gz ou .zip com um CSV)"""
+    if isinstance(path, ExportSource):
+        return path
+    fontes = resolve_sources(path)
+    if len(fontes) != 1:
+        raise ValueError(f"{path} contém {len(fontes)} exports; use read_many")
+    return fontes[0]
@@ -1,16 +1,33 @@
 from datetime import datetime
-import win32com.client as win32
+from html import escape
+from typing import Dict, List, Optional
 import locale
-from src.infrastructure.config_manager import EmailConfigManager
+import os
+from src.infrastructure.config_factory import create_config_manager
 from src.infrastructure.config.settings import Settings
+from src.infrastructure.mail_transport import MailTransport, create_transport
+from src.infrastructure.email_template import EmailTemplate, load_email_template
+from src.infrastructure.instrumentation import NULL_TRACER, STAGE_MAIL_BUILD, STAGE_SEND, RunTracer
+from src.domain.entities import BranchReport, OutgoingEmail
+
+# Filial sem administradores e coordenadores cadastrados: não chega ao meio de envio
+NO_RECIPIENTS = "Filial sem destinatários cadastrados"
+
+
+def has_recipients(message: OutgoingEmail) -> bool:
+    """Indica se a mensagem tem algum destinatário (para ou cópia)"""
+    return bool(message.to or message.cc)
+
 
 class SendEmail:
-    """Gerenciador de envio de e-mails via Outlook"""
+    """Gerenciador de envio de e-mails (Outlook ou SMTP, conforme MAIL_TRANSPORT)"""
 
-    def __init__(self):
-        # Inicializa o gerenciador de configuração
-        self._config_service = EmailConfigManager()
+    def __init__(self, transport: MailTransport = None, config_service=None):
+        # Inicializa o gerenciador de configuração (ou usa o cadastro informado)
+        self._config_service = config_service or create_config_manager()
         self._settings = Settings()
+        # A sessão do meio de envio e a assinatura são reaproveitadas durante toda a execução
+        self._transport = transport or create_transport(self._settings)
         try:
             locale.setlocale(locale.LC_TIME, "pt_BR.UTF-8")  # no Windows, pode ser "Portuguese_Brazil.1252"
         except locale.Error:
@@ -19,54 +36,150 @@ class SendEmail:
             except locale.Error:
                 pass # Fallback to default locale if both fail
 
-    def execute(self, loja: str, periodoInicial: datetime, periodoFinal: datetime, destinatario: list[str], copia: list[str], caminho_arquivo: str, qt, vlrTotal, table):
+    def execute(self, loja: str, periodoInicial: datetime, periodoFinal: datetime, destinatario: list[str], copia: list[str], caminho_arquivo: str, qt, vlrTotal, table, tracer: RunTracer = None):
         """Envia o e-mail com a planilha de pendências em anexo"""
-        outlook = win32.Dispatch('Outlook.Application')
-        email = outlook.CreateItem(0)
-
-        company = self._settings.COMPANY
-
-        email.Display()
-        assinatura_completa = email.HTMLBody
-
-        email.Subject = f"PENDÊNCIA DE LANÇAMENTO - LOJA {loja} - {periodoFinal.strftime('%m/%Y')}"
-        email.HTMLBody = f"""
-        <html>
-            <body>
-                <div style="font-family: Aptos; font-size: 12pt;">
-                <p>{self._saudacao()}</p>
-                <p>
-                Segue em anexo a planilha com as notas fiscais e CTEs que ainda estão pendentes 
-                de lançamento no sistema, {self._check_period(periodoInicial, periodoFinal)}, e que não possuem 
-                justificativa registrada.
-                </p>
-
-                <p>Pedimos, por favor, que:</p>
-
-                <ul>
-                <li>Lancem no sistema as notas que ainda não foram lançadas;</li>
-                <li>Verifiquem cada pendência com atenção;</li>
-                <li>Confiram se a mercadoria realmente não chegou, se não será mais entregue ou se é necessário fazer a recusa no portal GED;</li>
-                <li>Registrem a justificativa no sistema, no campo <strong>“OBSERVAÇÕES”</strong>, pela filial.</li>
-                </ul>
-
-                <p>
-                É muito importante que a informação esteja registrada no sistema, 
-                pois precisamos informar ao time da {company} o motivo pelo qual essas notas ainda não deram entrada.
-                </p>
-                <p style="font-family: Aptos; font-size: 14pt;">Quantidade de documentos: {qt}</p>
-                <p style="font-family: Aptos; font-size: 14pt;">Valor total: R${vlrTotal}</p><br/>
-                {table}
-                {assinatura_completa}
-                </div>
-            </body>
-        </html>
-        """
-        email.Attachments.Add(caminho_arquivo)
-
-        email.To = ";".join(destinatario) if len(destinatario) > 0 else ""
-        email.CC = ";".join(copia) if len(copia) > 0 else ""
-        email.Send()
+        tracer = tracer or NULL_TRACER
+        with tracer.span(STAGE_MAIL_BUILD, branch=loja, rows=1):
+            message = self.build_message(loja, periodoInicial, periodoFinal, destinatario, copia, caminho_arquivo, qt, vlrTotal, table)
+        self.send_message(message, tracer)
+
+    def build_message(self, loja: str, periodoInicial: datetime, periodoFinal: datetime, destinatario: list[str], copia: list[str], caminho_arquivo: str, qt, vlrTotal, table) -> OutgoingEmail:
+        """Monta a mensagem da filial, independente do meio de envio"""
+        return OutgoingEmail(
+            branch=loja,
+            subject=self._subject(loja, periodoFinal),
+            html_body=self._build_body(periodoInicial, periodoFinal, qt, vlrTotal, table, self._transport.signature(), loja),
+            to=list(destinatario),
+            cc=list(copia),
+            attachments=[caminho_arquivo]
+        )
+
+    def build_messages(self, reports: List[BranchReport], tracer: RunTracer = None) -> List[OutgoingEmail]:
+        """Monta as mensagens de várias filiais de uma vez (modelo, assinatura e saudação obtidos uma única vez)"""
+        with (tracer or NULL_TRACER).span(STAGE_MAIL_BUILD, rows=len(reports)):
+            return self._build_messages(reports)
+
+    def _build_messages(self, reports: List[BranchReport]) -> List[OutgoingEmail]:
+        """Monta as mensagens do lote"""
+        template = self._get_template()
+        comuns = {
+            "saudacao": self._saudacao(),
+            "empresa": self._settings.COMPANY,
+            "assinatura": self._transport.signature(),
+        }
+
+        # Uma mensagem por grupo de anexos decidido pela política (planilha dividida = um e-mail por parte)
+        envios = []
+        for report in reports:
+            grupos = report.attachments if report.attachments is not None else [[report.excel_path]]
+            grupos = grupos or [[]]
+            envios += [(report, anexos, parte, len(grupos)) for parte, anexos in enumerate(grupos, start=1)]
+
+        notas = [self._attachment_note(report, parte, partes) for report, _, parte, partes in envios]
+        corpos = template.render_many(
+            dict(self._body_values(report.period_initial, report.period_final, report.quantity, report.total_value,
+                                   report.table, branch=report.branch, **comuns), anexo=nota)
+            for (report, _, _, _), nota in zip(envios, notas)
+        )
+        # Modelos próprios sem {{anexo}} recebem o aviso no fim do corpo
+        if "anexo" not in template.fields:
+            corpos = [self._append_note(corpo, nota) for corpo, nota in zip(corpos, notas)]
+
+        return [
+            OutgoingEmail(
+                branch=report.branch,
+                subject=self._subject(report.branch, report.period_final) + (f" (parte {parte} de {partes})" if partes > 1 else ""),
+                html_body=corpo,
+                to=self.get_admins(report.branch),
+                cc=self.get_coordinators(report.branch),
+                attachments=list(anexos),
+                part=parte,
+                parts=partes
+            )
+            for (report, anexos, parte, partes), corpo in zip(envios, corpos)
+        ]
+
+    def _attachment_note(self, report: BranchReport, parte: int, partes: int) -> str:
+        """Aviso no corpo quando a planilha vai por link ou dividida em vários e-mails"""
+        if report.link:
+            nome = escape(os.path.basename(report.excel_path))
+            return (f'<p>A planilha ficou grande demais para seguir anexada e está disponível em: '
+                    f'<a href="{escape(report.link, quote=True)}">{nome}</a></p>')
+        if partes > 1:
+            return f"<p>A planilha foi dividida por período de emissão: este e-mail traz a parte {parte} de {partes}.</p>"
+        return ""
+
+    def _append_note(self, corpo: str, nota: str) -> str:
+        """Insere o aviso antes do fim do corpo HTML"""
+        if not nota:
+            return corpo
+        posicao = corpo.lower().rfind("</body>")
+        return corpo[:posicao] + nota + corpo[posicao:] if posicao >= 0 else corpo + nota
+
+    def send_message(self, message: OutgoingEmail, tracer: RunTracer = None):
+        """Envia uma mensagem já montada"""
+        anexos = sum(os.path.getsize(caminho) for caminho in message.attachments if os.path.exists(caminho))
+        with (tracer or NULL_TRACER).span(STAGE_SEND, branch=message.branch, bytes=len(message.html_body) + anexos):
+            self._transport.send(message)
+
+    def send_many(self, reports: List[BranchReport], tracer: RunTracer = None) -> Dict[str, Optional[str]]:
+        """Envia os e-mails de várias filiais na mesma sessão; retorna o erro de cada filial (None = enviado)"""
+        status = {}
+        for message in self.build_messages(reports, tracer):
+            # Depois de uma parte com erro as seguintes da mesma filial não são enviadas
+            if status.get(message.branch):
+                continue
+            if not has_recipients(message):
+                print(f"Erro ao enviar e-mail da filial {message.branch}: {NO_RECIPIENTS}")
+                status[message.branch] = NO_RECIPIENTS
+                continue
+            try:
+                self.send_message(message, tracer)
+                status[message.branch] = None
+            except Exception as e:
+                print(f"Erro ao enviar e-mail da filial {message.branch}: {e}")
+                status[message.branch] = str(e)
+        return status
+
+    def is_transient(self, error: Exception) -> bool:
+        """Indica se a falha de envio é temporária (pode ser tentada novamente)"""
+        return self._transport.is_transient(error)
+
+    def close(self):
+        """Encerra as conexões do meio de envio"""
+        self._transport.close()
+
+    def _build_body(self, periodoInicial: datetime, periodoFinal: datetime, qt, vlrTotal, table, assinatura_completa: str, loja: str = "") -> str:
+        """Monta o corpo HTML do e-mail a partir do modelo (EMAIL_TEMPLATE ou o padrão)"""
+        return self._get_template().render(self._body_values(
+            periodoInicial, periodoFinal, qt, vlrTotal, table,
+            branch=loja,
+            saudacao=self._saudacao(),
+            empresa=self._settings.COMPANY,
+            assinatura=assinatura_completa
+        ))
+
+    def _body_values(self, periodoInicial: datetime, periodoFinal: datetime, qt, vlrTotal, table, branch: str, saudacao: str, empresa: str, assinatura: str) -> Dict[str, object]:
+        """Valores dos campos do modelo para uma filial"""
+        return {
+            "filial": branch,
+            "mes_referencia": periodoFinal.strftime('%m/%Y'),
+            "saudacao": saudacao,
+            "periodo": self._check_period(periodoInicial, periodoFinal),
+            "empresa": empresa,
+            "quantidade": qt,
+            "valor_total": vlrTotal,
+            "tabela": table,
+            "assinatura": assinatura,
+        }
+
+    def _get_template(self) -> EmailTemplate:
+        """Modelo compilado (recarregado só quando o arquivo muda)"""
+        return load_email_template(self._settings.EMAIL_TEMPLATE)
+
+    def _subject(self, loja: str, periodoFinal: datetime) -> str:
+        """Assunto do e-mail da filial"""
+        return f"PENDÊNCIA DE LANÇAMENTO - LOJA {loja} - {periodoFinal.strftime('%m/%Y')}"
 
     def _saudacao(self):
         """Retorna saudação apropriada baseada na hora atual"""
@@ -0,0 +1,99 @@
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+# Campos disponíveis no modelo, escritos como {{campo}}
+TEMPLATE_FIELDS = ("filial", "mes_referencia", "saudacao", "periodo", "empresa", "quantidade", "valor_total", "tabela", "anexo", "assinatura")
+
+_PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+# Modelo padrão, usado quando EMAIL_TEMPLATE não está definido
+DEFAULT_TEMPLATE = """
+        <html>
+            <body>
+                <div style="font-family: Aptos; font-size: 12pt;">
+                <p>{{saudacao}}</p>
+                <p>
+                Segue em anexo a planilha com as notas fiscais e CTEs que ainda estão pendentes 
+                de lançamento no sistema, {{periodo}}, e que não possuem 
+                justificativa registrada.
+                </p>
+
+                <p>Pedimos, por favor, que:</p>
+
+                <ul>
+                <li>Lancem no sistema as notas que ainda não foram lançadas;</li>
+                <li>Verifiquem cada pendência com atenção;</li>
+                <li>Confiram se a mercadoria realmente não chegou, se não será mais entregue ou se é necessário fazer a recusa no portal GED;</li>
+                <li>Registrem a justificativa no sistema, no campo <strong>“OBSERVAÇÕES”</strong>, pela filial.</li>
+                </ul>
+
+                <p>
+                É muito importante que a informação esteja registrada no sistema, 
+                pois precisamos informar ao time da {{empresa}} o motivo pelo qual essas notas ainda não deram entrada.
+                </p>
+                <p style="font-family: Aptos; font-size: 14pt;">Quantidade de documentos: {{quantidade}}</p>
+                <p style="font-family: Aptos; font-size: 14pt;">Valor total: R${{valor_total}}</p><br/>
+                {{tabela}}{{anexo}}
+                {{assinatura}}
+                </div>
+            </body>
+        </html>
+        """
+
+# Cache por processo: caminho -> ((mtime_ns, tamanho), modelo compilado)
+_template_cache: Dict[str, tuple] = {}
+_cache_lock = threading.Lock()
+
+
+class EmailTemplate:
+    """Modelo do corpo do e-mail compilado uma única vez em trechos fixos e campos"""
+
+    def __init__(self, text: str):
+        partes = _PLACEHOLDER.split(text)
+        # split alterna texto fixo e nome do campo: [texto, campo, texto, campo, ..., texto]
+        self._literals = partes[0::2]
+        self._fields = partes[1::2]
+
+        desconhecidos = sorted(set(self._fields) - set(TEMPLATE_FIELDS))
+        if desconhecidos:
+            raise ValueError(f"Campos desconhecidos no modelo de e-mail: {', '.join(desconhecidos)}")
+
+    @property
+    def fields(self) -> List[str]:
+        """Campos usados no modelo"""
+        return list(self._fields)
+
+    def render(self, values: Dict[str, object]) -> str:
+        """Preenche o modelo com os valores de uma filial"""
+        saida = [self._literals[0]]
+        for campo, literal in zip(self._fields, self._literals[1:]):
+            saida.append(str(values.get(campo, "")))
+            saida.append(literal)
+        return "".join(saida)
+
+    def render_many(self, values: Iterable[Dict[str, object]]) -> List[str]:
+        """Preenche o modelo para várias filiais de uma vez"""
+        return [self.render(valores) for valores in values]
+
+
+def load_email_template(path: Optional[str] = None) -> EmailTemplate:
+    """Carrega o modelo do arquivo informado (ou o padrão), recompilando só quando o arquivo muda"""
+    if not path:
+        chave, assinatura = "", None
+    else:
+        stat = Path(path).stat()
+        chave, assinatura = str(path), (stat.st_mtime_ns, stat.st_size)
+
+    with _cache_lock:
+        cached = _template_cache.get(chave)
+    if cached and cached[0] == assinatura:
+        return cached[1]
+
+    texto = Path(path).read_text(encoding="utf-8") if path else DEFAULT_TEMPLATE
+    modelo = EmailTemplate(texto)
+
+    with _cache_lock:
+        _template_cache[chave] = (assinatura, modelo)
+    return modelo
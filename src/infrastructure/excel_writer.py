@@ -0,0 +1,119 @@
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+from openpyxl.utils import get_column_letter
+
+SHEET_NAME = "Sheet1"
+
+# Tamanho de str(datetime) como o openpyxl devolve a célula: "AAAA-MM-DD HH:MM:SS"
+_DATETIME_TEXT_LENGTH = 19
+
+
+def compute_column_widths(df: pd.DataFrame) -> list[int]:
+    """Calcula a largura de cada coluna a partir do próprio DataFrame (cabeçalho + maior valor + 2)"""
+    widths = []
+    for col in df.columns:
+        serie = df[col]
+        max_length = len(str(col))
+
+        valores = serie.dropna()
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            if len(valores) > 0:
+                max_length = max(max_length, _DATETIME_TEXT_LENGTH)
+        elif len(valores) > 0:
+            # Valores "falsos" (0, "") não eram considerados no autoajuste célula a célula
+            if pd.api.types.is_numeric_dtype(serie):
+                valores = valores[valores != 0]
+            textos = valores.astype(str)
+            textos = textos[textos != ""]
+            if len(textos) > 0:
+                max_length = max(max_length, int(textos.str.len().max()))
+
+        widths.append(max_length + 2)
+    return widths
+
+
+def _cell_value(valor):
+    """Valor da célula no modo write-only: vazios (NaN, NaT, NA) viram célula em branco"""
+    if valor is pd.NaT or valor is pd.NA or (isinstance(valor, float) and valor != valor):
+        return None
+    return valor
+
+
+class BranchWorkbookWriter:
+    """Grava a planilha de uma filial em uma única passada, já com as larguras das colunas"""
+
+    def __init__(self, streaming_threshold: int = 100_000):
+        # A partir deste número de linhas usa o modo write-only (memória constante) do openpyxl
+        self.streaming_threshold = streaming_threshold
+
+    def execute(self, df: pd.DataFrame, path: str, widths: list[int] = None):
+        """Grava o DataFrame em xlsx escolhendo o modo conforme o tamanho (larguras calculadas se não informadas)"""
+        if widths is None:
+            widths = compute_column_widths(df)
+        if len(df) >= self.streaming_threshold:
+            self._write_streaming(df, path, widths)
+        else:
+            self._write_standard(df, path, widths)
+
+    def _write_standard(self, df: pd.DataFrame, path: str, widths: list[int]):
+        """Grava via pandas e aplica as larguras antes de fechar o arquivo"""
+        with pd.ExcelWriter(path, engine="openpyxl") as writer:
+            df.to_excel(writer, index=False, sheet_name=SHEET_NAME)
+            ws = writer.sheets[SHEET_NAME]
+            for idx, width in enumerate(widths, start=1):
+                ws.column_dimensions[get_column_letter(idx)].width = width
+
+    def _write_streaming(self, df: pd.DataFrame, path: str, widths: list[int]):
+        """Grava linha a linha com o openpyxl em modo write-only"""
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(SHEET_NAME)
+
+        # No modo write-only as larguras precisam ser definidas antes da primeira linha
+        for idx, width in enumerate(widths, start=1):
+            ws.column_dimensions[get_column_letter(idx)].width = width
+
+        ws.append([self._header_cell(ws, col) for col in df.columns])
+
+        # Linha a linha, sem uma cópia do DataFrame inteiro em object
+        for row in df.itertuples(index=False, name=None):
+            ws.append([_cell_value(valor) for valor in row])
+
+        wb.save(path)
+
+    def _header_cell(self, ws, value) -> WriteOnlyCell:
+        """Cria a célula de cabeçalho com o mesmo estilo usado pelo pandas"""
+        cell = WriteOnlyCell(ws, value=value)
+        cell.font = Font(bold=True)
+        cell.alignment = Alignment(horizontal="center", vertical="top")
+        thin = Side(style="thin")
+        cell.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+        return cell
+
+
+class SummaryWorkbookWriter:
+    """Grava as abas do resumo da execução em um único arquivo, com larguras e cabeçalho fixo em cada aba"""
+
+    def execute(self, sheets: dict, path: str):
+        """Grava cada DataFrame em sua aba (datas como dd/mm/aaaa e valores com duas casas)"""
+        with pd.ExcelWriter(path, engine="openpyxl") as writer:
+            for nome, df in sheets.items():
+                df.to_excel(writer, index=False, sheet_name=nome)
+                ws = writer.sheets[nome]
+                for idx, (col, width) in enumerate(zip(df.columns, compute_column_widths(df)), start=1):
+                    letra = get_column_letter(idx)
+                    ws.column_dimensions[letra].width = width
+                    formato = self._number_format(df[col])
+                    if formato:
+                        for cell in ws[letra][1:]:
+                            cell.number_format = formato
+                ws.freeze_panes = "B2"
+
+    def _number_format(self, serie: pd.Series):
+        """Formato das células da coluna, ou None para o padrão"""
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            return "DD/MM/YYYY"
+        if pd.api.types.is_float_dtype(serie):
+            return "#,##0.00"
+        return None
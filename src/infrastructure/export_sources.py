@@ -0,0 +1,98 @@
+import glob
+import gzip
+import os
+import zipfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import List
+
+# Extensões aceitas ao listar uma pasta ou um padrão
+EXPORT_SUFFIXES = (".csv", ".gz", ".zip")
+
+
+@dataclass(frozen=True)
+class ExportSource:
+    """Um export do ERP: CSV comum, CSV compactado com gzip ou um CSV dentro de um .zip"""
+    path: str
+    member: str = None
+
+    @property
+    def name(self) -> str:
+        """Nome para mensagens (arquivo.zip:membro.csv para arquivos dentro do .zip)"""
+        nome = os.path.basename(self.path)
+        return f"{nome}:{self.member}" if self.member else nome
+
+    @property
+    def plain(self) -> bool:
+        """Indica se é um CSV sem compactação (lido direto do disco)"""
+        return self.member is None and not self.path.lower().endswith(".gz")
+
+    @property
+    def size(self) -> int:
+        """Tamanho do arquivo em disco (compactado, quando for o caso)"""
+        if self.member:
+            with zipfile.ZipFile(self.path) as arquivo:
+                return arquivo.getinfo(self.member).compress_size
+        return os.path.getsize(self.path)
+
+    def signature(self) -> str:
+        """Nome, tamanho e data do arquivo, para identificar a execução"""
+        stat = os.stat(self.path)
+        return f"{self.name}|{stat.st_size}|{int(stat.st_mtime)}"
+
+    def verify(self):
+        """Lê o conteúdo compactado até o fim: arquivo truncado ou corrompido gera exceção (CSV comum não é lido)"""
+        if self.plain:
+            return
+        with self.open() as f:
+            while f.read(1 << 20):
+                pass
+
+    @contextmanager
+    def open(self):
+        """Abre o conteúdo já descompactado, em modo binário"""
+        if self.member:
+            with zipfile.ZipFile(self.path) as arquivo, arquivo.open(self.member) as f:
+                yield f
+        elif self.path.lower().endswith(".gz"):
+            with gzip.open(self.path, "rb") as f:
+                yield f
+        else:
+            with open(self.path, "rb") as f:
+                yield f
+
+
+def resolve_sources(spec) -> List[ExportSource]:
+    """Lista os exports de um arquivo, uma pasta, um padrão (glob) ou de uma lista deles, em ordem de nome
+
+    Cada CSV dentro de um .zip vira um export separado.
+    """
+    itens = [spec] if isinstance(spec, (str, os.PathLike, ExportSource)) else list(spec)
+
+    fontes = []
+    for item in itens:
+        if isinstance(item, ExportSource):
+            fontes.append(item)
+            continue
+
+        item = os.fspath(item)
+        if os.path.isdir(item):
+            caminhos = sorted(os.path.join(item, nome) for nome in os.listdir(item) if nome.lower().endswith(EXPORT_SUFFIXES))
+        elif any(c in item for c in "*?["):
+            caminhos = sorted(caminho for caminho in glob.glob(item) if os.path.isfile(caminho))
+        else:
+            caminhos = [item]
+
+        for caminho in caminhos:
+            if caminho.lower().endswith(".zip"):
+                with zipfile.ZipFile(caminho) as arquivo:
+                    membros = sorted(nome for nome in arquivo.namelist() if nome.lower().endswith(".csv"))
+                fontes += [ExportSource(caminho, membro) for membro in membros]
+            else:
+                fontes.append(ExportSource(caminho))
+
+    # O mesmo arquivo informado duas vezes (ex.: pasta e padrão) é lido uma vez só
+    unicas = list(dict.fromkeys((os.path.abspath(fonte.path), fonte.member) for fonte in fontes))
+    if not unicas:
+        raise FileNotFoundError(f"Nenhum arquivo de export encontrado em: {spec}")
+    return [ExportSource(caminho, membro) for caminho, membro in unicas]
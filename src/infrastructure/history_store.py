@@ -0,0 +1,127 @@
+import os
+import shutil
+import threading
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from src.infrastructure.csv_export_reader import pyarrow_available
+
+# Colunas do índice de documentos (um registro por filial e documento já visto)
+INDEX_COLUMNS = ["Loja", "doc_key", "CNPJ", "Mod.", "Série", "Nr. Documento", "first_seen", "last_seen"]
+# Datas do índice sempre na mesma unidade, venham do arquivo ou do instante da execução
+INDEX_DATE_TYPES = {"first_seen": "datetime64[ns]", "last_seen": "datetime64[ns]"}
+
+# Arquivos da execução em andamento: só entram em documentos/ depois que o índice é gravado
+STAGING_DIR = "em_andamento"
+
+
+def _empty_index() -> pd.DataFrame:
+    """Índice sem documentos, com os tipos das colunas"""
+    tipos = dict(INDEX_DATE_TYPES, doc_key="uint64")
+    return pd.DataFrame({col: pd.Series(dtype=tipos.get(col, "object")) for col in INDEX_COLUMNS})
+
+
+class HistoryStore:
+    """Arquivo histórico em Parquet: documentos de cada execução particionados por filial e período, e um índice por documento"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.documents_dir = os.path.join(directory, "documentos")
+        self.index_path = os.path.join(directory, "indice.parquet")
+
+    def append_snapshot(self, branch: str, period: str, snapshot_id: str, df: pd.DataFrame, taken_at: pd.Timestamp):
+        """Grava os documentos pendentes da filial nesta execução em Loja=<filial>/periodo=<AAAA-MM>/ (ainda fora de documentos/)"""
+        import pyarrow as pa
+
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        # Categorias gravadas como valores comuns: todos os arquivos ficam com o mesmo esquema
+        for posicao, campo in enumerate(tabela.schema):
+            if pa.types.is_dictionary(campo.type):
+                tabela = tabela.set_column(posicao, campo.name, tabela.column(posicao).cast(campo.type.value_type))
+        tabela = tabela.append_column("snapshot", pa.array(np.full(len(df), taken_at.to_datetime64(), dtype="datetime64[ns]")))
+
+        pasta = os.path.join(self._staging_dir(snapshot_id), f"Loja={branch}", f"periodo={period}")
+        os.makedirs(pasta, exist_ok=True)
+        self._write(tabela, os.path.join(pasta, f"{snapshot_id}.parquet"))
+
+    def commit_snapshot(self, snapshot_id: str):
+        """Move os arquivos da execução para documentos/ (chamado depois de gravar o índice)"""
+        origem = self._staging_dir(snapshot_id)
+        for raiz, _, arquivos in os.walk(origem):
+            destino = os.path.join(self.documents_dir, os.path.relpath(raiz, origem))
+            for nome in arquivos:
+                os.makedirs(destino, exist_ok=True)
+                os.replace(os.path.join(raiz, nome), os.path.join(destino, nome))
+        self.discard_snapshot(snapshot_id)
+
+    def discard_snapshot(self, snapshot_id: str):
+        """Apaga os arquivos de uma execução que não chegou a gravar o índice (cancelada ou com erro)"""
+        shutil.rmtree(self._staging_dir(snapshot_id), ignore_errors=True)
+        # A pasta em_andamento só fica enquanto alguma execução tiver arquivos nela
+        try:
+            os.rmdir(os.path.join(self.directory, STAGING_DIR))
+        except OSError:
+            pass
+
+    def read_index(self, branch: str = None) -> pd.DataFrame:
+        """Índice de documentos de todas as filiais ou de uma; vazio na primeira execução"""
+        if not os.path.exists(self.index_path):
+            return _empty_index()
+        filtro = [("Loja", "==", branch)] if branch else None
+        # Índices gravados antes da normalização podem ter last_seen em outra unidade
+        return pd.read_parquet(self.index_path, filters=filtro).astype(INDEX_DATE_TYPES)
+
+    def write_index(self, df: pd.DataFrame):
+        """Substitui o índice (ordenado por filial e documento)"""
+        os.makedirs(self.directory, exist_ok=True)
+        import pyarrow as pa
+
+        self._write(pa.Table.from_pandas(df[INDEX_COLUMNS].astype(INDEX_DATE_TYPES), preserve_index=False), self.index_path)
+
+    def load(self, branch: str = None, start: str = None, end: str = None) -> pd.DataFrame:
+        """Lê as execuções arquivadas, filtrando pelas partições (filial e período AAAA-MM) antes de abrir os arquivos"""
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        if not os.path.isdir(self.documents_dir):
+            return pd.DataFrame()
+
+        # Partições como texto: a inferência transformaria a filial "01" em 1
+        particao = ds.partitioning(pa.schema([("Loja", pa.string()), ("periodo", pa.string())]), flavor="hive")
+        dataset = ds.dataset(self.documents_dir, format="parquet", partitioning=particao)
+
+        filtro = None
+        for condicao in (
+            ds.field("Loja") == branch if branch else None,
+            ds.field("periodo") >= start if start else None,
+            ds.field("periodo") <= end if end else None,
+        ):
+            if condicao is not None:
+                filtro = condicao if filtro is None else filtro & condicao
+        return dataset.to_table(filter=filtro).to_pandas()
+
+    def _staging_dir(self, snapshot_id: str) -> str:
+        """Pasta dos arquivos de uma execução ainda não confirmada"""
+        return os.path.join(self.directory, STAGING_DIR, snapshot_id)
+
+    def _write(self, tabela, path: str):
+        """Grava o Parquet em um arquivo temporário e troca de uma vez (leitores nunca veem arquivo pela metade)"""
+        import pyarrow.parquet as pq
+
+        # Temporário por thread: execuções simultâneas (modo watch) não disputam o mesmo arquivo
+        temporario = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        pq.write_table(tabela, temporario)
+        os.replace(temporario, path)
+
+
+def create_history_store(settings, directory: str = None):
+    """Cria o arquivo histórico em directory, HISTORY_DIR ou Documents/CobrancaNF/historico; None se desativado ou sem pyarrow"""
+    if (settings.HISTORY_ENABLED or "true").strip().lower() not in ("1", "true", "sim", "yes"):
+        return None
+
+    if not pyarrow_available():
+        print("Histórico desativado: instale o pyarrow para gravar o arquivo em Parquet.")
+        return None
+
+    pasta = directory or settings.HISTORY_DIR or str(Path.home() / "Documents" / "CobrancaNF" / "historico")
+    return HistoryStore(pasta)
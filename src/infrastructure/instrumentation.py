@@ -0,0 +1,230 @@
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+# Etapas registradas nos spans
+STAGE_INGESTION = "leitura"
+STAGE_CONVERSION = "conversao"
+STAGE_PREFLIGHT = "validacao"
+STAGE_MERGE = "juncao"
+STAGE_PREPARE = "preparo"
+STAGE_GROUPBY = "agrupamento"
+STAGE_FINGERPRINT = "fingerprint"
+STAGE_HISTORY = "historico"
+STAGE_SUMMARY = "resumo"
+STAGE_AUTOFIT = "autoajuste"
+STAGE_WORKBOOK = "xlsx"
+STAGE_ATTACHMENT = "anexos"
+STAGE_MAIL_BUILD = "montagem_email"
+STAGE_SEND = "envio"
+
+
+def peak_memory_bytes() -> int:
+    """Maior uso de memória (RSS) do processo até agora; 0 quando não é possível medir"""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            class ProcessMemoryCounters(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            contadores = ProcessMemoryCounters()
+            contadores.cb = ctypes.sizeof(contadores)
+            processo = ctypes.windll.kernel32.GetCurrentProcess()
+            ctypes.windll.psapi.GetProcessMemoryInfo(processo, ctypes.byref(contadores), contadores.cb)
+            return int(contadores.PeakWorkingSetSize)
+
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux informa em KB; macOS em bytes
+        return int(pico) if sys.platform == "darwin" else int(pico) * 1024
+    except Exception:
+        return 0
+
+
+@dataclass
+class Span:
+    stage: str
+    seconds: float = 0.0
+    branch: Optional[str] = None
+    rows: Optional[int] = None
+    bytes: Optional[int] = None
+    peak_memory_bytes: int = 0
+    started_at: str = ""
+    pid: int = field(default_factory=os.getpid)
+
+
+class RunTracer:
+    """Coleta os spans (tempo, linhas/bytes e pico de memória) de cada etapa de uma execução"""
+
+    def __init__(self, name: str = "execucao"):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.started_at = datetime.now()
+        self.finished_at = None
+        self.status = None
+        self.attributes = {}
+        self.spans: List[Span] = []
+        self._inicio = time.perf_counter()
+        self._duracao = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage: str, branch: str = None, rows: int = None, bytes: int = None):
+        """Mede o bloco; linhas e bytes podem ser preenchidos no próprio span durante o bloco"""
+        registro = Span(stage=stage, branch=branch, rows=rows, bytes=bytes, started_at=datetime.now().isoformat(timespec="milliseconds"))
+        inicio = time.perf_counter()
+        try:
+            yield registro
+        finally:
+            registro.seconds = time.perf_counter() - inicio
+            registro.peak_memory_bytes = peak_memory_bytes()
+            self.add(registro)
+
+    def add(self, span: Span):
+        """Registra um span pronto"""
+        with self._lock:
+            self.spans.append(span)
+
+    def extend(self, spans: Iterable[Span]):
+        """Registra spans medidos em outro processo (pool de geração das planilhas)"""
+        with self._lock:
+            self.spans.extend(spans)
+
+    def finish(self, status: str):
+        """Encerra a execução com o estado final (concluido, cancelado, erro)"""
+        self.status = status
+        self.finished_at = datetime.now()
+        self._duracao = time.perf_counter() - self._inicio
+
+    @property
+    def duration(self) -> float:
+        """Duração total da execução em segundos"""
+        return self._duracao if self._duracao is not None else time.perf_counter() - self._inicio
+
+    def stage_totals(self) -> Dict[str, Dict[str, float]]:
+        """Soma tempo, linhas e bytes por etapa (pico de memória: o maior entre os spans)"""
+        totais = {}
+        for span in self.spans:
+            total = totais.setdefault(span.stage, {"seconds": 0.0, "count": 0, "rows": 0, "bytes": 0, "peak_memory_bytes": 0})
+            total["seconds"] += span.seconds
+            total["count"] += 1
+            total["rows"] += span.rows or 0
+            total["bytes"] += span.bytes or 0
+            total["peak_memory_bytes"] = max(total["peak_memory_bytes"], span.peak_memory_bytes)
+        return totais
+
+    def branch_totals(self) -> Dict[str, Dict[str, float]]:
+        """Tempo de cada etapa por filial, para encontrar a filial que ficou lenta"""
+        filiais = {}
+        for span in self.spans:
+            if span.branch is not None:
+                etapas = filiais.setdefault(span.branch, {})
+                etapas[span.stage] = etapas.get(span.stage, 0.0) + span.seconds
+        return dict(sorted(filiais.items()))
+
+    def report(self) -> Dict:
+        """Relatório completo da execução em formato serializável"""
+        return {
+            "run_id": self.run_id,
+            "name": self.name,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "finished_at": self.finished_at.isoformat(timespec="seconds") if self.finished_at else None,
+            "duration_seconds": round(self.duration, 3),
+            "peak_memory_bytes": max([peak_memory_bytes()] + [span.peak_memory_bytes for span in self.spans]),
+            "attributes": self.attributes,
+            "stages": self.stage_totals(),
+            "branches": self.branch_totals(),
+            "spans": [asdict(span) for span in self.spans],
+        }
+
+    def write_json(self, path: str):
+        """Grava o relatório da execução em JSON"""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2, ensure_ascii=False)
+
+    def write_prometheus(self, path: str):
+        """Grava as métricas no formato textfile do node_exporter (troca atômica do arquivo)"""
+        relatorio = self.report()
+        status = relatorio["status"] or "desconhecido"
+        linhas = [
+            "# HELP cobrancanf_run_duration_seconds Duração da última execução.",
+            "# TYPE cobrancanf_run_duration_seconds gauge",
+            f'cobrancanf_run_duration_seconds{{status="{status}"}} {relatorio["duration_seconds"]}',
+            "# HELP cobrancanf_run_finished_timestamp_seconds Horário de término da última execução.",
+            "# TYPE cobrancanf_run_finished_timestamp_seconds gauge",
+            f"cobrancanf_run_finished_timestamp_seconds {time.time():.0f}",
+            "# HELP cobrancanf_run_peak_memory_bytes Pico de memória da última execução.",
+            "# TYPE cobrancanf_run_peak_memory_bytes gauge",
+            f'cobrancanf_run_peak_memory_bytes {relatorio["peak_memory_bytes"]}',
+            "# HELP cobrancanf_stage_duration_seconds Tempo somado de cada etapa na última execução.",
+            "# TYPE cobrancanf_stage_duration_seconds gauge",
+        ]
+        linhas += [f'cobrancanf_stage_duration_seconds{{stage="{etapa}"}} {total["seconds"]:.3f}' for etapa, total in relatorio["stages"].items()]
+        linhas += [
+            "# HELP cobrancanf_stage_rows Linhas processadas por etapa na última execução.",
+            "# TYPE cobrancanf_stage_rows gauge",
+        ]
+        linhas += [f'cobrancanf_stage_rows{{stage="{etapa}"}} {total["rows"]}' for etapa, total in relatorio["stages"].items()]
+        linhas += [
+            "# HELP cobrancanf_stage_bytes Bytes processados por etapa na última execução.",
+            "# TYPE cobrancanf_stage_bytes gauge",
+        ]
+        linhas += [f'cobrancanf_stage_bytes{{stage="{etapa}"}} {total["bytes"]}' for etapa, total in relatorio["stages"].items()]
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        temporario = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            f.write("\n".join(linhas) + "\n")
+        os.replace(temporario, path)
+
+
+class NullTracer(RunTracer):
+    """Tracer que descarta os spans (usado quando ninguém pediu instrumentação)"""
+
+    def add(self, span: Span):
+        """Descarta o span"""
+
+    def extend(self, spans: Iterable[Span]):
+        """Descarta os spans"""
+
+
+NULL_TRACER = NullTracer()
+
+
+def save_run_report(tracer: RunTracer, settings) -> Optional[str]:
+    """Grava o JSON da execução em RUN_REPORT_DIR (padrão Documents/CobrancaNF/execucoes) e o textfile do Prometheus se configurado"""
+    pasta = settings.RUN_REPORT_DIR or str(Path.home() / "Documents" / "CobrancaNF" / "execucoes")
+    caminho = os.path.join(pasta, f"{tracer.started_at.strftime('%Y%m%d_%H%M%S')}_{tracer.run_id}.json")
+
+    # Falha ao gravar as métricas não pode interromper a execução
+    try:
+        tracer.write_json(caminho)
+        if settings.PROMETHEUS_TEXTFILE:
+            tracer.write_prometheus(settings.PROMETHEUS_TEXTFILE)
+    except Exception as e:
+        print(f"Erro ao gravar o relatório da execução: {e}")
+        return None
+    return caminho
@@ -0,0 +1,265 @@
+import hashlib
+import mimetypes
+import os
+import queue
+import smtplib
+import ssl
+import threading
+from datetime import datetime
+from email import policy
+from email.message import EmailMessage
+from email.utils import format_datetime, formatdate, make_msgid
+from src.domain.entities import OutgoingEmail
+
+# Outlook: olMailItem para CreateItem e olDiscard para fechar sem salvar
+OL_MAIL_ITEM = 0
+OL_DISCARD = 1
+
+# HRESULTs do COM quando o Outlook está ocupado e pede para tentar mais tarde
+RPC_E_CALL_REJECTED = -2147418111
+RPC_E_SERVERCALL_RETRYLATER = -2147417846
+
+
+class MailTransport:
+    """Interface dos meios de envio de e-mail"""
+
+    def signature(self) -> str:
+        """Assinatura HTML acrescentada ao corpo (vazia quando o meio de envio não tem uma)"""
+        return ""
+
+    def send(self, message: OutgoingEmail):
+        """Envia uma mensagem"""
+        raise NotImplementedError
+
+    def is_transient(self, error: Exception) -> bool:
+        """Indica se o erro é temporário e o envio pode ser tentado novamente"""
+        return False
+
+    def close(self):
+        """Libera os recursos do meio de envio"""
+
+
+def build_mime_message(message: OutgoingEmail, sender: str = None, date: datetime = None, message_id: str = None) -> EmailMessage:
+    """Monta a mensagem MIME (HTML + anexos) com a biblioteca padrão"""
+    mime = EmailMessage()
+    mime["Subject"] = message.subject
+    if sender:
+        mime["From"] = sender
+    if message.to:
+        mime["To"] = ", ".join(message.to)
+    if message.cc:
+        mime["Cc"] = ", ".join(message.cc)
+    mime["Date"] = format_datetime(date) if date else formatdate(localtime=True)
+    mime["Message-ID"] = message_id or make_msgid()
+
+    mime.set_content("Este e-mail requer um leitor com suporte a HTML.")
+    mime.add_alternative(message.html_body, subtype="html")
+
+    for caminho in message.attachments:
+        tipo, _ = mimetypes.guess_type(caminho)
+        maintype, subtype = (tipo or "application/octet-stream").split("/", 1)
+        with open(caminho, "rb") as f:
+            mime.add_attachment(f.read(), maintype=maintype, subtype=subtype, filename=os.path.basename(caminho))
+
+    return mime
+
+
+class OutlookTransport(MailTransport):
+    """Envio pelo Outlook instalado na máquina (COM), com uma sessão por thread"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._signature = None
+        self._signature_lock = threading.Lock()
+
+    def _get_outlook(self):
+        """Retorna a instância do Outlook da thread atual, criada na primeira chamada"""
+        outlook = getattr(self._local, "outlook", None)
+        if outlook is None:
+            import pythoncom
+            import win32com.client as win32
+
+            # Cada thread precisa inicializar o COM antes de usar o Outlook
+            pythoncom.CoInitialize()
+            outlook = win32.Dispatch('Outlook.Application')
+            self._local.outlook = outlook
+        return outlook
+
+    def signature(self) -> str:
+        """Captura a assinatura padrão uma única vez, sem abrir a janela do e-mail"""
+        with self._signature_lock:
+            if self._signature is None:
+                rascunho = self._get_outlook().CreateItem(OL_MAIL_ITEM)
+                # Acessar o Inspector faz o Outlook inserir a assinatura padrão no corpo sem exibir a janela
+                rascunho.GetInspector
+                self._signature = rascunho.HTMLBody
+                rascunho.Close(OL_DISCARD)
+        return self._signature
+
+    def send(self, message: OutgoingEmail):
+        """Cria o item no Outlook e envia"""
+        email = self._get_outlook().CreateItem(OL_MAIL_ITEM)
+
+        email.Subject = message.subject
+        email.HTMLBody = message.html_body
+        for caminho in message.attachments:
+            email.Attachments.Add(caminho)
+
+        email.To = ";".join(message.to) if len(message.to) > 0 else ""
+        email.CC = ";".join(message.cc) if len(message.cc) > 0 else ""
+        email.Send()
+
+    def is_transient(self, error: Exception) -> bool:
+        """Outlook ocupado (chamada COM rejeitada) é temporário"""
+        hresult = error.args[0] if error.args else None
+        return hresult in (RPC_E_CALL_REJECTED, RPC_E_SERVERCALL_RETRYLATER)
+
+
+class EmlFileTransport(MailTransport):
+    """Simulação de envio: grava cada mensagem como arquivo .eml em vez de enviar"""
+
+    def __init__(self, directory: str, sender: str = None, date: datetime = None):
+        self.directory = directory
+        self.sender = sender or "cobrancanf@localhost"
+        # Mesma data para todas as mensagens da execução
+        self.date = date or datetime.now().astimezone()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def send(self, message: OutgoingEmail):
+        """Grava a mensagem em <pasta>/<filial>.eml (<filial> parte N.eml quando a planilha foi dividida)"""
+        # Message-ID e separadores derivados do conteúdo deixam os arquivos comparáveis entre execuções
+        chave = hashlib.sha1(f"{message.branch}|{message.subject}".encode("utf-8")).hexdigest()[:16]
+        mime = build_mime_message(message, self.sender, self.date, f"<{chave}@cobrancanf>")
+        for posicao, parte in enumerate(mime.walk()):
+            if parte.is_multipart():
+                parte.set_boundary(f"=_cobrancanf_{chave}_{posicao}")
+
+        nome = f"{message.branch} parte {message.part}" if message.parts > 1 else message.branch
+        self.write(mime, os.path.join(self.directory, f"{nome}.eml"))
+
+    def write(self, mime: EmailMessage, path: str):
+        """Serializa com quebras de linha CRLF, como no envio por SMTP"""
+        with open(path, "wb") as f:
+            f.write(mime.as_bytes(policy=policy.SMTP))
+
+
+class SmtpTransport(MailTransport):
+    """Envio por SMTP com um pool de conexões persistentes e autenticadas"""
+
+    def __init__(self, host: str, port: int = 587, user: str = None, password: str = None, sender: str = None,
+                 starttls: bool = True, use_ssl: bool = False, pool_size: int = 2,
+                 max_messages_per_connection: int = 100, timeout: float = 60):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.sender = sender or user
+        self.starttls = starttls
+        self.use_ssl = use_ssl
+        self.pool_size = max(1, pool_size)
+        # Muitos servidores limitam as mensagens por sessão; a conexão é renovada ao atingir o limite
+        self.max_messages_per_connection = max_messages_per_connection
+        self.timeout = timeout
+
+        self._idle = queue.LifoQueue()
+        # Limita as conexões simultâneas ao tamanho do pool
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+
+    def send(self, message: OutgoingEmail):
+        """Envia pela primeira conexão livre do pool (reconecta uma vez se o servidor derrubou a sessão)"""
+        mime = build_mime_message(message, self.sender)
+        destinatarios = list(message.to) + list(message.cc)
+
+        with self._slots:
+            conexao = self._acquire()
+            try:
+                try:
+                    conexao.send_message(mime, from_addr=self.sender, to_addrs=destinatarios)
+                except smtplib.SMTPServerDisconnected:
+                    self._discard(conexao)
+                    conexao = self._connect()
+                    conexao.send_message(mime, from_addr=self.sender, to_addrs=destinatarios)
+            except Exception:
+                self._discard(conexao)
+                raise
+
+            conexao.sent_count += 1
+            if conexao.sent_count >= self.max_messages_per_connection:
+                self._discard(conexao)
+            else:
+                self._idle.put(conexao)
+
+    def is_transient(self, error: Exception) -> bool:
+        """Erros de conexão e respostas 4xx do servidor são temporários"""
+        if isinstance(error, smtplib.SMTPResponseException):
+            return 400 <= error.smtp_code < 500
+        if isinstance(error, smtplib.SMTPRecipientsRefused):
+            # Sem destinatários (to_addrs vazio) nenhuma nova tentativa resolve
+            return bool(error.recipients) and all(400 <= code < 500 for code, _ in error.recipients.values())
+        return isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError))
+
+    def close(self):
+        """Encerra todas as conexões ociosas"""
+        while True:
+            try:
+                conexao = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conexao)
+
+    def _acquire(self) -> smtplib.SMTP:
+        """Reaproveita uma conexão ociosa ou abre uma nova"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def _connect(self) -> smtplib.SMTP:
+        """Abre e autentica uma nova conexão"""
+        if self.use_ssl:
+            conexao = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout, context=ssl.create_default_context())
+        else:
+            conexao = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.starttls:
+                conexao.starttls(context=ssl.create_default_context())
+        if self.user and self.password:
+            conexao.login(self.user, self.password)
+
+        conexao.sent_count = 0
+        return conexao
+
+    def _discard(self, conexao: smtplib.SMTP):
+        """Fecha a conexão ignorando erros (ela pode já ter caído)"""
+        try:
+            conexao.quit()
+        except Exception:
+            try:
+                conexao.close()
+            except Exception:
+                pass
+
+
+def create_transport(settings) -> MailTransport:
+    """Cria o meio de envio conforme MAIL_TRANSPORT (outlook, padrão, ou smtp)"""
+    transport = (settings.MAIL_TRANSPORT or "outlook").strip().lower()
+
+    if transport == "smtp":
+        return SmtpTransport(
+            host=settings.SMTP_HOST,
+            port=int(settings.SMTP_PORT or 587),
+            user=settings.SMTP_USER,
+            password=settings.SMTP_PASSWORD,
+            sender=settings.SMTP_SENDER,
+            starttls=_flag(settings.SMTP_STARTTLS, True),
+            use_ssl=_flag(settings.SMTP_SSL, False),
+            pool_size=int(settings.SMTP_POOL_SIZE or 2),
+        )
+
+    return OutlookTransport()
+
+
+def _flag(value, default: bool) -> bool:
+    """Converte variáveis de ambiente do tipo sim/não"""
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in ("1", "true", "sim", "yes")
@@ -0,0 +1,91 @@
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+STATUS_PENDING = "pending"
+STATUS_SENDING = "sending"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    run_key TEXT NOT NULL,
+    branch TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (run_key, branch)
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox (run_key, status);
+"""
+
+
+class Outbox:
+    """Caixa de saída persistente (SQLite) com o estado de envio de cada filial por execução"""
+
+    def __init__(self, path: str = None):
+        if path is None:
+            config_dir = Path.home() / "Documents" / "CobrancaNF"
+            config_dir.mkdir(parents=True, exist_ok=True)
+            path = config_dir / "outbox.db"
+        self.path = str(path)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def enqueue(self, run_key: str, branches: List[str]):
+        """Registra as filiais da execução; filiais já registradas mantêm o estado anterior"""
+        agora = self._now()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO outbox (run_key, branch, status, updated_at) VALUES (?, ?, ?, ?)",
+                [(run_key, branch, STATUS_PENDING, agora) for branch in branches]
+            )
+
+    def sent_branches(self, run_key: str) -> List[str]:
+        """Filiais que já receberam o e-mail nesta execução (não são reenviadas na retomada)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT branch FROM outbox WHERE run_key = ? AND status = ?", (run_key, STATUS_SENT)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def mark_sending(self, run_key: str, branch: str, attempts: int):
+        """Marca a filial como em envio antes de chamar o meio de envio"""
+        self._update(run_key, branch, STATUS_SENDING, attempts, None)
+
+    def mark_sent(self, run_key: str, branch: str, attempts: int):
+        """Marca a filial como enviada"""
+        self._update(run_key, branch, STATUS_SENT, attempts, None)
+
+    def mark_failed(self, run_key: str, branch: str, attempts: int, error: str):
+        """Marca a filial como falha definitiva (é tentada de novo na próxima retomada)"""
+        self._update(run_key, branch, STATUS_FAILED, attempts, error)
+
+    def summary(self, run_key: str) -> Dict[str, Tuple[str, int, str]]:
+        """Retorna filial -> (estado, tentativas, último erro) da execução"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT branch, status, attempts, last_error FROM outbox WHERE run_key = ? ORDER BY branch", (run_key,)
+            ).fetchall()
+        return {branch: (status, attempts, error) for branch, status, attempts, error in rows}
+
+    def close(self):
+        """Fecha o banco"""
+        self._conn.close()
+
+    def _update(self, run_key: str, branch: str, status: str, attempts: int, error: str):
+        """Atualiza o estado de uma filial"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, last_error = ?, updated_at = ? WHERE run_key = ? AND branch = ?",
+                (status, attempts, error, self._now(), run_key, branch)
+            )
+
+    def _now(self) -> str:
+        """Data/hora atual em texto ISO"""
+        return datetime.now().isoformat(timespec="seconds")
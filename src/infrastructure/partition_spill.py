@@ -0,0 +1,39 @@
+import os
+import pickle
+import pandas as pd
+
+
+class BranchPartitionSpill:
+    """Partições temporárias por filial gravadas em disco durante a leitura em blocos"""
+
+    def __init__(self, directory: str, col_filial: str = "Loja"):
+        self.directory = directory
+        self.col_filial = col_filial
+        self._files = {}
+
+    def append(self, df: pd.DataFrame):
+        """Acrescenta as linhas do bloco ao arquivo de cada filial, preservando a ordem original"""
+        for filial, grupo in df.groupby(self.col_filial, sort=False, observed=True):
+            with open(self._path(str(filial)), "ab") as f:
+                pickle.dump(grupo, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def branches(self) -> list[str]:
+        """Retorna as filiais encontradas, ordenadas como no groupby"""
+        return sorted(self._files)
+
+    def load(self, filial: str) -> pd.DataFrame:
+        """Lê todos os blocos gravados de uma filial"""
+        partes = []
+        with open(self._files[filial], "rb") as f:
+            while True:
+                try:
+                    partes.append(pickle.load(f))
+                except EOFError:
+                    break
+        return pd.concat(partes) if len(partes) > 1 else partes[0]
+
+    def _path(self, filial: str) -> str:
+        """Nome do arquivo da filial (numerado para não depender do código da loja)"""
+        if filial not in self._files:
+            self._files[filial] = os.path.join(self.directory, f"part-{len(self._files):05d}.pkl")
+        return self._files[filial]
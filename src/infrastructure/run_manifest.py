@@ -0,0 +1,57 @@
+import json
+import os
+from datetime import datetime
+from typing import Dict
+
+MANIFEST_NAME = ".cobrancanf_manifest.json"
+
+
+class RunManifest:
+    """Manifesto gravado na pasta de saída com o fingerprint de cada filial gerada e enviada"""
+
+    def __init__(self, output_base: str):
+        self.path = os.path.join(output_base, MANIFEST_NAME)
+        self._branches: Dict[str, Dict] = {}
+        self._load()
+
+    def _load(self):
+        """Lê o manifesto anterior; arquivo ausente ou corrompido equivale a um manifesto vazio"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._branches = json.load(f).get("branches", {})
+        except Exception as e:
+            print(f"Erro ao ler o manifesto {self.path}: {e}")
+            self._branches = {}
+
+    def is_generated(self, branch: str, fingerprint: str, excel_path: str) -> bool:
+        """Indica se a planilha com esse conteúdo já existe no mesmo caminho"""
+        entrada = self._branches.get(branch, {})
+        return entrada.get("fingerprint") == fingerprint and entrada.get("excel_path") == excel_path and os.path.exists(excel_path)
+
+    def is_sent(self, branch: str, fingerprint: str) -> bool:
+        """Indica se o e-mail com esse conteúdo já foi enviado para a filial"""
+        return fingerprint is not None and self._branches.get(branch, {}).get("sent") == fingerprint
+
+    def mark_generated(self, branch: str, fingerprint: str, excel_path: str):
+        """Registra a planilha gerada (o envio anterior continua valendo só se o conteúdo for o mesmo)"""
+        entrada = self._branches.setdefault(branch, {})
+        entrada.update({"fingerprint": fingerprint, "excel_path": excel_path, "generated_at": self._now()})
+
+    def mark_sent(self, branch: str, fingerprint: str):
+        """Registra o envio do conteúdo atual da filial"""
+        entrada = self._branches.setdefault(branch, {})
+        entrada.update({"sent": fingerprint, "sent_at": self._now()})
+
+    def save(self):
+        """Grava o manifesto (troca atômica do arquivo)"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temporario = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump({"branches": dict(sorted(self._branches.items()))}, f, indent=2, ensure_ascii=False)
+        os.replace(temporario, self.path)
+
+    def _now(self) -> str:
+        """Data/hora atual em texto ISO"""
+        return datetime.now().isoformat(timespec="seconds")
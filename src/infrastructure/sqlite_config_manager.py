@@ -0,0 +1,156 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+ROLE_ADMIN = "admin"
+ROLE_COORDINATOR = "coordinator"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stores (
+    code TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS store_emails (
+    store_code TEXT NOT NULL REFERENCES stores(code) ON DELETE CASCADE,
+    role TEXT NOT NULL CHECK (role IN ('admin', 'coordinator')),
+    position INTEGER NOT NULL,
+    email TEXT NOT NULL,
+    PRIMARY KEY (store_code, role, position)
+);
+CREATE INDEX IF NOT EXISTS idx_store_emails_email ON store_emails (email COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class SqliteEmailConfigManager:
+    """Gerenciador de configurações de e-mail por filial armazenadas em SQLite (mesma interface do JSON)"""
+
+    def __init__(self):
+        """Abre (ou cria) o banco e migra o email_config.json na primeira execução"""
+        self.config_dir = Path.home() / "Documents" / "CobrancaNF"
+        self.config_file = self.config_dir / "email_config.db"
+        self.json_file = self.config_dir / "email_config.json"
+        self.config_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.config_file, check_same_thread=False)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.executescript(_SCHEMA)
+        self._migrate_from_json()
+
+    def _migrate_from_json(self):
+        """Importa as filiais do JSON existente uma única vez"""
+        with self._lock:
+            migrado = self._conn.execute("SELECT value FROM meta WHERE key = 'migrated_from_json'").fetchone()
+        if migrado or not self.json_file.exists():
+            return
+
+        try:
+            with open(self.json_file, 'r', encoding='utf-8') as f:
+                stores = json.load(f).get("stores", {})
+        except Exception as e:
+            print(f"Erro ao migrar configuração do JSON: {e}")
+            return
+
+        self.import_stores(stores)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from_json', ?)", (str(self.json_file),))
+
+    def get_all_stores(self) -> Dict[str, Dict]:
+        """Retorna todas as filiais configuradas"""
+        with self._lock:
+            codes = [row[0] for row in self._conn.execute("SELECT code FROM stores ORDER BY code")]
+            emails = self._conn.execute(
+                "SELECT store_code, role, email FROM store_emails ORDER BY store_code, role, position"
+            ).fetchall()
+
+        stores = {code: {"admins": [], "coordinators": []} for code in codes}
+        for store_code, role, email in emails:
+            stores[store_code][self._role_key(role)].append(email)
+        return stores
+
+    def get_store(self, store_code: str) -> Dict:
+        """Retorna configuração de uma filial específica"""
+        store = {"admins": [], "coordinators": []}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT role, email FROM store_emails WHERE store_code = ? ORDER BY role, position",
+                (store_code,)
+            ).fetchall()
+        for role, email in rows:
+            store[self._role_key(role)].append(email)
+        return store
+
+    def add_store(self, store_code: str, admins: List[str] = None, coordinators: List[str] = None):
+        """Adiciona uma nova filial"""
+        self.update_store(store_code, admins or [], coordinators or [])
+
+    def update_store(self, store_code: str, admins: List[str], coordinators: List[str]):
+        """Atualiza os e-mails de uma filial (somente as linhas da filial são regravadas)"""
+        with self._lock, self._conn:
+            self._write_store(store_code, admins, coordinators)
+
+    def delete_store(self, store_code: str):
+        """Remove uma filial"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM stores WHERE code = ?", (store_code,))
+
+    def get_store_admins(self, store_code: str) -> List[str]:
+        """Retorna lista de e-mails dos administradores de uma filial"""
+        return self._get_emails(store_code, ROLE_ADMIN)
+
+    def get_store_coordinators(self, store_code: str) -> List[str]:
+        """Retorna lista de e-mails dos coordenadores de uma filial"""
+        return self._get_emails(store_code, ROLE_COORDINATOR)
+
+    def get_stores_by_email(self, email: str) -> List[str]:
+        """Retorna as filiais em que o e-mail recebe os relatórios (consulta pelo índice de e-mail)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT store_code FROM store_emails WHERE email = ? COLLATE NOCASE ORDER BY store_code",
+                (email,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def import_stores(self, stores: Dict[str, Dict], replace: bool = False):
+        """Importa várias filiais em uma única transação (replace=True apaga as demais)"""
+        with self._lock, self._conn:
+            if replace:
+                self._conn.execute("DELETE FROM stores")
+            for store_code, store in stores.items():
+                self._write_store(store_code, store.get("admins", []), store.get("coordinators", []))
+
+    def export_stores(self) -> Dict[str, Dict]:
+        """Exporta todas as filiais no mesmo formato do email_config.json"""
+        return self.get_all_stores()
+
+    def get_config_path(self) -> str:
+        """Retorna o caminho do arquivo de configuração"""
+        return str(self.config_file)
+
+    def _get_emails(self, store_code: str, role: str) -> List[str]:
+        """Retorna os e-mails de um papel (admin/coordinator) da filial"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT email FROM store_emails WHERE store_code = ? AND role = ? ORDER BY position",
+                (store_code, role)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def _write_store(self, store_code: str, admins: List[str], coordinators: List[str]):
+        """Grava a filial e substitui seus e-mails (chamado dentro de uma transação)"""
+        self._conn.execute("INSERT OR IGNORE INTO stores (code) VALUES (?)", (store_code,))
+        self._conn.execute("DELETE FROM store_emails WHERE store_code = ?", (store_code,))
+        self._conn.executemany(
+            "INSERT INTO store_emails (store_code, role, position, email) VALUES (?, ?, ?, ?)",
+            [(store_code, ROLE_ADMIN, pos, email) for pos, email in enumerate(admins)]
+            + [(store_code, ROLE_COORDINATOR, pos, email) for pos, email in enumerate(coordinators)]
+        )
+
+    def _role_key(self, role: str) -> str:
+        """Converte o papel do banco na chave usada no JSON"""
+        return "admins" if role == ROLE_ADMIN else "coordinators"
@@ -0,0 +1,298 @@
+import argparse
+import json
+import os
+import sys
+
+# Códigos de saída para o agendador de tarefas
+EXIT_OK = 0
+EXIT_FAILURES = 1
+EXIT_ERROR = 2
+EXIT_CANCELLED = 130
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Define os comandos da linha de comando"""
+    parser = argparse.ArgumentParser(prog="cobrancanf", description="Processamento e envio das pendências de notas fiscais por filial")
+    comandos = parser.add_subparsers(dest="command", required=True)
+
+    for nome, ajuda in (
+        ("process", "Gera as planilhas por filial sem enviar e-mails"),
+        ("send", "Gera as planilhas e envia os e-mails"),
+        ("dry-run", "Gera as planilhas e grava os e-mails como arquivos .eml, sem enviar"),
+    ):
+        comando = comandos.add_parser(nome, help=ajuda)
+        comando.add_argument("csv", nargs="+", help="Exports do sistema: arquivos .csv/.gz/.zip, pastas ou padrões (ex.: \"exports/*.csv\")")
+        comando.add_argument("output", help="Pasta em que as planilhas serão geradas")
+        comando.add_argument("--workers", type=int, default=None, help="Processos para gerar as planilhas (padrão: REPORT_WORKERS)")
+        comando.add_argument("--chunk-rows", type=int, default=None, help="Linhas por bloco na leitura do CSV (padrão: CSV_CHUNK_ROWS)")
+        comando.add_argument("--force", action="store_true", help="Gera e envia todas as filiais, mesmo as sem alteração desde a última execução")
+        if nome != "send":
+            comando.add_argument("--history", action="store_true", help="Registra os documentos no histórico (por padrão só o send e o watch registram)")
+        if nome == "dry-run":
+            comando.add_argument("--eml-dir", default=None, help="Pasta dos arquivos .eml (padrão: <output>/eml)")
+
+    vigia = comandos.add_parser("watch", help="Vigia uma pasta e gera/envia cada export novo assim que ele termina de ser gravado")
+    vigia.add_argument("inbox", nargs="?", default=None, help="Pasta vigiada (padrão: WATCH_INBOX)")
+    vigia.add_argument("output", nargs="?", default=None, help="Pasta em que as planilhas serão geradas (padrão: WATCH_OUTPUT)")
+    vigia.add_argument("--archive-dir", default=None, help="Destino dos exports processados (padrão: WATCH_ARCHIVE_DIR ou <inbox>/processados)")
+    vigia.add_argument("--error-dir", default=None, help="Destino dos exports com erro (padrão: WATCH_ERROR_DIR ou <inbox>/erros)")
+    vigia.add_argument("--poll", type=float, default=None, help="Segundos entre verificações da pasta (padrão: WATCH_POLL_SECONDS)")
+    vigia.add_argument("--settle", type=float, default=None, help="Segundos sem alteração para o arquivo contar como completo (padrão: WATCH_SETTLE_SECONDS)")
+    vigia.add_argument("--jobs", type=int, default=None, help="Exports processados ao mesmo tempo, em pastas de saída diferentes (padrão: WATCH_WORKERS)")
+    vigia.add_argument("--workers", type=int, default=None, help="Processos para gerar as planilhas (padrão: REPORT_WORKERS)")
+    vigia.add_argument("--chunk-rows", type=int, default=None, help="Linhas por bloco na leitura do CSV (padrão: CSV_CHUNK_ROWS)")
+    vigia.add_argument("--force", action="store_true", help="Gera e envia todas as filiais, mesmo as sem alteração desde a última execução")
+    vigia.add_argument("--once", action="store_true", help="Processa os exports presentes e termina")
+
+    historico = comandos.add_parser("history", help="Consulta os documentos pendentes no arquivo histórico")
+    historico.add_argument("--branch", default=None, help="Somente esta filial")
+    historico.add_argument("--new-since", default=None, help="Somente documentos que apareceram a partir desta data (AAAA-MM-DD)")
+    historico.add_argument("--min-days", type=int, default=None, help="Somente documentos pendentes há pelo menos N dias")
+    historico.add_argument("--all", action="store_true", help="Inclui os documentos já resolvidos")
+    historico.add_argument("--output", default=None, help="Grava os documentos em um CSV")
+
+    config = comandos.add_parser("config", help="Importa ou exporta as filiais cadastradas")
+    config_comandos = config.add_subparsers(dest="config_command", required=True)
+
+    exportar = config_comandos.add_parser("export", help="Grava as filiais em um arquivo JSON")
+    exportar.add_argument("file", help="Arquivo JSON de destino ('-' para a saída padrão)")
+
+    importar = config_comandos.add_parser("import", help="Lê as filiais de um arquivo JSON")
+    importar.add_argument("file", help="Arquivo JSON no formato do email_config.json")
+    importar.add_argument("--replace", action="store_true", help="Remove as filiais que não estão no arquivo")
+
+    return parser
+
+
+def main(argv=None) -> int:
+    """Executa o comando informado e devolve o código de saída"""
+    args = build_parser().parse_args(argv)
+
+    try:
+        if args.command == "config":
+            return _config(args)
+        if args.command == "history":
+            return _history(args)
+        if args.command == "watch":
+            return _watch(args)
+        if args.command == "process":
+            return _process(args)
+        if args.command == "dry-run":
+            return _dry_run(args)
+        return _send(args)
+    except KeyboardInterrupt:
+        print("Cancelado pelo usuário.", file=sys.stderr)
+        return EXIT_CANCELLED
+    except Exception as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+def _spreadsheet_service(args):
+    """Cria o serviço de planilhas (importa pandas somente aqui)"""
+    from src.application.spreadsheet_service import SpreadsheetService
+    return SpreadsheetService(workers=args.workers, csv_chunksize=args.chunk_rows)
+
+
+def _process(args) -> int:
+    """Gera somente as planilhas"""
+    tracer = _start_tracer("process", args)
+    service = _spreadsheet_service(args)
+    reports = service.execute(args.csv, args.output, progress=_print_progress("Planilhas"), tracer=tracer, force=args.force,
+                              record_history=args.history)
+    falhas = {report.branch: report.error for report in reports if report.error}
+
+    inalteradas = sum(1 for report in reports if report.unchanged)
+    print(f"Planilhas geradas: {len(reports) - len(falhas) - inalteradas}")
+    if inalteradas:
+        print(f"Planilhas sem alteração: {inalteradas}")
+    _print_delta(reports)
+    if service.summary_path:
+        print(f"Resumo consolidado: {service.summary_path}")
+    _finish_tracer(tracer, falhas)
+    return _print_failures(falhas)
+
+
+def _dry_run(args) -> int:
+    """Gera as planilhas e grava a mensagem de cada filial em .eml (destinatários do cadastro, sem enviar)"""
+    from src.infrastructure.email_sender import SendEmail
+    from src.infrastructure.mail_transport import EmlFileTransport
+    from src.infrastructure.run_manifest import RunManifest
+
+    tracer = _start_tracer("dry-run", args)
+    eml_dir = args.eml_dir or os.path.join(args.output, "eml")
+    reports = _spreadsheet_service(args).execute(args.csv, args.output, progress=_print_progress("Planilhas"), tracer=tracer, force=args.force,
+                                                 record_history=args.history)
+    falhas = {report.branch: report.error for report in reports if report.error}
+
+    # Mostra só o que o send enviaria: filiais já enviadas com o mesmo conteúdo ficam de fora
+    manifest = RunManifest(args.output)
+    envio = [report for report in reports if not report.error and (args.force or not manifest.is_sent(report.branch, report.fingerprint))]
+
+    # A simulação não passa pela caixa de saída nem pelo manifesto, para não marcar filiais como enviadas
+    status = SendEmail(transport=EmlFileTransport(eml_dir)).send_many(envio, tracer)
+    falhas.update({branch: erro for branch, erro in status.items() if erro})
+
+    print(f"Mensagens gravadas em {eml_dir}: {sum(1 for erro in status.values() if erro is None)}")
+    _finish_tracer(tracer, falhas)
+    return _print_failures(falhas)
+
+
+def _send(args) -> int:
+    """Gera as planilhas e envia pela fila de envio, com o mesmo pipeline da interface"""
+    from src.application.report_pipeline import FINAL_STAGES, STAGE_CANCELLED, STAGE_ERROR, ReportPipeline
+    from src.application.send_queue import create_send_queue
+    from src.infrastructure.email_sender import SendEmail
+
+    email_sender = SendEmail()
+    pipeline = ReportPipeline(_spreadsheet_service(args), create_send_queue(email_sender), email_sender)
+    pipeline.start(args.csv, args.output, force=args.force)
+
+    # Ctrl+C pede o cancelamento; o pipeline termina a filial atual e publica o evento final
+    event = None
+    while event is None or event.stage not in FINAL_STAGES:
+        try:
+            event = pipeline.events.get()
+        except KeyboardInterrupt:
+            print("Cancelando...", file=sys.stderr)
+            pipeline.cancel()
+            continue
+        if event.total:
+            print(f"[{event.stage}] {event.done}/{event.total} filial {event.branch}", flush=True)
+
+    if event.stage == STAGE_ERROR:
+        print(f"Erro ao processar o arquivo: {event.message}", file=sys.stderr)
+        return EXIT_ERROR
+
+    print(event.message)
+    if event.stage == STAGE_CANCELLED:
+        return EXIT_CANCELLED
+    return _print_failures(event.result.failures)
+
+
+def _watch(args) -> int:
+    """Executa o modo watch até Ctrl+C (ou até esvaziar a pasta, com --once)"""
+    from src.application.inbox_watcher import create_inbox_watcher
+    from src.application.report_pipeline import ReportPipeline
+    from src.application.send_queue import create_send_queue
+    from src.infrastructure.config.settings import Settings
+    from src.infrastructure.email_sender import SendEmail
+
+    def pipeline():
+        # Serviços próprios para cada export: execuções simultâneas não compartilham estado
+        email_sender = SendEmail()
+        return ReportPipeline(_spreadsheet_service(args), create_send_queue(email_sender), email_sender)
+
+    watcher = create_inbox_watcher(
+        Settings(), pipeline, args.inbox, args.output,
+        archive_dir=args.archive_dir, error_dir=args.error_dir, poll_seconds=args.poll, settle_seconds=args.settle,
+        workers=args.jobs, force=args.force
+    )
+    try:
+        watcher.run(once=args.once)
+    except KeyboardInterrupt:
+        print("Encerrado.", file=sys.stderr)
+    return EXIT_OK
+
+
+def _history(args) -> int:
+    """Lista os documentos do índice do histórico com os dias em que ficaram pendentes"""
+    import pandas as pd
+    from src.infrastructure.config.settings import Settings
+    from src.infrastructure.csv_export_reader import ENCODING, SEPARATOR
+    from src.infrastructure.history_store import create_history_store
+
+    store = create_history_store(Settings())
+    if store is None:
+        print("Histórico desativado (HISTORY_ENABLED) ou pyarrow não instalado.", file=sys.stderr)
+        return EXIT_ERROR
+
+    indice = store.read_index(args.branch)
+    if not args.all:
+        # Pendentes: documentos presentes na última execução de cada filial
+        indice = indice[indice["last_seen"] == indice.groupby("Loja")["last_seen"].transform("max")]
+    indice = indice.assign(dias_pendente=(indice["last_seen"] - indice["first_seen"]).dt.days)
+    if args.new_since:
+        indice = indice[indice["first_seen"] >= pd.Timestamp(args.new_since)]
+    if args.min_days is not None:
+        indice = indice[indice["dias_pendente"] >= args.min_days]
+
+    indice = indice.drop(columns="doc_key").sort_values(["Loja", "first_seen"])
+    if args.output:
+        indice.to_csv(args.output, sep=SEPARATOR, encoding=ENCODING, index=False)
+        print(f"Documentos gravados em {args.output}")
+
+    resumo = indice.groupby("Loja").agg(documentos=("dias_pendente", "size"), mais_antigo_dias=("dias_pendente", "max"))
+    print(resumo.to_string() if len(resumo) else "Nenhum documento encontrado.")
+    print(f"Total: {len(indice)}")
+    return EXIT_OK
+
+
+def _config(args) -> int:
+    """Importa ou exporta as filiais no formato do email_config.json"""
+    from src.infrastructure.config_factory import create_config_manager
+
+    config_manager = create_config_manager()
+    if args.config_command == "export":
+        conteudo = json.dumps({"stores": config_manager.export_stores()}, indent=2, ensure_ascii=False)
+        if args.file == "-":
+            print(conteudo)
+        else:
+            with open(args.file, "w", encoding="utf-8") as f:
+                f.write(conteudo)
+            print(f"Filiais exportadas para {args.file}")
+        return EXIT_OK
+
+    with open(args.file, "r", encoding="utf-8") as f:
+        dados = json.load(f)
+    # Aceita tanto o arquivo completo ({"stores": {...}}) quanto só o dicionário de filiais
+    stores = dados.get("stores", dados)
+    config_manager.import_stores(stores, replace=args.replace)
+    print(f"Filiais importadas: {len(stores)}")
+    return EXIT_OK
+
+
+def _start_tracer(nome: str, args):
+    """Cria o coletor de spans da execução"""
+    from src.infrastructure.instrumentation import RunTracer
+
+    tracer = RunTracer(nome)
+    tracer.attributes.update({"csv_path": args.csv, "output_base": args.output})
+    return tracer
+
+
+def _finish_tracer(tracer, falhas: dict):
+    """Grava o relatório JSON da execução (e o textfile do Prometheus, se configurado)"""
+    from src.infrastructure.config.settings import Settings
+    from src.infrastructure.instrumentation import save_run_report
+
+    tracer.attributes["failures"] = len(falhas)
+    tracer.finish("concluido")
+    caminho = save_run_report(tracer, Settings())
+    if caminho:
+        print(f"Relatório da execução: {caminho}")
+
+
+def _print_delta(reports):
+    """Resumo das diferenças em relação à execução anterior (somente com o histórico ativo)"""
+    deltas = [report.delta for report in reports if report.delta is not None]
+    if deltas:
+        print(f"Novos: {sum(d.new for d in deltas)} | Resolvidos: {sum(d.resolved for d in deltas)} | "
+              f"Antigos: {sum(d.aging for d in deltas)}")
+
+
+def _print_progress(etapa: str):
+    """Callback de andamento que escreve uma linha por filial"""
+    def progress(done: int, total: int, branch: str):
+        print(f"[{etapa}] {done}/{total} filial {branch}", flush=True)
+    return progress
+
+
+def _print_failures(falhas: dict) -> int:
+    """Lista as filiais com erro e devolve o código de saída"""
+    if not falhas:
+        return EXIT_OK
+    print("Filiais com erro:", file=sys.stderr)
+    for branch, erro in falhas.items():
+        print(f"  Filial {branch}: {erro}", file=sys.stderr)
+    return EXIT_FAILURES
@@ -1,13 +1,11 @@
 import tkinter as tk
-import os
-import shutil
-import tempfile
 from tkinter import ttk, messagebox, filedialog
 
 from src.presentation.store_dialog import StoreFormDialog
-from src.application.spreadsheet_service import SpreadsheetService
-from src.infrastructure.config_manager import EmailConfigManager
-from src.infrastructure.email_sender import SendEmail
+from src.presentation.progress_dialog import ProgressDialog
+from src.presentation.store_list import StoreIndex, StoreListView
+from src.infrastructure.config_factory import create_config_manager
+from src.application.report_pipeline import STAGE_CANCELLED, STAGE_ERROR, ReportPipeline
 
 class StoreEmailConfigUI:
     """Interface para gerenciar e-mails por filial"""
@@ -17,9 +15,9 @@ class StoreEmailConfigUI:
         self.root.title("Parâmetros - Filiais cadastradas")
         self.root.geometry("900x600")
         
-        self.config_manager = EmailConfigManager()
-        self.create_spreadsheet = SpreadsheetService()
-        self.email_sender = SendEmail()
+        self.config_manager = create_config_manager()
+        # Serviços de processamento e envio (pandas, Outlook) só são criados no primeiro envio
+        self._pipeline_services = None
         
         self._create_widgets()
         self._load_stores()
@@ -29,6 +27,19 @@ class StoreEmailConfigUI:
         
         # Frame principal
         main_frame = tk.Frame(self.root)
+        
+        # Busca por código da filial ou e-mail, filtrando enquanto se digita
+        search_frame = tk.Frame(self.root)
+        search_frame.pack(fill=tk.X, padx=10, pady=(10, 0))
+        
+        tk.Label(search_frame, text="Buscar:").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        search_entry = tk.Entry(search_frame, textvariable=self.search_var, width=40)
+        search_entry.pack(side=tk.LEFT, padx=5)
+        
+        self.count_label = tk.Label(search_frame, text="")
+        self.count_label.pack(side=tk.RIGHT)
+        
         main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
         # Treeview para listar filiais
@@ -51,6 +62,11 @@ class StoreEmailConfigUI:
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
+        # Filiais em memória; inclusão, edição e exclusão mexem só na linha afetada
+        self.store_index = StoreIndex()
+        self.store_list = StoreListView(self.tree, self.store_index, on_count=self._update_count)
+        self.search_var.trace_add("write", lambda *_: self.store_list.set_query(self.search_var.get()))
+        
         # Frame de botões
         button_frame = tk.Frame(self.root)
         button_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
@@ -67,26 +83,22 @@ class StoreEmailConfigUI:
         # Separador
         tk.Frame(button_frame, width=20).pack(side=tk.LEFT)
         
-        btn_send = tk.Button(button_frame, text="Enviar E-mails", command=self._send_emails, width=20, bg="#4CAF50", fg="white")
-        btn_send.pack(side=tk.LEFT, padx=5)
+        self.btn_send = tk.Button(button_frame, text="Enviar E-mails", command=self._send_emails, width=20, bg="#4CAF50", fg="white")
+        self.btn_send.pack(side=tk.LEFT, padx=5)
+
+        # Por padrão filiais sem alteração desde o último envio para a mesma pasta são ignoradas
+        self.force_var = tk.BooleanVar(value=False)
+        chk_force = tk.Checkbutton(button_frame, text="Reenviar todas as filiais", variable=self.force_var)
+        chk_force.pack(side=tk.LEFT, padx=5)
     
     def _load_stores(self):
-        """Carrega as filiais na tabela"""
-        # Limpa a tabela
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # Carrega filiais do config
-        stores = self.config_manager.get_all_stores()
-        
-        # Ordena por número da filial
-        sorted_stores = sorted(stores.items(), key=lambda x: x[0])
-        
-        for store_code, store_data in sorted_stores:
-            admins = ", ".join(store_data.get("admins", []))
-            coords = ", ".join(store_data.get("coordinators", []))
-            
-            self.tree.insert("", tk.END, values=(store_code, admins, coords))
+        """Carrega as filiais do config uma vez e preenche a tabela"""
+        self.store_index.load(self.config_manager.get_all_stores())
+        self.store_list.refresh()
+    
+    def _update_count(self, shown, total):
+        """Mostra quantas filiais atendem à busca"""
+        self.count_label.config(text=f"{shown} de {total} filiais" if shown != total else f"{total} filiais")
     
     def _add_store(self):
         """Adiciona uma nova filial"""
@@ -98,29 +110,25 @@ class StoreEmailConfigUI:
             coords = dialog.result["coordinators"]
             
             # Verifica se já existe
-            if store_code in self.config_manager.get_all_stores():
+            if store_code in self.store_index:
                 messagebox.showerror("Erro", f"Filial {store_code} já cadastrada!")
                 return
             
             self.config_manager.add_store(store_code, admins, coords)
-            self._load_stores()
+            self.store_index.upsert(store_code, admins, coords)
+            self.store_list.upsert(store_code)
             messagebox.showinfo("Sucesso", "Filial adicionada com sucesso!")
     
     def _edit_store(self):
         """Edita uma filial existente"""
-        selection = self.tree.selection()
-        if not selection:
+        # O id da linha é o código da filial exatamente como está no JSON
+        store_code = self.store_list.selected_code()
+        if not store_code:
             messagebox.showwarning("Aviso", "Selecione uma filial para editar!")
             return
         
-        item = self.tree.item(selection[0])
-        store_code = str(item["values"][0])
-        # Garante que números de 1 dígito tenham o zero à esquerda para bater com o JSON
-        if store_code.isdigit() and len(store_code) < 2:
-            store_code = store_code.zfill(2)
-        
-        # Carrega dados atuais
-        store_data = self.config_manager.get_store(store_code)
+        # Dados atuais já estão em memória
+        store_data = self.store_index.get(store_code)
         
         dialog = StoreFormDialog(
             self.root, 
@@ -135,21 +143,17 @@ class StoreEmailConfigUI:
             coords = dialog.result["coordinators"]
             
             self.config_manager.update_store(store_code, admins, coords)
-            self._load_stores()
+            self.store_index.upsert(store_code, admins, coords)
+            self.store_list.upsert(store_code)
             messagebox.showinfo("Sucesso", "Filial atualizada com sucesso!")
     
     def _delete_store(self):
         """Exclui uma filial"""
-        selection = self.tree.selection()
-        if not selection:
+        store_code = self.store_list.selected_code()
+        if not store_code:
             messagebox.showwarning("Aviso", "Selecione uma filial para excluir!")
             return
         
-        item = self.tree.item(selection[0])
-        store_code = str(item["values"][0])
-        if store_code.isdigit() and len(store_code) < 2:
-            store_code = store_code.zfill(2)
-        
         confirm = messagebox.askyesno(
             "Confirmar Exclusão",
             f"Deseja realmente excluir a filial {store_code}?"
@@ -157,55 +161,64 @@ class StoreEmailConfigUI:
         
         if confirm:
             self.config_manager.delete_store(store_code)
-            self._load_stores()
+            self.store_index.remove(store_code)
+            self.store_list.remove(store_code)
             messagebox.showinfo("Sucesso", "Filial excluída com sucesso!")
     
     def _send_emails(self):
         """Executa o script main.py ou o executável CobrancaNF.exe para enviar e-mails"""
         
-        file = filedialog.askopenfilename(
-            title="Selecione o arquivo com as notas fiscais e fretes",
-            filetypes=[("Arquivos CSV", "*.csv")]
+        # Vários exports (por região ou mês) são processados juntos, lidos direto da origem
+        files = filedialog.askopenfilenames(
+            title="Selecione os arquivos com as notas fiscais e fretes",
+            filetypes=[("Exports (CSV, GZ, ZIP)", "*.csv *.gz *.zip"), ("Arquivos CSV", "*.csv")]
         )
 
-        if file:
-            try:
-                # cria diretório temporário
-                temp_dir = tempfile.gettempdir()
-                
-                # mantém o mesmo nome do arquivo
-                file_name = os.path.basename(file)
-                temp_file_path = os.path.join(temp_dir, file_name)
-
-                # copia o arquivo selecionado para o temp
-                shutil.copy2(file, temp_file_path)
-
-            except Exception as e:
-                print("Erro ao processar o arquivo:", e)
-                return
-
+        if files:
             messagebox.showinfo("Atenção!", "Selecione a pasta em que será gerado as planilhas individuais de cada loja.")
 
             output_folder = filedialog.askdirectory(
                 title="Selecione a pasta"
             )
 
-            try:
-                reports = self.create_spreadsheet.execute(temp_file_path, output_folder)
+            if not output_folder:
+                return
+
+            # O processamento roda em outra thread; a janela de andamento lê os eventos sem travar a interface
+            pipeline = ReportPipeline(*self._get_pipeline_services())
+            self.btn_send.config(state=tk.DISABLED)
+            ProgressDialog(self.root, pipeline, self._on_pipeline_finished)
+            pipeline.start(list(files), output_folder, force=self.force_var.get())
+
+    def _get_pipeline_services(self):
+        """Cria na primeira chamada o serviço de planilhas, o envio de e-mails e a fila de envio"""
+        if self._pipeline_services is None:
+            from src.application.spreadsheet_service import SpreadsheetService
+            from src.infrastructure.email_sender import SendEmail
+            from src.application.send_queue import create_send_queue
+
+            email_sender = SendEmail()
+            self._pipeline_services = (SpreadsheetService(), create_send_queue(email_sender), email_sender)
+        return self._pipeline_services
+
+    def _on_pipeline_finished(self, event):
+        """Mostra o resultado da execução em segundo plano"""
+        self.btn_send.config(state=tk.NORMAL)
+
+        if event.stage == STAGE_ERROR:
+            messagebox.showerror("Erro", f"Erro ao processar o arquivo: {event.message}")
+            return
+
+        resultado = event.result
+        if resultado is None:
+            messagebox.showinfo("Cancelado", event.message)
+            return
 
-                for report in reports:
-                    self.email_sender.execute(
-                        report.branch,
-                        report.period_initial,
-                        report.period_final,
-                        self.email_sender.get_admins(report.branch),
-                        self.email_sender.get_coordinators(report.branch),
-                        report.excel_path,
-                        report.quantity,
-                        report.total_value,
-                        report.table
-                    )
-                messagebox.showinfo("Sucesso!", "E-mails enviados com sucesso!")
-            except Exception as e:
-                print("Erro ao processar o arquivo:", e)
-                messagebox.showerror("Erro", f"Erro ao processar o arquivo: {e}")
+        falhas = resultado.failures
+        if event.stage == STAGE_CANCELLED:
+            messagebox.showinfo("Cancelado", f"Envio cancelado pelo usuário.\n{resultado.summary()}")
+        elif falhas:
+            detalhes = "\n".join(f"Filial {branch}: {erro}" for branch, erro in falhas.items())
+            messagebox.showwarning("Atenção!", f"{resultado.summary()}\n\nFiliais com erro:\n{detalhes}")
+        else:
+            messagebox.showinfo("Sucesso!", f"E-mails enviados com sucesso!\n{resultado.summary()}")
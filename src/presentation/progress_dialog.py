@@ -0,0 +1,120 @@
+import queue
+import tkinter as tk
+from tkinter import ttk
+
+from src.application.report_pipeline import (
+    FINAL_STAGES, STAGE_READING, STAGE_SENDING, STAGE_WORKBOOKS, ReportPipeline
+)
+
+# Intervalo de leitura da fila de eventos (ms)
+POLL_INTERVAL_MS = 100
+
+STAGE_LABELS = {
+    STAGE_READING: "Lendo arquivo",
+    STAGE_WORKBOOKS: "Gerando planilhas",
+    STAGE_SENDING: "Enviando e-mails",
+}
+
+class ProgressDialog:
+    """Janela de andamento do processamento, atualizada pela fila de eventos do pipeline"""
+
+    def __init__(self, parent, pipeline: ReportPipeline, on_finish):
+        self.pipeline = pipeline
+        self.on_finish = on_finish
+        self._stage = None
+        self._stage_start = None
+        self._stage_done = 0
+
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title("Processando")
+        self.dialog.geometry("450x200")
+        self.dialog.resizable(False, False)
+        self.dialog.transient(parent)
+        # Fechar a janela equivale a cancelar
+        self.dialog.protocol("WM_DELETE_WINDOW", self._cancel)
+
+        self.stage_label = tk.Label(self.dialog, text="Iniciando...", font=("TkDefaultFont", 10, "bold"))
+        self.stage_label.pack(pady=(15, 5))
+
+        self.progress = ttk.Progressbar(self.dialog, orient=tk.HORIZONTAL, length=400, mode="indeterminate")
+        self.progress.pack(padx=20, pady=5)
+        self.progress.start(10)
+
+        self.detail_label = tk.Label(self.dialog, text="")
+        self.detail_label.pack()
+
+        self.rate_label = tk.Label(self.dialog, text="")
+        self.rate_label.pack()
+
+        self.cancel_button = tk.Button(self.dialog, text="Cancelar", command=self._cancel, width=15)
+        self.cancel_button.pack(pady=15)
+
+        self.dialog.after(POLL_INTERVAL_MS, self._poll)
+
+    def _cancel(self):
+        """Solicita o cancelamento ao pipeline"""
+        self.pipeline.cancel()
+        self.cancel_button.config(state=tk.DISABLED, text="Cancelando...")
+
+    def _poll(self):
+        """Consome os eventos pendentes sem bloquear a interface"""
+        ultimo = None
+        while True:
+            try:
+                event = self.pipeline.events.get_nowait()
+            except queue.Empty:
+                break
+
+            if event.stage in FINAL_STAGES:
+                self.progress.stop()
+                self.dialog.destroy()
+                self.on_finish(event)
+                return
+            ultimo = event
+
+        # Só o evento mais recente importa para a tela
+        if ultimo is not None:
+            self._update(ultimo)
+        self.dialog.after(POLL_INTERVAL_MS, self._poll)
+
+    def _update(self, event):
+        """Atualiza etapa, barra, filial atual, vazão e tempo restante"""
+        if event.stage != self._stage:
+            self._stage = event.stage
+            self._stage_start = event.timestamp
+            self._stage_done = event.done
+            self.stage_label.config(text=STAGE_LABELS.get(event.stage, event.stage))
+
+        if not event.total:
+            if self.progress["mode"] != "indeterminate":
+                self.progress.config(mode="indeterminate")
+                self.progress.start(10)
+            self.detail_label.config(text=event.message)
+            self.rate_label.config(text="")
+            return
+
+        if self.progress["mode"] != "determinate":
+            self.progress.stop()
+            self.progress.config(mode="determinate")
+        self.progress.config(maximum=event.total, value=event.done)
+
+        detalhe = f"{event.done} de {event.total} filiais"
+        if event.branch:
+            detalhe += f" - filial {event.branch}"
+        self.detail_label.config(text=detalhe)
+
+        # Vazão medida a partir do primeiro evento da etapa
+        decorrido = event.timestamp - self._stage_start
+        if event.done > self._stage_done and decorrido > 0:
+            vazao = (event.done - self._stage_done) / decorrido
+            restante = (event.total - event.done) / vazao
+            self.rate_label.config(text=f"{vazao:.1f} filiais/s - restante: {self._format_time(restante)}")
+
+    def _format_time(self, segundos: float) -> str:
+        """Formata segundos como mm:ss ou hh:mm:ss"""
+        segundos = int(round(segundos))
+        horas, resto = divmod(segundos, 3600)
+        minutos, segundos = divmod(resto, 60)
+        if horas:
+            return f"{horas:d}:{minutos:02d}:{segundos:02d}"
+        return f"{minutos:02d}:{segundos:02d}"
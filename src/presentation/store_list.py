@@ -0,0 +1,158 @@
+import bisect
+import tkinter as tk
+from tkinter import ttk
+
+# Linhas inseridas na tabela por vez; o restante entra nos ciclos seguintes sem travar a janela
+BATCH_ROWS = 300
+# Espera após a última tecla antes de filtrar (ms)
+FILTER_DELAY_MS = 150
+
+
+class StoreIndex:
+    """Filiais em memória, ordenadas pelo código, com o texto de busca de cada uma"""
+
+    def __init__(self, stores: dict = None):
+        self._stores = {}
+        self._codes = []
+        self._search = {}
+        if stores:
+            self.load(stores)
+
+    def load(self, stores: dict):
+        """Substitui o conteúdo pelas filiais do arquivo de configuração"""
+        self._stores = {}
+        self._search = {}
+        for code, data in stores.items():
+            self._set(code, data.get("admins", []), data.get("coordinators", []))
+        self._codes = sorted(self._stores)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._stores
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def get(self, code: str) -> dict:
+        """Dados da filial (admins e coordinators)"""
+        return self._stores[code]
+
+    def upsert(self, code: str, admins: list, coordinators: list):
+        """Inclui ou atualiza uma filial"""
+        if code not in self._stores:
+            bisect.insort(self._codes, code)
+        self._set(code, admins, coordinators)
+
+    def remove(self, code: str):
+        """Exclui uma filial"""
+        self._codes.pop(bisect.bisect_left(self._codes, code))
+        del self._stores[code]
+        del self._search[code]
+
+    def matches(self, code: str, query: str) -> bool:
+        """Indica se a filial atende à busca: todos os termos aparecem no código ou nos e-mails"""
+        texto = self._search[code]
+        return all(termo in texto for termo in query.lower().split())
+
+    def filter(self, query: str) -> list:
+        """Códigos das filiais que atendem à busca, em ordem"""
+        if not query.strip():
+            return list(self._codes)
+        return [code for code in self._codes if self.matches(code, query)]
+
+    def _set(self, code: str, admins: list, coordinators: list):
+        self._stores[code] = {"admins": list(admins), "coordinators": list(coordinators)}
+        self._search[code] = " ".join([code, *admins, *coordinators]).lower()
+
+
+class StoreListView:
+    """Tabela de filiais: o código é o id da linha, a busca filtra enquanto se digita e as linhas entram aos poucos"""
+
+    def __init__(self, tree: ttk.Treeview, index: StoreIndex, on_count=None):
+        self.tree = tree
+        self.index = index
+        self.query = ""
+        self._on_count = on_count
+        # Códigos já na tabela (em ordem) e os que ainda faltam inserir
+        self._shown = []
+        self._pending = []
+        self._job = None
+        self._filter_job = None
+
+    def refresh(self):
+        """Recria a tabela com as filiais que atendem à busca atual"""
+        self._cancel_job()
+        self.tree.delete(*self.tree.get_children())
+        self._shown = []
+        self._pending = self.index.filter(self.query)
+        self._insert_batch()
+
+    def set_query(self, query: str):
+        """Agenda o filtro; só a última tecla digitada dentro de FILTER_DELAY_MS dispara a busca"""
+        if self._filter_job is not None:
+            self.tree.after_cancel(self._filter_job)
+        self._filter_job = self.tree.after(FILTER_DELAY_MS, self._apply_query, query)
+
+    def selected_code(self):
+        """Código da filial selecionada, ou None"""
+        selection = self.tree.selection()
+        return selection[0] if selection else None
+
+    def upsert(self, code: str):
+        """Atualiza só a linha da filial (já gravada no índice), incluindo-a ou retirando-a conforme a busca"""
+        if not self.index.matches(code, self.query):
+            self.remove(code)
+            return
+
+        if self.tree.exists(code):
+            self.tree.item(code, values=self._values(code))
+        elif self._pending and code > self._shown[-1]:
+            # Ainda não chegou a vez dessa posição: entra junto com o restante (os valores são lidos na inserção)
+            if code not in self._pending:
+                bisect.insort(self._pending, code)
+        else:
+            posicao = bisect.bisect_left(self._shown, code)
+            self._shown.insert(posicao, code)
+            self.tree.insert("", posicao, iid=code, values=self._values(code))
+        self._notify()
+
+    def remove(self, code: str):
+        """Retira só a linha da filial (ou a tira da fila de inserção)"""
+        if self.tree.exists(code):
+            self._remove_row(code)
+        elif code in self._pending:
+            self._pending.remove(code)
+        self._notify()
+
+    def _apply_query(self, query: str):
+        self._filter_job = None
+        if query != self.query:
+            self.query = query
+            self.refresh()
+
+    def _insert_batch(self):
+        """Insere o próximo lote de linhas e agenda o seguinte"""
+        self._job = None
+        lote, self._pending = self._pending[:BATCH_ROWS], self._pending[BATCH_ROWS:]
+        for code in lote:
+            self.tree.insert("", tk.END, iid=code, values=self._values(code))
+        self._shown += lote
+        if self._pending:
+            self._job = self.tree.after(1, self._insert_batch)
+        self._notify()
+
+    def _remove_row(self, code: str):
+        self._shown.pop(bisect.bisect_left(self._shown, code))
+        self.tree.delete(code)
+
+    def _cancel_job(self):
+        if self._job is not None:
+            self.tree.after_cancel(self._job)
+            self._job = None
+
+    def _values(self, code: str) -> tuple:
+        data = self.index.get(code)
+        return (code, ", ".join(data["admins"]), ", ".join(data["coordinators"]))
+
+    def _notify(self):
+        if self._on_count:
+            self._on_count(len(self._shown) + len(self._pending), len(self.index))
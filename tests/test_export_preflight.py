@@ -0,0 +1,81 @@
+import os
+import pytest
+from src.application.spreadsheet_service import SpreadsheetService
+from src.domain.exceptions import ExportValidationError
+
+HEADER = ["Loja", "CNPJ", "Fornecedor", "Nr. IE", "Dt. Emissão", "Mod.", "Série", "Nr. Documento", "Vlr. Documento", "Evento", "Observações"]
+ROW = {"Loja": "2", "CNPJ": "00.000.000/0001-00", "Fornecedor": "Empresa Ltda", "Nr. IE": "'000000000'", "Dt. Emissão": "18/02/2025",
+       "Mod.": "55", "Série": "1", "Nr. Documento": "000000001", "Vlr. Documento": "1.234,56", "Evento": "CIÊNCIA DA OPERAÇÃO",
+       "Observações": ""}
+
+
+def write_export(path, rows: int, without: str = None):
+    """Grava um export com rows documentos distintos, sem a coluna without"""
+    colunas = [col for col in HEADER if col != without]
+    linhas = [";".join(colunas)]
+    for numero in range(rows):
+        valores = dict(ROW, **{"Nr. Documento": f"{numero:09d}"})
+        linhas.append(";".join(valores[col] for col in colunas))
+    path.write_text("\n".join(linhas) + "\n", encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv("HISTORY_ENABLED", "false")
+    return SpreadsheetService(workers=1)
+
+
+@pytest.mark.parametrize("chunksize", [None, 3])
+def test_missing_column_aborts_before_output(tmp_path, service, chunksize):
+    export = write_export(tmp_path / "export.csv", 10, without="Dt. Emissão")
+    saida = tmp_path / "saida"
+
+    with pytest.raises(ExportValidationError) as erro:
+        service.execute(export, str(saida), chunksize=chunksize)
+
+    assert "Dt. Emissão" in str(erro.value)
+    assert os.listdir(saida) == ["Validacao do export.csv"]
+
+
+def test_missing_column_in_any_export_aborts_chunked_merge(tmp_path, service):
+    completo = write_export(tmp_path / "a.csv", 10)
+    incompleto = write_export(tmp_path / "b.csv", 10, without="Série")
+    saida = tmp_path / "saida"
+
+    with pytest.raises(ExportValidationError) as erro:
+        service.execute([completo, incompleto], str(saida), chunksize=3)
+
+    assert "b.csv" in str(erro.value) and "Série" in str(erro.value)
+    assert os.listdir(saida) == ["Validacao do export.csv"]
+
+
+def write_repeated_export(path):
+    """Export com o primeiro documento repetido no fim do arquivo"""
+    write_export(path, 5)
+    primeira = path.read_text(encoding="utf-8").splitlines()[1]
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(primeira + "\n")
+    return str(path)
+
+
+def test_repeated_document_is_a_warning_by_default(tmp_path, service):
+    export = write_repeated_export(tmp_path / "export.csv")
+    saida = tmp_path / "saida"
+
+    reports = service.execute(export, str(saida))
+
+    # Como na junção dos exports, a linha repetida continua na planilha
+    assert [report.quantity for report in reports] == [6]
+    assert "Documento repetido no arquivo" in (saida / "Validacao do export.csv").read_text(encoding="utf-8")
+
+
+def test_repeated_document_aborts_when_configured_as_error(tmp_path, monkeypatch):
+    monkeypatch.setenv("HISTORY_ENABLED", "false")
+    monkeypatch.setenv("PREFLIGHT_DUPLICATES", "erro")
+    export = write_repeated_export(tmp_path / "export.csv")
+
+    with pytest.raises(ExportValidationError) as erro:
+        SpreadsheetService(workers=1).execute(export, str(tmp_path / "saida"))
+
+    assert "Documento repetido no arquivo" in str(erro.value)